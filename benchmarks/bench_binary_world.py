@@ -0,0 +1,77 @@
+"""
+Compares cold start time and peak RSS of loading a world from JSON against opening it in the binary world format.
+Each load runs in a fresh interpreter so the numbers are not polluted by the generated map.
+
+    python -m benchmarks.bench_binary_world --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.world_generator import generate_world_map
+from engine.utils.binary_world import open_binary_world, write_binary_world
+from engine.utils.location_tree import map_from_json
+
+
+def peak_rss_kb() -> int:
+    # ru_maxrss carries over the parent's high-water mark through fork/exec on Linux; VmHWM does not
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def load_once(kind: str, path: str) -> None:
+    start = time.perf_counter()
+    if kind == 'json':
+        with open(path) as f:
+            location_tree = map_from_json(json.load(f))
+    else:
+        location_tree = open_binary_world(path)
+    # One lookup so that both loaders have done enough to answer a query
+    location_tree.get_region_display_name('r0')
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'max_rss_kb': peak_rss_kb()}))
+
+
+def measure(kind: str, path: str) -> dict:
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_binary_world', '--load', kind, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--load', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.load:
+        load_once(*args.load)
+        return
+    print(f'{"locations":>10} {"json (s)":>9} {"json RSS (MB)":>14} {"binary (s)":>11} {"binary RSS (MB)":>16}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            json_path = os.path.join(directory, f'{size}.json')
+            binary_path = os.path.join(directory, f'{size}.world')
+            map_json = generate_world_map(size)
+            with open(json_path, 'w') as f:
+                json.dump(map_json, f)
+            write_binary_world(map_from_json(map_json), binary_path)
+            del map_json
+            from_json = measure('json', json_path)
+            from_binary = measure('binary', binary_path)
+            print(f'{size:>10} {from_json["seconds"]:>9.3f} {from_json["max_rss_kb"] / 1024:>14.1f} '
+                  f'{from_binary["seconds"]:>11.4f} {from_binary["max_rss_kb"] / 1024:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Compares map_from_json with the call-by-call map_from_json_incremental loader.
+
+    python -m benchmarks.bench_map_from_json --sizes 10000 100000 1000000
+"""
+import argparse
+import gc
+import time
+from typing import Union
+
+from benchmarks.world_generator import generate_world_map
+from engine.utils.location_tree import LocationTree, map_from_json
+
+
+def map_from_json_incremental(map_json: dict[str, Union[str, dict]]) -> LocationTree:
+    """
+    Builds the tree one add_* call at a time, validating each call against the tree built so far. Stops at the
+    first error. The baseline map_from_json is compared with.
+    """
+    world_name = map_json['world_name']
+    regions = list(map_json['regions'].keys())
+    first_region = regions[0]
+    all_locality_global_locations: list[str] = []
+    for region in regions:
+        region_data: dict[str, Union[str, dict]] = map_json['regions'][region]
+        for locality in region_data['localities'].keys():
+            all_locality_global_locations.append(f'{region}_{locality}')
+    first_locality: str = list(filter(lambda x: x.startswith(f'{first_region}_'), all_locality_global_locations))[0]
+    first_region_data: dict[str, Union[str, dict]] = map_json['regions'][first_region]
+    first_locality_data: dict[str, Union[str, dict]] = first_region_data['localities'][first_locality.split('_')[1]]
+    entrypoint_short_name: str = first_locality_data['locations']['entrypoint']
+    entrypoint_display_name: str = first_locality_data['locations']['entrypoint_display_name']
+    location_tree = LocationTree(world_display_name=world_name,
+                                 first_region_display_name=first_region_data['display_name'],
+                                 first_region_name=first_region,
+                                 first_locality_display_name=first_locality_data['display_name'],
+                                 first_locality_name=first_locality.split('_')[1],
+                                 first_locality_entrypoint_name=entrypoint_short_name,
+                                 first_locality_entrypoint_display_name=entrypoint_display_name)
+    other_locations_in_first_locality: dict[str, dict[str, str]] = first_locality_data['locations']['other_locations']
+    for location in other_locations_in_first_locality:
+        location_tree.add_lowest_level_location(global_location=f'{first_locality}_{location}',
+                                                display_name=other_locations_in_first_locality[location][
+                                                    'display_name'])
+
+    def add_locality_to_tree(loc_tree: LocationTree, locality_global_location: str,
+                             locality_data: dict[str, Union[str, dict]]) -> None:
+        display_name: str = locality_data['display_name']
+        entrypoint_name: str = locality_data['locations']['entrypoint']
+        entrypoint_display: str = locality_data['locations']['entrypoint_display_name']
+        loc_tree.add_locality(locality_global_location=locality_global_location,
+                              locality_display_name=display_name,
+                              entrypoint_name=entrypoint_name,
+                              entrypoint_display_name=entrypoint_display)
+        other_locations: dict[str, dict[str, str]] = locality_data['locations']['other_locations']
+        for loc in other_locations:
+            loc_tree.add_lowest_level_location(global_location=f'{locality_global_location}_{loc}',
+                                               display_name=other_locations[loc]['display_name'])
+
+    def add_region_to_tree(loc_tree: LocationTree, region_name: str, rgn_data: dict[str, Union[str, dict]]) -> None:
+        region_display_name: str = rgn_data['display_name']
+        localities_in_region: list[str] = list(rgn_data['localities'].keys())
+        first_locality_short_name = localities_in_region[0]
+        first_locality_info: dict[str, Union[str, dict]] = rgn_data['localities'][first_locality_short_name]
+        first_locality_display_name: str = first_locality_info['display_name']
+        entrypoint: str = first_locality_info['locations']['entrypoint']
+        entrypoint_display: str = first_locality_info['locations']['entrypoint_display_name']
+        other_locations: dict[str, dict[str, str]] = first_locality_info['locations']['other_locations']
+        loc_tree.add_region(region_name=region_name,
+                            region_display_name=region_display_name,
+                            first_locality_name=first_locality_short_name,
+                            first_locality_display_name=first_locality_display_name,
+                            first_locality_entrypoint_name=entrypoint,
+                            first_locality_entrypoint_display_name=entrypoint_display)
+        for locn in other_locations:
+            loc_tree.add_lowest_level_location(global_location=f'{region_name}_{first_locality_short_name}_{locn}',
+                                               display_name=other_locations[locn]['display_name'])
+        for locality_name in localities_in_region:
+            if locality_name == first_locality_short_name:
+                continue
+            locality_data: dict[str, Union[str, dict]] = rgn_data['localities'][locality_name]
+            add_locality_to_tree(loc_tree=loc_tree, locality_global_location=f'{region_name}_{locality_name}',
+                                 locality_data=locality_data)
+
+    for rgn in regions:
+        if rgn == first_region:
+            first_region_locality_short_names: list[str] = list(first_region_data['localities'].keys())
+            for loc in first_region_locality_short_names:
+                if loc != first_locality.split('_')[1]:
+                    add_locality_to_tree(loc_tree=location_tree,
+                                         locality_global_location=f'{rgn}_{loc}',
+                                         locality_data=first_region_data['localities'][loc])
+        else:
+            region_info: dict[str, Union[str, dict]] = map_json['regions'][rgn]
+            add_region_to_tree(loc_tree=location_tree, region_name=rgn, rgn_data=region_info)
+
+    location_tree.mark_changes_saved()
+    return location_tree
+
+
+def time_loader(loader, map_json: dict) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    loader(map_json)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f'{"locations":>10} {"incremental (s)":>16} {"bulk (s)":>10} {"speedup":>8}')
+    for size in args.sizes:
+        map_json = generate_world_map(size)
+        incremental = time_loader(map_from_json_incremental, map_json)
+        bulk = time_loader(map_from_json, map_json)
+        print(f'{size:>10} {incremental:>16.3f} {bulk:>10.3f} {incremental / bulk:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Times PersistentLocationTree mutations on worlds with more and more regions, to show that their cost does not grow
+with the width of the world.
+
+    python -m benchmarks.bench_persistent_location_tree --regions 100 10000 100000
+"""
+import argparse
+import gc
+import time
+
+from benchmarks.world_generator import generate_world_map
+from engine.utils.persistent_location_tree import PersistentLocationTree
+
+
+def time_mutations(tree: PersistentLocationTree, n_mutations: int) -> float:
+    """
+    :return: Mean seconds per mutation, each made on the original tree, so that none builds on another
+    """
+    regions = tree.get_region_names()
+    gc.collect()
+    start = time.perf_counter()
+    for i in range(n_mutations):
+        region = regions[i % len(regions)]
+        if i % 2:
+            tree.change_display_name(global_location=region, new_display_name=f'Renamed {i}')
+        else:
+            tree.add_lowest_level_location(global_location=f'{region}_l0_new{i}', display_name=f'New {i}')
+    return (time.perf_counter() - start) / n_mutations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--regions', type=int, nargs='+', default=[100, 10_000, 100_000])
+    parser.add_argument('--mutations', type=int, default=10_000)
+    args = parser.parse_args()
+    print(f'{"regions":>10} {"per mutation (us)":>18}')
+    for n_regions in args.regions:
+        # one locality of one location per region, so the world is as wide as possible for its size
+        tree = PersistentLocationTree.from_map_json(generate_world_map(n_regions, localities_per_region=1,
+                                                                       locations_per_locality=1))
+        print(f'{n_regions:>10} {time_mutations(tree, args.mutations) * 1e6:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Compares Roll.roll_many with a loop of Roll.roll().
+
+    python -m benchmarks.bench_roll_many --rolls 1000000
+"""
+import argparse
+import time
+
+from engine.utils import roll as roll_module
+from engine.utils.roll import Roll
+
+ROLLS = {
+    '1d20': Roll(),
+    '1d20 with advantage': Roll(adv=1),
+    '2d6+3': Roll(n=2, d=6, bonus=3),
+    '8d6-2 (min. 1)': Roll(n=8, d=6, bonus=-2, minimum=1),
+}
+
+
+def time_call(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rolls', type=int, default=1_000_000)
+    args = parser.parse_args()
+    backend = 'numpy' if roll_module.numpy is not None else 'RngStream.dice'
+    print(f'roll_many backend: {backend}')
+    print(f'{"roll":>20} {"roll() loop (s)":>16} {"roll_many (s)":>14} {"speedup":>8}')
+    for name, roll in ROLLS.items():
+        loop = time_call(lambda: [roll.roll() for _ in range(args.rolls)])
+        batch = time_call(roll.roll_many, args.rolls)
+        print(f'{name:>20} {loop:>16.3f} {batch:>14.3f} {loop / batch:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
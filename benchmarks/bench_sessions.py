@@ -0,0 +1,60 @@
+"""
+Plays the scenario scripts in benchmarks/scenarios headlessly and reports interactions per second and latency.
+
+    python -m benchmarks.bench_sessions --sessions 200
+    python -m benchmarks.bench_sessions --profile sessions  # also writes sessions.json and sessions.folded
+"""
+import argparse
+import os
+
+from benchmarks.demo_game import build_demo_game
+from engine.contexts.headless_driver import HeadlessDriver, SessionStats
+from engine.utils import profiling
+
+SCENARIO_DIRECTORY = os.path.join(os.path.dirname(__file__), 'scenarios')
+
+
+def load_scenario(path: str) -> list[str]:
+    """
+    One input line per line of the file. Lines starting with # are comments.
+    """
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f if not line.startswith('#')]
+
+
+def load_scenarios() -> dict[str, list[str]]:
+    return {os.path.splitext(file_name)[0]: load_scenario(os.path.join(SCENARIO_DIRECTORY, file_name))
+            for file_name in sorted(os.listdir(SCENARIO_DIRECTORY)) if file_name.endswith('.txt')}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200, help='sessions played per scenario')
+    parser.add_argument('--locations', type=int, default=2000)
+    parser.add_argument('--items', type=int, default=80)
+    parser.add_argument('--profile', help='profile the sessions and write <PROFILE>.json and <PROFILE>.folded')
+    args = parser.parse_args()
+    profiler = profiling.enable_profiling() if args.profile else None
+    print(f'{"scenario":>20} {"interactions":>12} {"per second":>11} {"p50 (us)":>9} {"p95 (us)":>9} '
+          f'{"p99 (us)":>9}')
+    for name, lines in load_scenarios().items():
+        latencies: list[float] = []
+        elapsed = 0.0
+        for _ in range(args.sessions):
+            driver = HeadlessDriver(build_demo_game(n_locations=args.locations, n_items=args.items))
+            session_stats = driver.run_script(lines)
+            latencies += session_stats.latencies
+            elapsed += session_stats.elapsed
+        summary = SessionStats(latencies, elapsed).summary()
+        print(f'{name:>20} {summary["interactions"]:>12} {summary["interactions_per_second"]:>11.0f} '
+              f'{summary["p50"] * 1e6:>9.1f} {summary["p95"] * 1e6:>9.1f} {summary["p99"] * 1e6:>9.1f}')
+    if profiler is not None:
+        profiling.disable_profiling()
+        with open(f'{args.profile}.json', 'w') as f:
+            f.write(profiler.to_json(indent=2))
+        with open(f'{args.profile}.folded', 'w') as f:
+            f.write(profiler.to_collapsed_stacks())
+
+
+if __name__ == '__main__':
+    main()
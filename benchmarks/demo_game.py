@@ -0,0 +1,96 @@
+from engine.contexts.context import Context
+from engine.contexts.dialogue_context import DialogueContext
+from engine.contexts.game_context import GameContext
+from engine.contexts.inventory_context import InventoryContext
+from engine.contexts.map_context import MapContext
+from engine.contexts.open_container_context import OpenContainerContext
+from engine.objects.equipment import Equipment, Weapon
+from engine.objects.equipment_loadout import EquipmentLoadout
+from engine.objects.inventory import Inventory
+from engine.objects.item import Item
+from engine.objects.item_container import ItemContainer
+from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.dialogue_tree import DialogueTree
+from engine.utils.location_tree import LocationTree, map_from_json
+
+from benchmarks.world_generator import generate_world_map
+
+
+def build_dialogue() -> DialogueTree:
+    dialogue_tree = DialogueTree('Welcome, traveller. What brings you here?')
+    dialogue_tree.add_node('work', 'Any work around here?', 'The mill always needs hands.')
+    dialogue_tree.add_node('mill', 'Where is the mill?', 'Down by the river.', from_node='work')
+    dialogue_tree.add_node('pay', 'What does it pay?', 'Two silver a day.', from_node='work_mill')
+    dialogue_tree.add_node('rumours', 'Heard any rumours?', 'Wolves in the hills, they say.')
+    dialogue_tree.add_node('wolves', 'Wolves?', 'Big ones. Stay on the road.', from_node='rumours')
+    dialogue_tree.add_node('bye', 'Farewell.', 'Safe travels.')
+    return dialogue_tree
+
+
+def build_inventory(n_items: int) -> Inventory:
+    inventory = Inventory(equipment_loadout=EquipmentLoadout(['Head', 'Body']), gold=100)
+    for i in range(n_items):
+        inventory.add_to_storage(Item(item_id=f'herb{i}', display_name=f'Herb {i}', stackable=True, stack_size=3,
+                                      max_stack_size=10, item_classification='Herbs'))
+    for i in range(n_items // 4):
+        inventory.add_to_storage(Equipment(item_id=f'cap{i}', display_name=f'Cap {i}', slot_name='Head'))
+    inventory.add_to_storage(Weapon(item_id='sword', display_name='Sword', damage_roll='1d8+1',
+                                    damage_type='slashing'))
+    return inventory
+
+
+def build_chest(n_items: int) -> ItemContainer:
+    return ItemContainer(container_id='chest', display_name='chest', gold_contained=25,
+                         items=[Item(item_id=f'trinket{i}', display_name=f'Trinket {i}') for i in range(n_items)])
+
+
+def build_demo_game(n_locations: int = 2000, n_items: int = 80) -> GameContext:
+    """
+    Builds a fresh game standing in town, whose choices open the map, the inventory, a dialogue and a chest. Used by
+    the scenario scripts in benchmarks/scenarios.
+    :param n_locations: Roughly how many locations the player knows
+    :param n_items: Roughly how many items the player carries
+    """
+    known_locations: LocationTree = map_from_json(generate_world_map(n_locations))
+    player_global_location = known_locations.get_lowest_level_locations()[0][0]
+    game_state = {'encounter_key': 'town', 'player_name': 'Bob', 'npc_name': 'Innkeeper',
+                  'player_global_location': player_global_location,
+                  'inventory': build_inventory(n_items), 'chest': build_chest(n_items // 4)}
+
+    def map_executor(curr_context: Context, parent_context: Context) -> bool:
+        map_context = MapContext(parent_context=curr_context,
+                                 context_data={'map_domain_name': known_locations.get_world_display_name(),
+                                               'player_global_location': game_state['player_global_location'],
+                                               'map_level': 'world', 'map_contained_locations': {}},
+                                 known_locations=known_locations)
+        map_context.context_data = map_context.create_map_context_data('world')
+        return curr_context.enter_child(map_context)
+
+    def inventory_executor(curr_context: Context, parent_context: Context) -> bool:
+        return curr_context.enter_child(InventoryContext(parent_context=curr_context, context_data={'scope': 'top'},
+                                                         inventory=game_state['inventory']))
+
+    def talk_executor(curr_context: Context, parent_context: Context) -> bool:
+        return curr_context.enter_child(DialogueContext(parent_context=curr_context,
+                                                        context_data={'player_name': game_state['player_name'],
+                                                                      'npc_name': game_state['npc_name']},
+                                                        dialogue_tree=build_dialogue()))
+
+    def chest_executor(curr_context: Context, parent_context: Context) -> bool:
+        return curr_context.enter_child(OpenContainerContext(parent_context=curr_context, context_data={},
+                                                             container=game_state['chest'],
+                                                             player_inventory=game_state['inventory']))
+
+    def town_choices(state: dict) -> ChoiceHandler:
+        choice_handler = ChoiceHandler(reserved_choices=[('b', 'Quit')])
+        choice_handler.add_choice(executor=map_executor, display_text='Open map', choice_letter='m')
+        choice_handler.add_choice(executor=inventory_executor, display_text='Inventory', choice_letter='i')
+        choice_handler.add_choice(executor=talk_executor, display_text='Talk to the innkeeper', choice_letter='t')
+        choice_handler.add_choice(executor=chest_executor, display_text='Open the chest', choice_letter='c')
+        return choice_handler
+
+    return GameContext(game_state=game_state,
+                       entry_text_directory={'town': 'You are standing in the town square.'},
+                       entry_text_overrides={},
+                       default_choice_handler_generator=town_choices,
+                       choice_handler_overrides={})
@@ -0,0 +1,31 @@
+from typing import Union
+
+
+def generate_world_map(n_locations: int, localities_per_region: int = 20,
+                       locations_per_locality: int = 50) -> dict[str, Union[str, dict]]:
+    """
+    Generates map data in the format read by map_from_json, with roughly n_locations lowest-level locations.
+    :param n_locations: Total number of lowest-level locations to generate
+    :param localities_per_region: Number of localities in each region
+    :param locations_per_locality: Number of lowest-level locations (entrypoint included) in each locality
+    :return: dict
+    """
+    n_localities = max(1, n_locations // locations_per_locality)
+    n_regions = max(1, -(-n_localities // localities_per_region))
+    map_json = {'world_name': 'Benchmark World', 'regions': {}}
+    locality_count = 0
+    for r in range(n_regions):
+        localities = {}
+        for l in range(localities_per_region):
+            if locality_count == n_localities:
+                break
+            locality_count += 1
+            localities[f'l{l}'] = {
+                'display_name': f'Locality {l}',
+                'locations': {'entrypoint': 'p0',
+                              'entrypoint_display_name': 'Place 0',
+                              'other_locations': {f'p{p}': {'display_name': f'Place {p}'}
+                                                  for p in range(1, locations_per_locality)}}
+            }
+        map_json['regions'][f'r{r}'] = {'display_name': f'Region {r}', 'localities': localities}
+    return map_json
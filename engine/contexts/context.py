@@ -1,4 +1,9 @@
+from typing import Hashable, Union
+from engine.contexts.context_stack import ContextStack, ExecutorResult, Pop, Push, Replace, Stay, Transition
 from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.profiling import count, measure
+from engine.utils.line_source import AsyncLineSource, InputSource, get_default_input_source
+from engine.utils.render import FrameBuffer, OutputSink, get_default_sink
 
 
 class Context:
@@ -13,6 +18,14 @@ class Context:
         self.context_type: str = context_type
         self.context_data: dict = context_data
         self.entry_text: str = ''
+        # bumped by invalidate_choices, so that a cached ChoiceHandler is rebuilt even if the fingerprint is unchanged
+        self._choice_version: int = 0
+        # ((choice version, state fingerprint), ChoiceHandler built for them)
+        self._cached_choice_handling: Union[tuple[tuple[int, Hashable], ChoiceHandler], None] = None
+        self._output_sink: Union[OutputSink, None] = None
+        self._input_source: Union[InputSource, None] = None
+        # set by the ContextStack running this context while it runs asynchronously
+        self._line_source: Union[AsyncLineSource, None] = None
 
     def get_context_type(self) -> str:
         return self.context_type
@@ -26,8 +39,98 @@ class Context:
     def get_parent_context_data(self) -> dict:
         return self._parent_context.get_context_data() if self._parent_context is not None else {}
 
+    def get_output_sink(self) -> OutputSink:
+        """
+        :return: This context's sink if it has one, otherwise the nearest ancestor's, otherwise the default sink
+        """
+        context = self
+        while context is not None:
+            if context._output_sink is not None:
+                return context._output_sink
+            context = context._parent_context
+        return get_default_sink()
+
+    def set_output_sink(self, sink: Union[OutputSink, None]) -> None:
+        """
+        Sends this context's output, and that of contexts entered from it, to sink. None inherits it again.
+        """
+        self._output_sink = sink
+
+    def output(self, text: str) -> None:
+        """
+        Writes text and a newline to this context's sink. Contexts and their executors use this instead of print.
+        """
+        self.get_output_sink().write(f'{text}\n')
+
+    def get_input_source(self) -> InputSource:
+        """
+        :return: This context's input source if it has one, otherwise the nearest ancestor's, otherwise the default
+        """
+        context = self
+        while context is not None:
+            if context._input_source is not None:
+                return context._input_source
+            context = context._parent_context
+        return get_default_input_source()
+
+    def set_input_source(self, input_source: Union[InputSource, None]) -> None:
+        """
+        Reads this context's input, and that of contexts entered from it, from input_source. None inherits it again.
+        """
+        self._input_source = input_source
+
+    def prompt(self, text: str = '') -> str:
+        """
+        Writes text, if any, without a newline, then reads a line of input. Contexts and their executors use this
+        instead of input in the synchronous loop.
+        """
+        if text:
+            self.get_output_sink().write(text)
+        return self.get_input_source().read_line()
+
+    async def prompt_async(self, text: str = '') -> str:
+        """
+        Like prompt, but reads from the async line source while enter_async runs. Executors that ask for input of
+        their own should be coroutine functions awaiting this, so that they work in both loops.
+        """
+        if self._line_source is None:
+            return self.prompt(text)
+        if text:
+            self.get_output_sink().write(text)
+        return await self._line_source.read_line()
+
+    def enter_child(self, child_context: 'Context', result: bool = False) -> Transition:
+        """
+        Enters child_context from an executor of this context. Executors should return what this returns.
+        :param child_context: The context to enter
+        :param result: Whether this context exits once child_context does
+        :return: The transition that enters child_context
+        """
+        return Replace(child_context) if result else Push(child_context)
+
+    def get_root_context(self) -> 'Context':
+        context = self
+        while context._parent_context is not None:
+            context = context._parent_context
+        return context
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # cached executors are usually closures, and sinks and sources belong to the process running the session
+        state['_cached_choice_handling'] = None
+        state['_output_sink'] = None
+        state['_input_source'] = None
+        state['_line_source'] = None
+        return state
+
+    def get_entry_text(self) -> str:
+        """
+        Can be overridden in subclasses of Context whose entry text depends on their state.
+        """
+        return self.entry_text
+
     def print_entry_text(self) -> None:
-        print(self.entry_text)
+        self.output(self.get_entry_text())
 
     def _generate_choice_handling(self) -> ChoiceHandler:
         """
@@ -39,38 +142,104 @@ class Context:
         """
         return ChoiceHandler()
 
-    def _handle_choice(self, choice: str, choice_handler: ChoiceHandler) -> bool:
+    def get_state_fingerprint(self) -> Union[Hashable, None]:
+        """
+        Can be overridden in subclasses of Context to let the ChoiceHandler be reused between turns. It should cheaply
+        return a hashable value that changes whenever _generate_choice_handling would produce different choices, such
+        as a version counter of the objects the choices are built from. Changes it cannot see should be reported with
+        invalidate_choices.
+        :return: The fingerprint, or None to build the ChoiceHandler afresh every turn
+        """
+        return None
+
+    def invalidate_choices(self) -> None:
+        """
+        Makes the next turn build a new ChoiceHandler, for changes that get_state_fingerprint does not track.
+        """
+        self._choice_version += 1
+
+    def _get_choice_handling(self) -> ChoiceHandler:
+        fingerprint = self.get_state_fingerprint()
+        if fingerprint is None:
+            with measure(self.context_type, 'generate'):
+                return self._generate_choice_handling()
+        key = (self._choice_version, fingerprint)
+        if self._cached_choice_handling is None or self._cached_choice_handling[0] != key:
+            count('choice_cache_miss')
+            with measure(self.context_type, 'generate'):
+                self._cached_choice_handling = (key, self._generate_choice_handling())
+        else:
+            count('choice_cache_hit')
+        return self._cached_choice_handling[1]
+
+    def _handle_choice(self, choice: str, choice_handler: ChoiceHandler) -> ExecutorResult:
         func = choice_handler.get_executor(choice)
-        return func(self, self._parent_context)
+        with measure(self.context_type, 'executor'):
+            return func(self, self._parent_context)
 
     def print_choices(self, choice_handler: ChoiceHandler) -> None:
         """
         Prints the choices
         :return:
         """
-        choice_handler.print_choices()
+        self.get_output_sink().write(''.join(f'{line}\n' for line in choice_handler.get_choice_lines()))
+
+    def render_frame(self, choice_handler: ChoiceHandler) -> str:
+        """
+        :return: The whole screen shown on each turn: the entry text, then the choices
+        """
+        frame = FrameBuffer()
+        frame.add_line(self.get_entry_text())
+        frame.add_line('\n\n')
+        frame.add_lines(choice_handler.get_choice_lines())
+        return frame.render()
+
+    def on_enter(self) -> None:
+        """
+        Can be overridden in subclasses of Context. Called when the context is entered, before its first turn.
+        """
+        pass
+
+    def on_exit(self) -> None:
+        """
+        Can be overridden in subclasses of Context. Called when the context is exited.
+        """
+        pass
+
+    def render_turn(self, choice_handler: ChoiceHandler) -> str:
+        """
+        Can be overridden in subclasses of Context that do not show choices.
+        :return: What is written at the start of a turn
+        """
+        return self.render_frame(choice_handler)
+
+    def handle_line(self, line: str, choice_handler: ChoiceHandler, exit_choice: str = 'b') -> Union[Transition, bool]:
+        """
+        Handles a line of input read on this context's turn.
+        :return: What the chosen executor returns, which may be an awaitable, or the transition for the line
+        """
+        choice_input = line.lower().strip()
+        if choice_input == exit_choice:
+            return Pop(result=False)
+        if choice_handler.has_choice(choice_input):
+            return self._handle_choice(choice=choice_input, choice_handler=choice_handler)
+        self.output('Input not recognized.')
+        return Stay(redraw=False)
 
     def enter(self, exit_choice: str = 'b') -> bool:
         """
-        Main loop of the context. Always called when a context is entered.
+        Main loop of the context. Always called when a context is entered. Runs a ContextStack holding this context,
+        so contexts entered from it with enter_child run in the same loop.
+        :return: True unless exit_choice is chosen
+        """
+        return ContextStack(self, exit_choice).run()
+
+    async def enter_async(self, line_source: AsyncLineSource, exit_choice: str = 'b') -> bool:
+        """
+        Main loop of the context, reading input from line_source. Awaiting input suspends only this session, so one
+        event loop can host many. Executors may be coroutine functions awaiting prompt_async. Synchronous code that
+        enters contexts itself can be run with engine.utils.line_source.run_sync_context instead.
+        :raises EOFError: if line_source runs out
         :return: True unless exit_choice is chosen
         """
-        exit_loop = False
-        choice_handler = self._generate_choice_handling()
-        rerun_entry = True
-        while not exit_loop:
-            if rerun_entry:
-                choice_handler = self._generate_choice_handling()
-                self.print_entry_text()
-                print('\n\n')
-                self.print_choices(choice_handler)
-            choice_input = input().lower().strip()
-            if choice_input == exit_choice:
-                return False
-            if choice_input in choice_handler.get_choice_strings():
-                exit_loop = self._handle_choice(choice=choice_input, choice_handler=choice_handler)
-                rerun_entry = True
-            else:
-                print('Input not recognized.')
-                rerun_entry = False
-        return True
+        return await ContextStack(self, exit_choice).run_async(line_source)
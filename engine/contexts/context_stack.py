@@ -0,0 +1,274 @@
+import inspect
+import pickle
+from typing import Awaitable, Union
+
+from engine.utils.line_source import AsyncLineSource, InputSource
+from engine.utils.profiling import measure
+
+
+class Transition:
+    """
+    What an executor asks the ContextStack to do once it has run. Executors may also return True, which is Pop(), or
+    False, which is Stay().
+    """
+    pass
+
+
+class Stay(Transition):
+    """
+    Keeps the current context on top.
+    :param redraw (bool): Whether to render the context again before reading the next line
+    """
+
+    def __init__(self, redraw: bool = True):
+        self.redraw: bool = redraw
+
+
+class Push(Transition):
+    """
+    Enters context on top of the current one, which resumes when context exits.
+    """
+
+    def __init__(self, context, exit_choice: str = 'b'):
+        self.context = context
+        self.exit_choice: str = exit_choice
+
+
+class Pop(Transition):
+    """
+    Exits the current context.
+    :param result (bool): What Context.enter returns if this exits the bottom context
+    """
+
+    def __init__(self, result: bool = True):
+        self.result: bool = result
+
+
+class Replace(Transition):
+    """
+    Exits the current context and enters context in its place.
+    """
+
+    def __init__(self, context, exit_choice: str = 'b'):
+        self.context = context
+        self.exit_choice: str = exit_choice
+
+
+# what an executor returns: a Transition, or True for Pop() and False for Stay()
+ExecutorResult = Union[Transition, bool]
+
+
+def _run_to_completion(awaitable: Awaitable):
+    """
+    Runs an awaitable returned by an executor during the synchronous loop. Without an async line source, awaiting a
+    context's prompts never suspends, so the awaitable finishes on its first step.
+    """
+    steps = awaitable.__await__()
+    try:
+        steps.send(None)
+    except StopIteration as stop:
+        return stop.value
+    steps.close()
+    raise RuntimeError('Executor awaited something other than its context in a synchronous loop. Use enter_async.')
+
+
+def _as_transition(result: Union[Transition, bool, None]) -> Transition:
+    if isinstance(result, Transition):
+        return result
+    if result is True:
+        return Pop()
+    if result is False or result is None:
+        return Stay()
+    raise ValueError(f'Executor returned {result!r}, which is not a transition.')
+
+
+class _StackFrame:
+    """
+    A context on the stack and the state of its loop.
+    """
+
+    def __init__(self, context, exit_choice: str):
+        self.context = context
+        self.exit_choice: str = exit_choice
+        self.redraw: bool = True
+        self.choice_handler = None
+
+    def __getstate__(self) -> dict:
+        # the choice handler holds executors, which are usually closures; it is rebuilt on the next redraw
+        return {'context': self.context, 'exit_choice': self.exit_choice}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state['context'], state['exit_choice'])
+
+
+class ContextStack:
+    """
+    Runs contexts iteratively. Each turn the top context is rendered, a line is read and handled, and the transition
+    its executor returns is applied to the stack, so navigating deeper costs a stack entry rather than Python frames.
+    Context.enter and Context.enter_async run a ContextStack holding that context.
+
+    A stack waiting for input can be saved with snapshot and resumed, in another process, with ContextStack.restore.
+    :param root_context (Context): If given, pushed as the bottom context
+    :param exit_choice (str): Exit choice of root_context
+    """
+
+    def __init__(self, root_context=None, exit_choice: str = 'b'):
+        self._frames: list[_StackFrame] = []
+        self._result: bool = True
+        # set while run_async runs, and handed to the contexts on the stack for their prompt_async
+        self._line_source: Union[AsyncLineSource, None] = None
+        if root_context is not None:
+            self.push(root_context, exit_choice)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get_top(self):
+        """
+        :return: The context on top, or None if the stack is empty
+        """
+        return self._frames[-1].context if self._frames else None
+
+    def get_contexts(self) -> list:
+        """
+        :return: The contexts on the stack, bottom first
+        """
+        return [frame.context for frame in self._frames]
+
+    def push(self, context, exit_choice: str = 'b') -> None:
+        if self._frames:
+            self._frames[-1].redraw = True
+        self._frames.append(_StackFrame(context, exit_choice))
+        context._line_source = self._line_source
+        context.on_enter()
+
+    def pop(self, result: bool = True):
+        """
+        :param result: What run returns if this empties the stack
+        :return: The context popped
+        """
+        if not self._frames:
+            raise ValueError('Context stack is empty.')
+        context = self._frames.pop().context
+        context.on_exit()
+        context._line_source = None
+        if self._frames:
+            self._frames[-1].redraw = True
+        else:
+            self._result = result
+        return context
+
+    def replace(self, context, exit_choice: str = 'b'):
+        """
+        :return: The context replaced
+        """
+        if not self._frames:
+            raise ValueError('Context stack is empty.')
+        old_context = self.pop()
+        self.push(context, exit_choice)
+        return old_context
+
+    def apply(self, transition: Union[Transition, bool, None]) -> None:
+        transition = _as_transition(transition)
+        if isinstance(transition, Stay):
+            if transition.redraw:
+                self._frames[-1].redraw = True
+        elif isinstance(transition, Push):
+            self.push(transition.context, transition.exit_choice)
+        elif isinstance(transition, Pop):
+            self.pop(transition.result)
+        elif isinstance(transition, Replace):
+            self.replace(transition.context, transition.exit_choice)
+        else:
+            raise ValueError(f'Unknown transition {type(transition).__name__}.')
+
+    def render(self) -> None:
+        """
+        Writes the top context's frame, unless it is still on screen.
+        """
+        frame = self._frames[-1]
+        if frame.redraw or frame.choice_handler is None:
+            with measure(frame.context.context_type, 'render'):
+                frame.choice_handler = frame.context._get_choice_handling()
+                frame.context.get_output_sink().write(frame.context.render_turn(frame.choice_handler))
+            frame.redraw = False
+
+    def _handle_line(self, line: str):
+        frame = self._frames[-1]
+        with measure(frame.context.context_type, 'dispatch'):
+            return frame.context.handle_line(line, frame.choice_handler, frame.exit_choice)
+
+    def feed(self, line: str) -> bool:
+        """
+        Renders the top context if needed and handles one line of input with it, for callers that read input
+        themselves. Lines that executors prompt for are read from the top context's input source.
+        :return: Whether any context is left on the stack
+        """
+        self.render()
+        result = self._handle_line(line)
+        if inspect.isawaitable(result):
+            result = _run_to_completion(result)
+        self.apply(result)
+        return bool(self._frames)
+
+    def run(self) -> bool:
+        """
+        Runs until the stack is empty, reading input through the top context's prompt.
+        :return: True unless the bottom context was left with its exit choice
+        """
+        while self._frames:
+            self.render()
+            result = self._handle_line(self._frames[-1].context.prompt())
+            if inspect.isawaitable(result):
+                result = _run_to_completion(result)
+            self.apply(result)
+        return self._result
+
+    async def run_async(self, line_source: AsyncLineSource) -> bool:
+        """
+        Like run, but awaits input from line_source, and awaits executors that return awaitables.
+        :raises EOFError: if line_source runs out
+        """
+        previous_line_source = self._line_source
+        self._set_line_source(line_source)
+        try:
+            while self._frames:
+                self.render()
+                result = self._handle_line(await line_source.read_line())
+                if inspect.isawaitable(result):
+                    result = await result
+                self.apply(result)
+            return self._result
+        finally:
+            self._set_line_source(previous_line_source)
+
+    def _set_line_source(self, line_source: Union[AsyncLineSource, None]) -> None:
+        self._line_source = line_source
+        for frame in self._frames:
+            frame.context._line_source = line_source
+
+    def snapshot(self) -> bytes:
+        """
+        Saves the stack between turns. Contexts are pickled without their cached choices, sinks and input sources,
+        so their data, and anything they refer to, must be picklable.
+        """
+        if self._line_source is not None:
+            raise ValueError('Cannot snapshot a stack while run_async is running it.')
+        return pickle.dumps(self._frames)
+
+    @classmethod
+    def restore(cls, snapshot: bytes, output_sink=None, input_source: InputSource = None) -> 'ContextStack':
+        """
+        :param snapshot: What snapshot returned
+        :param output_sink (OutputSink): Given to the root ancestor of each context on the stack
+        :param input_source: Given to the root ancestor of each context on the stack
+        """
+        stack = cls()
+        stack._frames = pickle.loads(snapshot)
+        for frame in stack._frames:
+            root_context = frame.context.get_root_context()
+            if output_sink is not None:
+                root_context.set_output_sink(output_sink)
+            if input_source is not None:
+                root_context.set_input_source(input_source)
+        return stack
@@ -1,26 +1,59 @@
 from engine.contexts.context import Context
+from engine.contexts.context_stack import ExecutorResult
+from engine.utils.dialogue_repository import DialogueRepository
 from engine.utils.dialogue_tree import DialogueTree
 from engine.utils.choice_handler import ChoiceHandler
-from typing import Callable
+from typing import Callable, Union
 
 
 class DialogueContext(Context):
-    def __init__(self, parent_context: Context, context_data: dict, dialogue_tree: DialogueTree,
-                 curr_node: str = ''):
+    """
+    :param dialogue_tree (DialogueTree): The NPC's dialogue. Leave out to load it from dialogue_repository when the
+    context is entered.
+    :param dialogue_repository (DialogueRepository): Where to load the dialogue of npc_id from
+    :param npc_id (str): The NPC whose dialogue to load from dialogue_repository
+    """
+    def __init__(self, parent_context: Context, context_data: dict, dialogue_tree: DialogueTree = None,
+                 curr_node: str = '', dialogue_repository: DialogueRepository = None, npc_id: str = None):
         super().__init__(parent_context=parent_context,
                          context_type='dialogue',
                          context_data=context_data)
-        self.dialogue_tree: DialogueTree = dialogue_tree
-        self.dialogue_tree.update_current_node(curr_node)
+        if dialogue_tree is None and (dialogue_repository is None or npc_id is None):
+            raise ValueError('Either a dialogue tree or a dialogue repository and NPC id is required.')
+        self.dialogue_tree: Union[DialogueTree, None] = None
+        self.dialogue_repository: Union[DialogueRepository, None] = dialogue_repository
+        self.npc_id: Union[str, None] = npc_id
+        self.curr_node: str = curr_node
+        # whether the dialogue is loaded from the repository on every entry, rather than given
+        self._loads_dialogue: bool = dialogue_tree is None
         self.player_name = context_data['player_name']
         self.npc_name = context_data['npc_name']
+        if dialogue_tree is not None:
+            self._start_dialogue(dialogue_tree)
+
+    def _start_dialogue(self, dialogue_tree: DialogueTree) -> None:
+        self.dialogue_tree = dialogue_tree
+        self.invalidate_choices()
+        self.dialogue_tree.update_current_node(self.curr_node)
         self.entry_text = self.dialogue_tree.get_current_text(player_name=self.player_name,
                                                               npc_name=self.npc_name)
 
+    def on_enter(self) -> None:
+        if self.dialogue_tree is None:
+            self._start_dialogue(self.dialogue_repository.get_dialogue(self.npc_id))
+
+    def on_exit(self) -> None:
+        if self._loads_dialogue:
+            # let the repository evict the dialogue once nothing is talking to this NPC
+            self.dialogue_tree = None
+
+    def get_state_fingerprint(self) -> tuple[str, int]:
+        return self.dialogue_tree.get_current_node(), self.dialogue_tree.get_version()
+
     def _generate_choice_handling(self) -> ChoiceHandler:
         choice_handler = ChoiceHandler()
         if self.dialogue_tree.is_at_terminal_node():
-            def terminate_dialogue(c1: Context, c2: Context) -> bool:
+            def terminate_dialogue(c1: Context, c2: Context) -> ExecutorResult:
                 return True
 
             choice_handler.add_choice(executor=terminate_dialogue,
@@ -29,8 +62,8 @@ class DialogueContext(Context):
 
         available_nodes = self.dialogue_tree.get_available_nodes()
 
-        def make_choice_executor(node: str) -> Callable[[DialogueContext, Context], bool]:
-            def dialogue_choice_executor(current_context: DialogueContext, parent_context: Context) -> bool:
+        def make_choice_executor(node: str) -> Callable[[DialogueContext, Context], ExecutorResult]:
+            def dialogue_choice_executor(current_context: DialogueContext, parent_context: Context) -> ExecutorResult:
                 current_context.dialogue_tree.update_current_node(node)
                 current_context.entry_text = current_context.dialogue_tree.get_current_text(player_name=current_context.player_name,
                                                                                             npc_name=current_context.npc_name)
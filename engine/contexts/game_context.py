@@ -20,13 +20,13 @@ class GameContext(Context):
         self.default_choice_handler_generator = default_choice_handler_generator
         self.choice_handler_overrides = choice_handler_overrides
 
-    def print_entry_text(self) -> None:
+    def get_entry_text(self) -> str:
         game_state = self.context_data
         encounter_key = game_state['encounter_key']
         if encounter_key in self.entry_text_overrides:
-            print(self.entry_text_overrides[encounter_key])
+            return self.entry_text_overrides[encounter_key]
         else:
-            print(self.entry_text_directory[encounter_key])
+            return self.entry_text_directory[encounter_key]
 
     def _generate_choice_handling(self) -> ChoiceHandler:
         game_state = self.context_data
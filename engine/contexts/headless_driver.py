@@ -0,0 +1,86 @@
+import time
+from typing import Iterable
+
+from engine.contexts.context import Context
+from engine.contexts.context_stack import ContextStack
+from engine.utils.line_source import ScriptedInputSource
+from engine.utils.render import MemorySink
+
+
+class SessionStats:
+    """
+    Timings of a scripted session. An interaction is one line of the script handled by the context on top, together
+    with any lines its executor prompts for and the rendering of the next frame.
+    :param latencies (list[float]): Seconds taken by each interaction, in order
+    :param elapsed (float): Seconds taken by the whole session, first frame included
+    """
+
+    def __init__(self, latencies: list[float], elapsed: float):
+        self.latencies: list[float] = latencies
+        self.elapsed: float = elapsed
+        self._sorted_latencies: list[float] = sorted(latencies)
+
+    def get_interaction_count(self) -> int:
+        return len(self.latencies)
+
+    def get_interactions_per_second(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def get_latency_percentile(self, percentile: float) -> float:
+        """
+        :param percentile: Between 0 and 100
+        :return: The latency, in seconds, that percentile percent of interactions did not exceed (nearest rank)
+        """
+        if not 0 <= percentile <= 100:
+            raise ValueError('Percentile must be between 0 and 100.')
+        if not self._sorted_latencies:
+            raise ValueError('No interactions recorded.')
+        rank = max(1, -(-len(self._sorted_latencies) * percentile // 100))
+        return self._sorted_latencies[int(rank) - 1]
+
+    def summary(self) -> dict[str, float]:
+        return {'interactions': self.get_interaction_count(),
+                'elapsed': self.elapsed,
+                'interactions_per_second': self.get_interactions_per_second(),
+                'p50': self.get_latency_percentile(50),
+                'p95': self.get_latency_percentile(95),
+                'p99': self.get_latency_percentile(99)}
+
+
+class HeadlessDriver:
+    """
+    Plays a scripted session against a context, usually a GameContext, with output kept in memory.
+    :param root_context (Context): The context the session starts in. Its output sink and input source are replaced.
+    :param exit_choice (str): Exit choice of root_context
+    """
+
+    def __init__(self, root_context: Context, exit_choice: str = 'b'):
+        self.root_context: Context = root_context
+        self.exit_choice: str = exit_choice
+        self.output_sink: MemorySink = MemorySink()
+
+    def get_output(self) -> str:
+        return self.output_sink.get_output()
+
+    def run_script(self, lines: Iterable[str]) -> SessionStats:
+        """
+        Enters root_context and handles the lines until they run out or root_context exits. Lines that executors
+        prompt for are taken from the script too.
+        """
+        input_source = ScriptedInputSource(lines)
+        self.root_context.set_output_sink(self.output_sink)
+        self.root_context.set_input_source(input_source)
+        latencies: list[float] = []
+        start = time.perf_counter()
+        stack = ContextStack(self.root_context, self.exit_choice)
+        stack.render()
+        while len(stack):
+            try:
+                line = input_source.read_line()
+            except EOFError:
+                break
+            interaction_start = time.perf_counter()
+            if stack.feed(line):
+                stack.render()
+            latencies.append(time.perf_counter() - interaction_start)
+        return SessionStats(latencies, time.perf_counter() - start)
@@ -1,11 +1,15 @@
-from copy import deepcopy
 from typing import Callable
 from engine.objects.item import Item
 from engine.objects.equipment import Equipment
 from engine.contexts.context import Context
+from engine.contexts.context_stack import ExecutorResult
 from engine.contexts.popup_context import PopupContext
 from engine.objects.inventory import Inventory
 from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.layered_data import LayeredDict
+
+# number of stored items listed per page
+STORAGE_PAGE_SIZE = 20
 
 
 class InventoryContext(Context):
@@ -14,6 +18,8 @@ class InventoryContext(Context):
     context_data['required_tags'] = {<tag categories>: [tags]}
     context_data['forbidden_tags'] = {<tag categories>: [tags]}
     tag categories must match equipment_classification property exactly
+    Contexts entered from this one get a LayeredDict over context_data rather than a copy, so context_data must not
+    be changed once they have been entered.
     """
 
     def __init__(self,
@@ -25,7 +31,7 @@ class InventoryContext(Context):
                          context_data=context_data)
         self.inventory: Inventory = inventory
 
-    def print_entry_text(self) -> None:
+    def get_entry_text(self) -> str:
         # TODO: Make sure every scope is included
         scope = self.get_context_data()['scope']
         if scope == 'top':
@@ -37,23 +43,27 @@ class InventoryContext(Context):
         elif scope.startswith('storage: '):
             self.entry_text = scope.split(': ', maxsplit=1)[1]
 
-        print(self.entry_text)
+        return self.entry_text
+
+    def get_state_fingerprint(self) -> tuple[str, int]:
+        return self.get_context_data()['scope'], self.inventory.get_version()
 
     def _generate_choice_handling(self) -> ChoiceHandler:
         scope = self.get_context_data()['scope']
-        choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
+        if scope.startswith('storage: '):
+            choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')], page_size=STORAGE_PAGE_SIZE)
+        else:
+            choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
         # TODO: Make sure every scope is included
         if scope == 'top':
-            def make_executor(choice: str) -> Callable:
-                def executor(curr_context: InventoryContext, parent_context: Context) -> bool:
-                    new_scope = 'equipment' if choice == 'e' else 'storage'
-                    new_context_data = deepcopy(curr_context.get_context_data())
-                    new_context_data['scope'] = new_scope
+            def make_executor(choice: str) -> Callable[..., ExecutorResult]:
+                def executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
+                    new_scope = 'equipment' if choice == 'e' else 'storage-top'
+                    new_context_data = LayeredDict(curr_context.get_context_data(), {'scope': new_scope})
                     new_context = InventoryContext(parent_context=parent_context,
                                                    context_data=new_context_data,
                                                    inventory=curr_context.inventory)
-                    new_context.enter()
-                    return False
+                    return curr_context.enter_child(new_context)
 
                 return executor
 
@@ -65,19 +75,18 @@ class InventoryContext(Context):
                                       choice_letter='s')
         elif scope == 'equipment':
 
-            def empty_slot_executor(*args):
-                print('Slot is empty.')
+            def empty_slot_executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
+                curr_context.output('Slot is empty.')
                 return False
 
-            def make_item_executor(equipment: Equipment) -> Callable:
-                def item_executor(curr_context: InventoryContext, parent_context: Context) -> bool:
+            def make_item_executor(equipment: Equipment) -> Callable[..., ExecutorResult]:
+                def item_executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
                     item_description_context = ItemDescriptionPage(parent_context=parent_context,
                                                                    context_data=curr_context.get_context_data(),
                                                                    item=equipment,
                                                                    currently_equipped=True,
                                                                    inventory=curr_context.inventory)
-                    item_description_context.enter()
-                    return False
+                    return curr_context.enter_child(item_description_context)
                 return item_executor
 
             slot_names = self.inventory.equipment_loadout.get_slot_names()
@@ -93,24 +102,21 @@ class InventoryContext(Context):
         elif scope == 'storage-top':
             item_categories: list[str] = self.inventory.get_all_classifications()
 
-            def equipment_executor(curr_context: InventoryContext, parent_context: Context) -> bool:
-                new_context_data = deepcopy(curr_context.get_context_data())
-                new_context_data['scope'] = 'storage: Equipment'
+            def equipment_executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
+                new_context_data = LayeredDict(curr_context.get_context_data(), {'scope': 'storage: Equipment'})
                 new_context = InventoryContext(parent_context=parent_context,
                                                context_data=new_context_data,
                                                inventory=curr_context.inventory)
-                new_context.enter()
-                return False
+                return curr_context.enter_child(new_context)
 
-            def make_category_executor(classification: str) -> Callable[[InventoryContext, Context], bool]:
-                def other_category_executor(curr_context: InventoryContext, parent_context: Context) -> bool:
-                    new_context_data = deepcopy(curr_context.get_context_data())
-                    new_context_data['scope'] = f'storage: {classification}'
+            def make_category_executor(classification: str) -> Callable[[InventoryContext, Context], ExecutorResult]:
+                def other_category_executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
+                    new_context_data = LayeredDict(curr_context.get_context_data(),
+                                                   {'scope': f'storage: {classification}'})
                     new_context = InventoryContext(parent_context=parent_context,
                                                    context_data=new_context_data,
                                                    inventory=curr_context.inventory)
-                    new_context.enter()
-                    return False
+                    return curr_context.enter_child(new_context)
                 return other_category_executor
             if 'Equipment' in item_categories:
                 choice_handler.add_choice(executor=equipment_executor,
@@ -124,25 +130,24 @@ class InventoryContext(Context):
                                       choice_letter='a')
         elif scope.startswith('storage: '):
             # TODO: Write this
-            def make_item_desc_executor(itm: Item) -> Callable:
-                def item_desc_executor(curr_context: InventoryContext, parent_context: Context) -> bool:
-                    new_context_data = deepcopy(curr_context.get_context_data())
+            def make_item_desc_executor(itm: Item) -> Callable[..., ExecutorResult]:
+                def item_desc_executor(curr_context: InventoryContext, parent_context: Context) -> ExecutorResult:
+                    new_context_data = LayeredDict(curr_context.get_context_data())
                     item_desc_context = ItemDescriptionPage(parent_context=parent_context,
                                                             context_data=new_context_data,
                                                             inventory=curr_context.inventory,
                                                             item=itm,
                                                             currently_equipped=False)
-                    item_desc_context.enter()
-                    return False
+                    return curr_context.enter_child(item_desc_context)
                 return item_desc_executor
             item_classification = scope.split(': ', maxsplit=1)[1]
             if item_classification != 'All':
-                all_items_of_classification = self.inventory.get_all_of_classification(item_classification)
+                all_items_of_classification = self.inventory.iter_all_of_classification(item_classification)
             else:
                 all_items_of_classification = self.inventory.items_in_storage
-            for item in all_items_of_classification:
-                choice_handler.add_choice(executor=make_item_desc_executor(item),
-                                          display_text=item.get_display_name(include_stack_size=True))
+            choice_handler.add_lazy_choices(items=all_items_of_classification,
+                                            display_text=lambda itm: itm.get_display_name(include_stack_size=True),
+                                            make_executor=make_item_desc_executor)
         return choice_handler
 
 
@@ -157,63 +162,66 @@ class ItemDescriptionPage(Context):
         self.entry_text = item.get_description_for_display()
         self.inventory = inventory
 
+    def get_state_fingerprint(self) -> int:
+        return self.inventory.get_version()
+
     def _generate_choice_handling(self) -> ChoiceHandler:
         choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
 
         def unequip_executor(curr_context: ItemDescriptionPage,
-                             parent_context: Context) -> bool:
+                             parent_context: Context) -> ExecutorResult:
             assert isinstance(curr_context.item, Equipment)
             curr_context.inventory.unequip_into_storage(curr_context.item)
-            print(f'{curr_context.item.get_display_name()} unequipped.')
+            curr_context.output(f'{curr_context.item.get_display_name()} unequipped.')
             return True
 
         def equip_executor(curr_context: ItemDescriptionPage,
-                           parent_context: Context) -> bool:
+                           parent_context: Context) -> ExecutorResult:
             assert isinstance(curr_context.item, Equipment)
             required_tags: list[str] = curr_context.get_context_data().get('required_tags', {}).get(curr_context.item.get_equipment_classification(), [])
             forbidden_tags: list[str] = curr_context.get_context_data().get('forbidden_tags', {}).get(curr_context.item.get_equipment_classification(), [])
             if (any([curr_context.item.has_tag(t) for t in forbidden_tags])
                     or not all([curr_context.item.has_tag(t) for t in required_tags])):
-                print('THIS ITEM CANNOT BE EQUIPPED BY YOU.')
+                curr_context.output('THIS ITEM CANNOT BE EQUIPPED BY YOU.')
                 return False
             if curr_context.item.get_slot() == 'Off-hand' and curr_context.inventory.equipment_loadout.two_handed_equipped():
-                print('Cannot equip off-hand item when two-handed weapon is equipped.')
+                curr_context.output('Cannot equip off-hand item when two-handed weapon is equipped.')
                 return False
             curr_context.inventory.equip_from_storage(curr_context.item)
-            print(f'{curr_context.item.get_display_name()} equipped.')
+            curr_context.output(f'{curr_context.item.get_display_name()} equipped.')
             return True
 
-        def drop_executor(curr_context: ItemDescriptionPage,
-                          parent_context: Context) -> bool:
+        async def drop_executor(curr_context: ItemDescriptionPage,
+                                parent_context: Context) -> ExecutorResult:
             if curr_context.item.is_quest_item():
-                print('YOU CANNOT DROP THIS ITEM.')
+                curr_context.output('YOU CANNOT DROP THIS ITEM.')
                 return False
             player_input = ''
             while player_input.strip().lower() not in ('y', 'n'):
-                player_input = input('Are you sure you want to drop this item? It may disappear permanently. (y/n)')
+                player_input = await curr_context.prompt_async('Are you sure you want to drop this item? It may disappear permanently. (y/n)')
             if player_input.strip().lower() == 'y':
                 if curr_context.item.is_stackable() and curr_context.item.get_stack_size() > 1:
                     while not player_input.strip().isnumeric():
-                        player_input = input('Drop how many?')
+                        player_input = await curr_context.prompt_async('Drop how many?')
                         if not player_input.strip().isnumeric():
-                            print('Invalid input')
+                            curr_context.output('Invalid input')
                         elif int(player_input.strip()) <= 0:
-                            print('Invalid quantity')
+                            curr_context.output('Invalid quantity')
                             player_input = ''
                     stack_size = curr_context.item.get_stack_size()
                     quantity_to_drop = min(stack_size, int(player_input))
                     curr_context.inventory.remove_from_storage(curr_context.item.get_id(), quantity_to_drop)
-                    print(f'{curr_context.item.get_display_name()} ({quantity_to_drop}) dropped.')
+                    curr_context.output(f'{curr_context.item.get_display_name()} ({quantity_to_drop}) dropped.')
                     return True
                 else:
                     curr_context.inventory.remove_from_storage(curr_context.item.get_id())
-                    print(f'{curr_context.item.get_display_name()} dropped.')
+                    curr_context.output(f'{curr_context.item.get_display_name()} dropped.')
                     return True
             else:
                 return False
 
         def consume_executor(curr_context: ItemDescriptionPage,
-                             parent_context: Context) -> bool:
+                             parent_context: Context) -> ExecutorResult:
             assert curr_context.item.is_consumable()
             if curr_context.item_currently_equipped:
                 assert isinstance(curr_context.item, Equipment)
@@ -221,19 +229,19 @@ class ItemDescriptionPage(Context):
                 if all_gone:
                     slot = curr_context.item.get_slot()
                     curr_context.inventory.equipment_loadout.unequip(slot)
+                curr_context.inventory.mark_changed()
             else:
                 curr_context.inventory.remove_from_storage(curr_context.item.get_id(), 1)
             curr_context.item.consume_function(parent_context)
-            print(f'{curr_context.item.get_display_name()} consumed.')
+            curr_context.output(f'{curr_context.item.get_display_name()} consumed.')
             return True
 
         def popup_executor(curr_context: ItemDescriptionPage,
-                           parent_context: Context) -> bool:
+                           parent_context: Context) -> ExecutorResult:
             item_description = curr_context.item.get_description_for_display()
             popup_context = PopupContext(parent_context=parent_context,
                                          display_text=item_description)
-            popup_context.enter()
-            return False
+            return curr_context.enter_child(popup_context)
 
         if self.item_currently_equipped:
             choice_handler.add_choice(executor=unequip_executor,
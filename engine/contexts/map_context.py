@@ -1,6 +1,8 @@
 from engine.contexts.context import Context
+from engine.contexts.context_stack import ExecutorResult
 from engine.utils.location_tree import LocationTree
-from typing import Callable
+from engine.utils.travel_graph import TravelGraph
+from typing import Callable, Optional, Union
 from engine.utils.choice_handler import ChoiceHandler
 
 
@@ -10,10 +12,12 @@ class MapContext(Context):
     :param parent_context (Context): Context from which this map context was entered
     :param context_data (dict): The map context data (e.g. below)
     :param known_locations (LocationTree): LocationTree containing all locations in the world known to the player
+    :param travel_graph (TravelGraph): Optional. If given, destinations are listed with their travel time
     >>> context_data = \
     ...{
     ...     'map_domain_name': 'Sillytown',
     ...     'player_global_location': 'oldvale_sillytown_inn',
+    ...     'player_location_id': 7, # optional, see LocationTree.get_location_id
     ...     'map_level': 'local', # 'world', 'regional', or 'local' only
     ...     'map_locality': 'oldvale_sillytown',
     ...     'map_region': 'oldvale',
@@ -21,16 +25,19 @@ class MapContext(Context):
     ...         {
     ...             1: {
     ...                     'display_name': 'Town Hall',
-    ...                     'global_location': 'oldvale_sillytown_townhall'
+    ...                     'global_location': 'oldvale_sillytown_townhall',
+    ...                     'location_id': 6 # optional
     ...                },
     ...             2: {
     ...                     'display_name': 'Inn',
-    ...                     'global_location': 'oldvale_sillytown_inn'
+    ...                     'global_location': 'oldvale_sillytown_inn',
+    ...                     'location_id': 7 # optional
     ...                }
     ...         }
     ...}
     """
-    def __init__(self, parent_context: Context, context_data: dict, known_locations: LocationTree):
+    def __init__(self, parent_context: Context, context_data: dict, known_locations: LocationTree,
+                 travel_graph: Optional[TravelGraph] = None):
         super().__init__(parent_context=parent_context,
                          context_type='map',
                          context_data=context_data)
@@ -38,26 +45,43 @@ class MapContext(Context):
                                                                                context_data['map_level'] == 'regional'\
             else f'Regions in {context_data["map_domain_name"]}'
         self.known_locations = known_locations
+        self.travel_graph = travel_graph
+
+    def get_state_fingerprint(self) -> tuple[int, Union[int, None]]:
+        travel_graph_version = self.travel_graph.get_version() if self.travel_graph is not None else None
+        return self.known_locations.get_version(), travel_graph_version
 
     def _generate_choice_handling(self) -> ChoiceHandler:
         context_data = self.get_context_data()
         choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back to game')])
 
-        def helper_local_travel(i: int) -> Callable[[Context, Context], bool]:
+        def helper_local_travel(i: int) -> Callable[[Context, Context], ExecutorResult]:
             new_global_location = context_data['map_contained_locations'][i]['global_location']
+            new_location_id = context_data['map_contained_locations'][i].get('location_id')
 
             def location_changer(curr_context: Context, parent_context: Context):
                 parent_context.context_data['player_global_location'] = new_global_location
                 curr_context.context_data['player_global_location'] = new_global_location
+                if new_location_id is not None:
+                    parent_context.context_data['player_location_id'] = new_location_id
+                    curr_context.context_data['player_location_id'] = new_location_id
                 return True
             return location_changer
 
+        def destination_text(destination: dict) -> str:
+            if self.travel_graph is None:
+                return destination['display_name']
+            travel_time = self.travel_graph.get_travel_time(context_data['player_global_location'],
+                                                            destination['global_location'])
+            return destination['display_name'] if travel_time is None \
+                else f'{destination["display_name"]} ({travel_time:g})'
+
         if context_data['map_level'] in ('local', 'regional'):
             for choice_number in context_data['map_contained_locations']:
                 choice_handler.add_choice(executor=helper_local_travel(choice_number),
-                                          display_text=context_data['map_contained_locations'][choice_number]['display_name'])
+                                          display_text=destination_text(context_data['map_contained_locations'][choice_number]))
             if context_data['map_level'] == 'local':
-                region: str = context_data['map_region']
+                region: Union[str, int] = context_data.get('map_region_id', context_data['map_region'])
                 choice_handler.add_choice(executor=self.create_nested_map_handler(location=region),
                                           display_text='Region map',
                                           choice_letter='r')
@@ -66,43 +90,49 @@ class MapContext(Context):
                                       choice_letter='w')
         else:
             for choice_number in context_data['map_contained_locations']:
-                region: str = context_data['map_contained_locations'][choice_number]['global_location']
+                contained_region: dict = context_data['map_contained_locations'][choice_number]
+                region: Union[str, int] = contained_region.get('location_id', contained_region['global_location'])
                 choice_handler.add_choice(executor=self.create_nested_map_handler(location=region),
                                           display_text=context_data['map_contained_locations'][choice_number]['display_name'])
 
         return choice_handler
 
-    def create_map_context_data(self, location: str) -> dict:
+    def create_map_context_data(self, location: Union[str, int]) -> dict:
+        """
+        :param location: 'world', or the region to show, as a region name or location id
+        :return: dict
+        """
         map_context_data = {'player_global_location': self.get_context_data()['player_global_location'],
                             'map_contained_locations': {}}
+        if 'player_location_id' in self.get_context_data():
+            map_context_data['player_location_id'] = self.get_context_data()['player_location_id']
         known_locations: LocationTree = self.known_locations
-        region_names_and_display_names = known_locations.get_region_names_and_display_names()
         if location == 'world':
+            region_names_and_display_names = known_locations.get_region_names_and_display_names()
             map_context_data['map_domain_name'] = known_locations.get_world_display_name()
             map_context_data['map_level'] = 'world'
             for i in range(1, len(region_names_and_display_names) + 1):
                 map_context_data['map_contained_locations'][i] = {'display_name': region_names_and_display_names[i-1][1],
-                                                                  'global_location': region_names_and_display_names[i-1][0]}
+                                                                  'global_location': region_names_and_display_names[i-1][0],
+                                                                  'location_id': known_locations.get_location_id(region_names_and_display_names[i-1][0])}
         else:
-            for ls in region_names_and_display_names:
-                if ls[0] == location:
-                    map_context_data['map_domain_name'] = ls[1]
-                    break
+            region_id = location if isinstance(location, int) else known_locations.get_location_id(location)
+            map_context_data['map_domain_name'] = known_locations.get_display_name_by_id(region_id)
             map_context_data['map_level'] = 'regional'
-            map_context_data['map_region'] = location
-            i = 1
-            localities = known_locations.get_localities()
-            for locality in localities:
-                if locality.startswith(f'{location}_'):
-                    map_context_data['map_contained_locations'][i] = {'display_name': localities[locality]['display_name'],
-                                                                      'global_location': localities[locality]['entrypoint_global_location']}
-                    i += 1
+            map_context_data['map_region'] = known_locations.get_global_location(region_id)
+            map_context_data['map_region_id'] = region_id
+            for i, locality_id in enumerate(known_locations.get_child_ids(region_id), start=1):
+                entrypoint_id = known_locations.get_entrypoint_id(locality_id)
+                map_context_data['map_contained_locations'][i] = {'display_name': known_locations.get_display_name_by_id(locality_id),
+                                                                  'global_location': known_locations.get_global_location(entrypoint_id),
+                                                                  'location_id': entrypoint_id}
         return map_context_data
 
-    def create_nested_map_handler(self, location: str) -> Callable[[Context, Context], bool]:
+    def create_nested_map_handler(self, location: Union[str, int]) -> Callable[[Context, Context], ExecutorResult]:
 
-        def nested_map_handler(curr_context: Context, parent_context: Context) -> bool:
+        def nested_map_handler(curr_context: Context, parent_context: Context) -> ExecutorResult:
             curr_context.context_data = self.create_map_context_data(location)
+            curr_context.invalidate_choices()
             return False
 
         return nested_map_handler
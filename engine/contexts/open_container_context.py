@@ -1,5 +1,6 @@
 from typing import Callable
 from engine.contexts.context import Context
+from engine.contexts.context_stack import ExecutorResult
 from engine.utils.choice_handler import ChoiceHandler
 from engine.objects.item import Item
 from engine.objects.item_container import ItemContainer
@@ -20,20 +21,27 @@ class OpenContainerContext(Context):
         else:
             self.entry_text = f'These are the items in the {container.display_name}. Select an item to store it in your inventory.'
 
+    def get_state_fingerprint(self) -> int:
+        # the container only changes through this context's own executors, which call invalidate_choices, so the
+        # cached ChoiceHandler only needs rebuilding then
+        return 0
+
     def _generate_choice_handling(self) -> ChoiceHandler:
         choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
 
-        def make_take_gold_executor(amt: int) -> Callable:
-            def take_gold_executor(curr_context: OpenContainerContext, parent_context: Context) -> bool:
+        def make_take_gold_executor(amt: int) -> Callable[..., ExecutorResult]:
+            def take_gold_executor(curr_context: OpenContainerContext, parent_context: Context) -> ExecutorResult:
                 curr_context.player_inventory.change_gold(amt)
                 curr_context.container.add_gold(-1 * amt)
+                curr_context.invalidate_choices()
                 return False
             return take_gold_executor
 
-        def make_take_item_executor(item: Item) -> Callable:
-            def take_item_executor(curr_context: OpenContainerContext, parent_context: Context) -> bool:
+        def make_take_item_executor(item: Item) -> Callable[..., ExecutorResult]:
+            def take_item_executor(curr_context: OpenContainerContext, parent_context: Context) -> ExecutorResult:
                 curr_context.player_inventory.add_to_storage(item)
                 curr_context.container.remove_item(item)
+                curr_context.invalidate_choices()
                 return False
             return take_item_executor
 
@@ -1,4 +1,6 @@
 from engine.contexts.context import Context
+from engine.contexts.context_stack import Pop
+from engine.utils.choice_handler import ChoiceHandler
 
 
 class PopupContext(Context):
@@ -16,8 +18,8 @@ class PopupContext(Context):
                          context_data=context_data if context_data is not None else {})
         self.entry_text = display_text
 
-    def enter(self, exit_choice: str = 'b') -> bool:
-        self.print_entry_text()
-        print('\n')
-        hold = input('Press enter to continue.')
-        return False
+    def render_turn(self, choice_handler: ChoiceHandler) -> str:
+        return f'{self.get_entry_text()}\n\n\nPress enter to continue.'
+
+    def handle_line(self, line: str, choice_handler: ChoiceHandler, exit_choice: str = 'b') -> Pop:
+        return Pop(result=False)
@@ -1,4 +1,5 @@
 from engine.objects.item import Item
+from engine.utils.dice_expression import compile_dice_expression
 from engine.utils.roll import Roll
 from typing import Union, Callable
 
@@ -29,7 +30,8 @@ class Equipment(Item):
 
 class Weapon(Equipment):
 
-    def __init__(self, item_id: str, display_name: str, damage_roll: Roll, damage_type: str, ranged: bool = False,
+    def __init__(self, item_id: str, display_name: str, damage_roll: Union[Roll, str],
+                 damage_type: str, ranged: bool = False,
                  two_handed: bool = False, required_ammo_type: str = None, self_ammo: bool = False,
                  stackable: bool = False, stack_size: int = 1, max_stack_size: int = 1, weight: float = 0,
                  base_value: int = 0, quest_item: bool = False,
@@ -38,6 +40,9 @@ class Weapon(Equipment):
                          stack_size=stack_size, max_stack_size=max_stack_size, weight=weight, base_value=base_value,
                          quest_item=quest_item, consumable=False,
                          equipment_classification='Weapons', description=description, tags=tags)
+        # damage stored as a string in content files is compiled once per distinct expression, not per attack
+        if isinstance(damage_roll, str):
+            damage_roll = compile_dice_expression(damage_roll)
         self.damage_roll: Roll = damage_roll
         self.damage_type: str = damage_type
         self.ranged: bool = ranged
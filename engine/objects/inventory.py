@@ -1,7 +1,7 @@
 from engine.objects.item import Item
 from engine.objects.equipment import Equipment, Weapon
 from engine.objects.equipment_loadout import EquipmentLoadout
-from typing import Union
+from typing import Iterator, Union
 
 
 class Inventory:
@@ -12,6 +12,18 @@ class Inventory:
         self.items_in_storage: list[Item] = items_in_storage if items_in_storage is not None else []
         self.equipment_loadout: EquipmentLoadout = equipment_loadout
         self.gold: int = max(0, int(gold))
+        # incremented by every change made through this class, so that contexts can tell when to rebuild their choices
+        self._version: int = 0
+
+    def get_version(self) -> int:
+        return self._version
+
+    def mark_changed(self) -> None:
+        """
+        Records a change made to the stored or equipped items without going through this class, such as changing
+        the stack size of an equipped item directly.
+        """
+        self._version += 1
 
     def get_all_stacks(self, item_id: str) -> list[Item]:
         return [item for item in self.items_in_storage if item.get_id() == item_id]
@@ -20,11 +32,13 @@ class Inventory:
         return self.gold
 
     def change_gold(self, amount: int, ignore_insufficient: bool = False):
+        self.mark_changed()
         if (self.get_current_gold() + int(amount) < 0) and (ignore_insufficient is False):
             raise ValueError('Not enough gold.')
         self.gold = max(0, self.gold + int(amount))
 
     def add_to_storage(self, item: Item) -> None:
+        self.mark_changed()
         if not item.is_stackable():
             self.items_in_storage.append(item)
         else:
@@ -41,6 +55,7 @@ class Inventory:
                 self.items_in_storage.append(item.copy_stackable(outstanding))
 
     def remove_from_storage(self, item_id: str, quantity: int = 1) -> None:
+        self.mark_changed()
         matching_items: list[Item] = [item for item in self.items_in_storage if item.get_id() == item_id]
         if len(matching_items) == 0:
             raise ValueError(f'Item not found.')
@@ -72,7 +87,13 @@ class Inventory:
                 return len(matching_items)
 
     def get_all_of_classification(self, classification: str) -> list[Item]:
-        return [item for item in self.items_in_storage if item.get_item_classification() == classification]
+        return list(self.iter_all_of_classification(classification))
+
+    def iter_all_of_classification(self, classification: str) -> Iterator[Item]:
+        """
+        Lazy form of get_all_of_classification, for callers that may only look at the first few items.
+        """
+        return (item for item in self.items_in_storage if item.get_item_classification() == classification)
 
     def get_all_classifications(self) -> list[str]:
         return list(set([item.get_item_classification() for item in self.items_in_storage]))
@@ -84,6 +105,7 @@ class Inventory:
         return list(set([eqp.get_equipment_classification() for eqp in self.get_all_equipment()]))
 
     def equip_from_storage(self, equipment: Equipment) -> None:
+        self.mark_changed()
         loadout = self.equipment_loadout
         curr_equipped = loadout.get_item(equipment.get_slot())
         if curr_equipped is not None:
@@ -115,6 +137,7 @@ class Inventory:
                     self.add_to_storage(in_off_hand)
 
     def unequip_into_storage(self, equipment: Equipment) -> None:
+        self.mark_changed()
         self.equipment_loadout.unequip(equipment.get_slot())
         self.add_to_storage(equipment)
 
@@ -140,6 +163,7 @@ class Inventory:
 
     def import_from_data(self, data: dict[str, Union[int, dict, list]],
                          item_id_mapping: dict[str, Union[Item, Equipment]]) -> None:
+        self.mark_changed()
         self.gold = int(data['gold'])
         self.equipment_loadout = EquipmentLoadout()
         self.equipment_loadout.import_from_data(data['equipment'], item_id_mapping)
@@ -0,0 +1,413 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Union
+
+from engine.utils.location_tree import LocationTree
+
+MAGIC = b'CLIRPGW1'
+# magic, byte order flag, string count, region count, locality count, location count, world name string index
+_HEADER = struct.Struct('<8sBxxxIIIII')
+_ITEMSIZE = 4
+
+
+class BinaryWorldFormatError(ValueError):
+    pass
+
+
+def _sorted_within_ranges(names: list[str], starts: list[int]) -> list[int]:
+    """
+    :param names: Names of consecutive entries
+    :param starts: Range boundaries; range i covers entries starts[i] to starts[i + 1]
+    :return: Entry indices, sorted by name within each range
+    """
+    order: list[int] = []
+    for i in range(len(starts) - 1):
+        order.extend(sorted(range(starts[i], starts[i + 1]), key=lambda j: names[j]))
+    return order
+
+
+def write_binary_world(location_tree: LocationTree, path: str) -> None:
+    """
+    Writes location_tree to path in the binary world format read by open_binary_world.
+
+    Layout after the header, as native-order uint32 arrays unless noted:
+    string offsets (count + 1) and UTF-8 string bytes (padded to 4 bytes), then per region: name, display name and
+    first locality; per locality: name, display name, entrypoint location and first location; per location: name
+    and display name. Each "first" array has one extra entry closing the last range. Three permutation arrays sort
+    regions by name, and localities and locations by name within their parent, for binary-search lookups.
+    :param location_tree: The tree to write
+    :param path: Output file path
+    """
+    strings: dict[str, int] = {}
+
+    def intern(string: str) -> int:
+        if string not in strings:
+            strings[string] = len(strings)
+        return strings[string]
+
+    region_names: list[str] = []
+    region_fields = array('I')
+    region_starts: list[int] = [0]
+    locality_names: list[str] = []
+    locality_fields = array('I')
+    locality_starts: list[int] = [0]
+    location_names: list[str] = []
+    location_fields = array('I')
+    localities = location_tree.get_localities()
+    world_name_index = intern(location_tree.get_world_display_name())
+    for region, region_display_name in location_tree.get_region_names_and_display_names():
+        region_names.append(region)
+        region_fields.extend((intern(region), intern(region_display_name)))
+        for locality in location_tree.get_localities_in_region(region):
+            locality_names.append(locality.split('_', maxsplit=1)[1])
+            entrypoint_index = 0
+            for location, location_display_name in location_tree.get_locations_in_locality(locality):
+                if location == localities[locality]['entrypoint_global_location']:
+                    entrypoint_index = len(location_names)
+                location_names.append(location.rsplit('_', maxsplit=1)[1])
+                location_fields.extend((intern(location_names[-1]), intern(location_display_name)))
+            locality_fields.extend((intern(locality_names[-1]), intern(localities[locality]['display_name']),
+                                    entrypoint_index))
+            locality_starts.append(len(location_names))
+        region_starts.append(len(locality_names))
+
+    string_offsets = array('I', [0])
+    string_bytes = bytearray()
+    for string in strings:
+        string_bytes += string.encode('utf-8')
+        string_offsets.append(len(string_bytes))
+    string_bytes += b'\0' * (-len(string_bytes) % _ITEMSIZE)
+    sections = (string_offsets, string_bytes, region_fields, array('I', region_starts), locality_fields,
+                array('I', locality_starts), location_fields,
+                array('I', _sorted_within_ranges(region_names, [0, len(region_names)])),
+                array('I', _sorted_within_ranges(locality_names, region_starts)),
+                array('I', _sorted_within_ranges(location_names, locality_starts)))
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, sys.byteorder == 'little', len(strings), len(region_names), len(locality_names),
+                             len(location_names), world_name_index))
+        for section in sections:
+            f.write(section if isinstance(section, bytearray) else section.tobytes())
+
+
+class BinaryWorldView:
+    """
+    Read-only view over a binary world file with the same getters as LocationTree, including the id-based ones. The
+    file is memory-mapped and names are only decoded when asked for, so opening a world costs the same regardless
+    of its size.
+
+    Ids come from the order of the records in the file: regions first, then localities, then lowest-level
+    locations. They are stable for as long as the file is, but are not the ids the tree that was written had.
+    :param path (str): Path of a file written by write_binary_world
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise BinaryWorldFormatError(f'{path} is empty.')
+        try:
+            self._read_sections(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_sections(self, path: str) -> None:
+        if len(self._mmap) < _HEADER.size:
+            raise BinaryWorldFormatError(f'{path} is not a binary world file.')
+        magic, little_endian, n_strings, n_regions, n_localities, n_locations, world_name_index = \
+            _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise BinaryWorldFormatError(f'{path} is not a binary world file.')
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise BinaryWorldFormatError(f'{path} was written on a machine with a different byte order.')
+        self._buffer = memoryview(self._mmap)
+        self._position = _HEADER.size
+        self._string_offsets = self._take_uint32(n_strings + 1)
+        string_bytes_size = self._string_offsets[-1] + (-self._string_offsets[-1] % _ITEMSIZE)
+        if self._position + string_bytes_size > len(self._buffer):
+            raise BinaryWorldFormatError('Binary world file is truncated.')
+        self._string_bytes = self._buffer[self._position:self._position + string_bytes_size]
+        self._position += string_bytes_size
+        self._region_fields = self._take_uint32(2 * n_regions)
+        self._region_starts = self._take_uint32(n_regions + 1)
+        self._locality_fields = self._take_uint32(3 * n_localities)
+        self._locality_starts = self._take_uint32(n_localities + 1)
+        self._location_fields = self._take_uint32(2 * n_locations)
+        self._region_order = self._take_uint32(n_regions)
+        self._locality_order = self._take_uint32(n_localities)
+        self._location_order = self._take_uint32(n_locations)
+        if world_name_index >= n_strings:
+            raise BinaryWorldFormatError(f'{path} is corrupt: world name out of range.')
+        self.world_display_name: str = self._string(world_name_index)
+
+    def _take_uint32(self, count: int) -> memoryview:
+        end = self._position + count * _ITEMSIZE
+        if end > len(self._buffer):
+            raise BinaryWorldFormatError('Binary world file is truncated.')
+        view = self._buffer[self._position:end].cast('I')
+        self._position = end
+        return view
+
+    def close(self) -> None:
+        for name in ('_string_offsets', '_string_bytes', '_region_fields', '_region_starts', '_locality_fields',
+                     '_locality_starts', '_location_fields', '_region_order', '_locality_order', '_location_order',
+                     '_buffer'):
+            if hasattr(self, name):
+                getattr(self, name).release()
+        if hasattr(self, '_mmap'):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _string(self, index: int) -> str:
+        return str(self._string_bytes[self._string_offsets[index]:self._string_offsets[index + 1]], 'utf-8')
+
+    def _region_name(self, region_index: int) -> str:
+        return self._string(self._region_fields[2 * region_index])
+
+    def _locality_name(self, locality_index: int) -> str:
+        return self._string(self._locality_fields[3 * locality_index])
+
+    def _location_name(self, location_index: int) -> str:
+        return self._string(self._location_fields[2 * location_index])
+
+    @staticmethod
+    def _search(order: memoryview, start: int, end: int, name: str, name_of) -> int:
+        """
+        Binary search for name among order[start:end].
+        :return: The matching entry index, or -1
+        """
+        while start < end:
+            middle = (start + end) // 2
+            entry = order[middle]
+            entry_name = name_of(entry)
+            if entry_name == name:
+                return entry
+            if entry_name < name:
+                start = middle + 1
+            else:
+                end = middle
+        return -1
+
+    def _find_region(self, region_name: str) -> int:
+        return self._search(self._region_order, 0, len(self._region_order), region_name, self._region_name)
+
+    def _find_locality(self, locality_global_location: str) -> int:
+        parts = locality_global_location.split('_')
+        if len(parts) != 2 or (region_index := self._find_region(parts[0])) < 0:
+            return -1
+        return self._search(self._locality_order, self._region_starts[region_index],
+                            self._region_starts[region_index + 1], parts[1], self._locality_name)
+
+    def _find_location(self, global_location: str) -> int:
+        if global_location.count('_') != 2:
+            return -1
+        locality_global_location, location_name = global_location.rsplit('_', maxsplit=1)
+        if (locality_index := self._find_locality(locality_global_location)) < 0:
+            return -1
+        return self._search(self._location_order, self._locality_starts[locality_index],
+                            self._locality_starts[locality_index + 1], location_name, self._location_name)
+
+    def _region_localities(self, region_index: int) -> range:
+        return range(self._region_starts[region_index], self._region_starts[region_index + 1])
+
+    def _locality_locations(self, locality_index: int) -> range:
+        return range(self._locality_starts[locality_index], self._locality_starts[locality_index + 1])
+
+    def _locality_info(self, region_name: str, locality_index: int) -> tuple[str, dict[str, str]]:
+        locality_global_location = f'{region_name}_{self._locality_name(locality_index)}'
+        entrypoint_index = self._locality_fields[3 * locality_index + 2]
+        return locality_global_location, {
+            'display_name': self._string(self._locality_fields[3 * locality_index + 1]),
+            'entrypoint_global_location': f'{locality_global_location}_{self._location_name(entrypoint_index)}',
+            'entrypoint_display_name': self._string(self._location_fields[2 * entrypoint_index + 1])
+        }
+
+    @property
+    def regions(self) -> list[list[str]]:
+        return self.get_region_names_and_display_names()
+
+    @property
+    def localities(self) -> dict[str, dict[str, str]]:
+        return self.get_localities()
+
+    @property
+    def lowest_level_locations(self) -> list[list[str]]:
+        return self.get_lowest_level_locations()
+
+    def get_world_display_name(self) -> str:
+        return self.world_display_name
+
+    def get_region_names(self) -> list[str]:
+        return [self._region_name(i) for i in range(len(self._region_order))]
+
+    def get_region_names_and_display_names(self) -> list[list[str]]:
+        return [[self._region_name(i), self._string(self._region_fields[2 * i + 1])]
+                for i in range(len(self._region_order))]
+
+    def get_region_display_name(self, region_name: str) -> str:
+        if (region_index := self._find_region(region_name)) < 0:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return self._string(self._region_fields[2 * region_index + 1])
+
+    def get_localities(self) -> dict[str, dict[str, str]]:
+        localities = {}
+        for region_index in range(len(self._region_order)):
+            region_name = self._region_name(region_index)
+            for locality_index in self._region_localities(region_index):
+                locality_global_location, info = self._locality_info(region_name, locality_index)
+                localities[locality_global_location] = info
+        return localities
+
+    def get_locality_global_locations(self) -> list[str]:
+        return [f'{self._region_name(region_index)}_{self._locality_name(locality_index)}'
+                for region_index in range(len(self._region_order))
+                for locality_index in self._region_localities(region_index)]
+
+    def get_localities_in_region(self, region_name: str) -> list[str]:
+        if (region_index := self._find_region(region_name)) < 0:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return [f'{region_name}_{self._locality_name(i)}' for i in self._region_localities(region_index)]
+
+    def get_locality(self, locality_global_location: str) -> dict[str, str]:
+        """
+        Equivalent to get_localities()[locality_global_location] without decoding every locality.
+        """
+        if (locality_index := self._find_locality(locality_global_location)) < 0:
+            raise ValueError(f'Locality {locality_global_location} does not exist.')
+        return self._locality_info(locality_global_location.split('_')[0], locality_index)[1]
+
+    def get_lowest_level_locations(self) -> list[list[str]]:
+        locations = []
+        for locality_global_location in self.get_locality_global_locations():
+            locations.extend(self.get_locations_in_locality(locality_global_location))
+        return locations
+
+    def get_locations_in_locality(self, locality_global_location: str) -> list[list[str]]:
+        if (locality_index := self._find_locality(locality_global_location)) < 0:
+            raise ValueError(f'Locality {locality_global_location} does not exist.')
+        return [[f'{locality_global_location}_{self._location_name(i)}',
+                 self._string(self._location_fields[2 * i + 1])] for i in self._locality_locations(locality_index)]
+
+    def get_location_display_name(self, global_location: str) -> str:
+        if (location_index := self._find_location(global_location)) < 0:
+            raise ValueError(f'Location {global_location} does not exist.')
+        return self._string(self._location_fields[2 * location_index + 1])
+
+    def has_region(self, region_name: str) -> bool:
+        return self._find_region(region_name) >= 0
+
+    def has_locality(self, locality_global_location: str) -> bool:
+        return self._find_locality(locality_global_location) >= 0
+
+    def has_lowest_level_location(self, global_location: str) -> bool:
+        return self._find_location(global_location) >= 0
+
+    def get_version(self) -> int:
+        """
+        :return: Always 0, since the view cannot change
+        """
+        return 0
+
+    def _id_offsets(self) -> tuple[int, int]:
+        """
+        :return: The ids of the first locality and of the first lowest-level location
+        """
+        return len(self._region_order), len(self._region_order) + len(self._locality_order)
+
+    def _check_id(self, location_id: int) -> None:
+        if not 0 <= location_id < self._id_offsets()[1] + len(self._location_order):
+            raise ValueError(f'Location id {location_id} does not exist.')
+
+    def get_location_id(self, global_location: str) -> int:
+        """
+        :param global_location: A region name, locality global location or lowest-level global location
+        :return: The integer id of that location
+        """
+        first_locality_id, first_location_id = self._id_offsets()
+        level = global_location.count('_') + 1
+        if level == 1 and (region_index := self._find_region(global_location)) >= 0:
+            return region_index
+        if level == 2 and (locality_index := self._find_locality(global_location)) >= 0:
+            return first_locality_id + locality_index
+        if level == 3 and (location_index := self._find_location(global_location)) >= 0:
+            return first_location_id + location_index
+        raise ValueError(f'Location {global_location} does not exist.')
+
+    def get_global_location(self, location_id: int) -> str:
+        self._check_id(location_id)
+        first_locality_id, first_location_id = self._id_offsets()
+        if location_id < first_locality_id:
+            return self._region_name(location_id)
+        parent_global_location = self.get_global_location(self.get_parent_id(location_id))
+        if location_id < first_location_id:
+            return f'{parent_global_location}_{self._locality_name(location_id - first_locality_id)}'
+        return f'{parent_global_location}_{self._location_name(location_id - first_location_id)}'
+
+    def get_parent_id(self, location_id: int) -> int:
+        """
+        :return: Id of the containing region or locality, or -1 for a region
+        """
+        self._check_id(location_id)
+        first_locality_id, first_location_id = self._id_offsets()
+        if location_id < first_locality_id:
+            return -1
+        # children are stored in runs, one per parent, so the parent is the last one whose run starts at or before
+        if location_id < first_location_id:
+            return bisect_right(self._region_starts, location_id - first_locality_id) - 1
+        return first_locality_id + bisect_right(self._locality_starts, location_id - first_location_id) - 1
+
+    def get_child_ids(self, location_id: int) -> list[int]:
+        self._check_id(location_id)
+        first_locality_id, first_location_id = self._id_offsets()
+        if location_id < first_locality_id:
+            return [first_locality_id + i for i in self._region_localities(location_id)]
+        if location_id < first_location_id:
+            return [first_location_id + i for i in self._locality_locations(location_id - first_locality_id)]
+        return []
+
+    def get_display_name_by_id(self, location_id: int) -> str:
+        self._check_id(location_id)
+        first_locality_id, first_location_id = self._id_offsets()
+        if location_id < first_locality_id:
+            return self._string(self._region_fields[2 * location_id + 1])
+        if location_id < first_location_id:
+            return self._string(self._locality_fields[3 * (location_id - first_locality_id) + 1])
+        return self._string(self._location_fields[2 * (location_id - first_location_id) + 1])
+
+    def get_entrypoint_id(self, locality_id: int) -> int:
+        first_locality_id, first_location_id = self._id_offsets()
+        if not first_locality_id <= locality_id < first_location_id:
+            raise ValueError(f'Location id {locality_id} is not a locality.')
+        return first_location_id + self._locality_fields[3 * (locality_id - first_locality_id) + 2]
+
+    def export_world_map(self) -> dict[str, Union[str, dict]]:
+        map_data = {'world_name': self.world_display_name, 'regions': {}}
+        for region_index in range(len(self._region_order)):
+            region_data = {'display_name': self._string(self._region_fields[2 * region_index + 1]), 'localities': {}}
+            for locality_index in self._region_localities(region_index):
+                entrypoint_index = self._locality_fields[3 * locality_index + 2]
+                region_data['localities'][self._locality_name(locality_index)] = {
+                    'display_name': self._string(self._locality_fields[3 * locality_index + 1]),
+                    'locations': {'entrypoint': self._location_name(entrypoint_index),
+                                  'entrypoint_display_name': self._string(self._location_fields[2 * entrypoint_index + 1]),
+                                  'other_locations': {self._location_name(i): {
+                                      'display_name': self._string(self._location_fields[2 * i + 1])}
+                                      for i in self._locality_locations(locality_index) if i != entrypoint_index}}
+                }
+            map_data['regions'][self._region_name(region_index)] = region_data
+        return map_data
+
+
+def open_binary_world(path: str) -> BinaryWorldView:
+    return BinaryWorldView(path)
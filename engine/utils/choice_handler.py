@@ -1,64 +1,217 @@
-from typing import Callable
+from typing import Any, Callable, Iterable, Union
+from engine.contexts.context_stack import ExecutorResult
+from engine.utils import profiling
 
 
 class ChoiceHandler:
     """
     Object to handle choices made in a context
+    :param reserved_choices (list[tuple[str, str]]): (letter, display text) of choices handled by the context itself
+    :param page_size (int): If given, print_choices only shows this many numbered choices at a time, with choices to
+    move to the next and previous pages
+    :param next_page_letter (str): Letter of the next page choice, when paged
+    :param previous_page_letter (str): Letter of the previous page choice, when paged
     """
-    def __init__(self, reserved_choices: list[tuple[str, str]] = None):
-        self._choices: dict[str, tuple[str, Callable]] = {}
+    def __init__(self, reserved_choices: list[tuple[str, str]] = None, page_size: int = None,
+                 next_page_letter: str = 'n', previous_page_letter: str = 'p'):
+        reserved_choices = reserved_choices if reserved_choices else []
+        self._choices: dict[str, tuple[str, Callable[..., ExecutorResult]]] = {}
         self._max_choice_number: int = 0
-        self._choice_letters: list[str] = [tup[0].lower().strip() for tup in reserved_choices] \
-            if reserved_choices else []
-        self._display_texts: list[str] = [tup[1].strip() for tup in reserved_choices] if reserved_choices else []
+        self._choice_letters: list[str] = [tup[0].lower().strip() for tup in reserved_choices]
+        self._display_texts: set[str] = set(tup[1].strip() for tup in reserved_choices)
         if any([(not letter.isalpha()) or (len(letter) != 1) for letter in self._choice_letters]):
             raise ValueError('Invalid reserved choice letter found.')
-        if any([text.strip() == '' for text in self._display_texts]):
+        if any([tup[1].strip() == '' for tup in reserved_choices]):
             raise ValueError('Empty display text detected.')
         if len(set(self._choice_letters)) < len(self._choice_letters):
             raise ValueError('Duplicate choice letter detected.')
-        if len(set(self._display_texts)) < len(self._display_texts):
+        if len(self._display_texts) < len(reserved_choices):
             raise ValueError('Duplicate display text detected.')
         self.reserved_choices = {}
         for tup in reserved_choices:
             self.reserved_choices[tup[0].lower().strip()] = tup[1].strip()
+        self._taken_letters: set[str] = set(self._choice_letters)
+        self.page_size: Union[int, None] = page_size
+        self._page: int = 0
+        self._page_letters: tuple[str, str] = ('', '')
+        if page_size is not None:
+            if page_size < 1:
+                raise ValueError('Page size must be at least 1.')
+            self._page_letters = (next_page_letter.lower().strip(), previous_page_letter.lower().strip())
+            for letter in self._page_letters:
+                if letter in self._taken_letters:
+                    raise ValueError(f'Choice letter {letter} is taken.')
+                self._taken_letters.add(letter)
+        # numbered choices produced on demand by add_lazy_choices: their source, the (display text, item) pairs
+        # taken from it so far, and how to turn an item into an executor
+        self._lazy_source = None
+        self._lazy_choices: list[tuple[str, Any]] = []
+        self._lazy_display_text: Union[Callable[[Any], str], None] = None
+        self._lazy_make_executor: Union[Callable[[Any], Callable[..., ExecutorResult]], None] = None
 
-    def add_choice(self, executor: Callable, display_text: str, choice_letter: str = None) -> None:
+    def add_choice(self, executor: Callable[..., ExecutorResult], display_text: str, choice_letter: str = None) -> None:
         if display_text.strip() in self._display_texts:
             raise ValueError(f'Display text "{display_text.strip()}" already taken.')
         if display_text.strip() == '':
             raise ValueError('Display text cannot be blank.')
         if choice_letter is not None:
-            if choice_letter.lower().strip() in self._choice_letters:
+            if choice_letter.lower().strip() in self._taken_letters:
                 raise ValueError(f'Choice letter {choice_letter.lower().strip()} is taken.')
             if (not choice_letter.isalpha()) or (len(choice_letter.strip()) != 1):
                 raise ValueError('Choice letter must be exactly one letter. No digits or special characters.')
             self._choice_letters.append(choice_letter.lower().strip())
-            self._display_texts.append(display_text.strip())
+            self._taken_letters.add(choice_letter.lower().strip())
+            self._display_texts.add(display_text.strip())
             self._choices[choice_letter.lower().strip()] = (display_text.strip(), executor)
         else:
+            if self._lazy_source is not None:
+                raise ValueError('Cannot add numbered choices after lazy choices.')
             assigned_integer = self._max_choice_number + 1
             self._max_choice_number = assigned_integer
-            self._display_texts.append(display_text.strip())
+            self._display_texts.add(display_text.strip())
             self._choices[str(assigned_integer)] = (display_text.strip(), executor)
 
-    def get_executor(self, choice: str) -> Callable:
-        if choice not in self._choices:
+    def add_lazy_choices(self, items: Iterable, display_text: Callable[[Any], str],
+                         make_executor: Callable[[Any], Callable[..., ExecutorResult]]) -> None:
+        """
+        Adds a numbered choice for each item, after the numbered choices already added. Items are only taken from
+        items, and their display texts checked, as far as a printed page or a chosen number needs, and an item's
+        executor is only made when it is chosen. Numbered choices cannot be added afterwards.
+        :param items: The items to offer, possibly a generator
+        :param display_text: Makes the display text of an item
+        :param make_executor: Makes the executor of an item
+        """
+        if self._lazy_source is not None:
+            raise ValueError('Lazy choices already added.')
+        self._lazy_source = iter(items)
+        self._lazy_display_text = display_text
+        self._lazy_make_executor = make_executor
+
+    def _numbered_choice_count(self) -> int:
+        return self._max_choice_number + len(self._lazy_choices)
+
+    def _take_lazy_choices(self, count: int) -> None:
+        """
+        Takes items from the lazy source until there are count numbered choices or the source runs out.
+        """
+        taken = len(self._lazy_choices)
+        try:
+            self._take_lazy_choices_until(count)
+        finally:
+            if len(self._lazy_choices) > taken:
+                profiling.count('lazy_choices_taken', len(self._lazy_choices) - taken)
+
+    def _take_lazy_choices_until(self, count: int) -> None:
+        while self._lazy_source is not None and self._numbered_choice_count() < count:
+            item = next(self._lazy_source, self._lazy_source)
+            if item is self._lazy_source:
+                self._lazy_source = iter(())
+                return
+            display_text = self._lazy_display_text(item).strip()
+            if display_text == '':
+                raise ValueError('Display text cannot be blank.')
+            if display_text in self._display_texts:
+                raise ValueError(f'Display text "{display_text}" already taken.')
+            self._display_texts.add(display_text)
+            self._lazy_choices.append((display_text, item))
+
+    @staticmethod
+    def _parse_number(choice: str) -> Union[int, None]:
+        """
+        :return: The number choice is written as, or None unless it is written exactly as a numbered choice is shown,
+        so that input like '01' or non-ASCII digits is not taken for one
+        """
+        if choice.isascii() and choice.isdigit() and str(int(choice)) == choice:
+            return int(choice)
+        return None
+
+    def _has_number(self, number: int) -> bool:
+        self._take_lazy_choices(number)
+        return 1 <= number <= self._numbered_choice_count()
+
+    def _has_next_page(self) -> bool:
+        return self.page_size is not None and self._has_number((self._page + 1) * self.page_size + 1)
+
+    def _has_previous_page(self) -> bool:
+        return self.page_size is not None and self._page > 0
+
+    def _make_page_executor(self, step: int) -> Callable[..., ExecutorResult]:
+        def page_executor(*args) -> ExecutorResult:
+            self._page += step
+            return False
+        return page_executor
+
+    def has_choice(self, choice: str) -> bool:
+        """
+        :return: Whether choice can be passed to get_executor, without taking more lazy choices than needed
+        """
+        if choice in self._choices:
+            return True
+        number = self._parse_number(choice)
+        if number is not None:
+            # numbers up to _max_choice_number are only ever choices in _choices
+            return number > self._max_choice_number and self._has_number(number)
+        return (choice == self._page_letters[0] and self._has_next_page()) or \
+            (choice == self._page_letters[1] and self._has_previous_page())
+
+    def get_executor(self, choice: str) -> Callable[..., ExecutorResult]:
+        if choice in self._choices:
+            return self._choices[choice][1]
+        if not self.has_choice(choice):
             raise ValueError('Executor does not exist. If it is a reserved choice, this object does not handle it.')
-        return self._choices[choice][1]
+        if choice == self._page_letters[0]:
+            return self._make_page_executor(1)
+        if choice == self._page_letters[1]:
+            return self._make_page_executor(-1)
+        number = self._parse_number(choice)
+        return self._lazy_make_executor(self._lazy_choices[number - self._max_choice_number - 1][1])
 
-    def print_choices(self) -> None:
-        numbered_choices: list[int] = list(range(1, self._max_choice_number + 1))
+    def _get_display_text(self, number: int) -> str:
+        if number <= self._max_choice_number:
+            return self._choices[str(number)][0]
+        return self._lazy_choices[number - self._max_choice_number - 1][0]
+
+    def get_choice_lines(self) -> list[str]:
+        """
+        :return: One line per choice shown, only the current page of numbered choices when paged
+        """
+        with profiling.measure('ChoiceHandler', 'get_choice_lines'):
+            return self._get_choice_lines()
+
+    def _get_choice_lines(self) -> list[str]:
+        lines: list[str] = []
+        if self.page_size is None:
+            self._take_lazy_choices(float('inf'))
+            numbered_choices = range(1, self._numbered_choice_count() + 1)
+        else:
+            self._take_lazy_choices((self._page + 1) * self.page_size)
+            numbered_choices = range(self._page * self.page_size + 1,
+                                     min((self._page + 1) * self.page_size, self._numbered_choice_count()) + 1)
         for n in numbered_choices:
-            display: str = self._choices[str(n)][0]
-            print(f'{n}: {display}')
+            display: str = self._get_display_text(n)
+            lines.append(f'{n}: {display}')
         non_reserved_letters: list[str] = [letter for letter in self._choice_letters if letter not in
                                            self.reserved_choices.keys()]
         for letter in non_reserved_letters:
             display: str = self._choices[letter][0]
-            print(f'{letter}: {display}')
+            lines.append(f'{letter}: {display}')
+        if self._has_next_page():
+            lines.append(f'{self._page_letters[0]}: Next page')
+        if self._has_previous_page():
+            lines.append(f'{self._page_letters[1]}: Previous page')
         for reserved in self.reserved_choices:
-            print(f'{reserved}: {self.reserved_choices[reserved]}')
+            lines.append(f'{reserved}: {self.reserved_choices[reserved]}')
+        return lines
+
+    def print_choices(self) -> None:
+        print(''.join(f'{line}\n' for line in self.get_choice_lines()), end='')
 
     def get_choice_strings(self) -> list[str]:
-        return list(self._choices.keys())
+        """
+        Takes every remaining lazy choice. Use has_choice to check a single choice instead.
+        """
+        self._take_lazy_choices(float('inf'))
+        choice_strings = list(self._choices.keys())
+        choice_strings += [str(n) for n in range(self._max_choice_number + 1, self._numbered_choice_count() + 1)]
+        choice_strings += [letter for letter in self._page_letters if self.has_choice(letter)]
+        return choice_strings
@@ -0,0 +1,154 @@
+import json
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Callable, Union
+
+from engine.utils.dialogue_tree import DialogueGraph, DialogueTree
+
+MAGIC = b'CLIRPGD1'
+# magic, offset of the index, length of the index
+_HEADER = struct.Struct('<8sQQ')
+
+
+class DialogueBundleFormatError(ValueError):
+    pass
+
+
+def _encode(data) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(data: bytes):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def write_dialogue_bundle(dialogues: dict[str, DialogueTree], path: str) -> None:
+    """
+    Writes NPC dialogues to path in the bundle format read by DialogueRepository. Triggers are not written; register
+    them on the repository instead.
+
+    Layout: header, then one zlib-compressed JSON record per NPC holding its entry text, nodes (parents before
+    children) and, for a DialogueGraph, its links, then a compressed JSON index of NPC id -> [offset, length].
+    :param dialogues: NPC id -> that NPC's dialogue
+    :param path: Output file path
+    """
+    index: dict[str, list[int]] = {}
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, 0, 0))
+        for npc_id, dialogue_tree in dialogues.items():
+            nodes = sorted(dialogue_tree.export_dialogue().items(), key=lambda node: node[0].count('_'))
+            record = {'entry_text': dialogue_tree.entry_text,
+                      'nodes': [[full_node_name, player_line, response]
+                                for full_node_name, (player_line, response) in nodes]}
+            if isinstance(dialogue_tree, DialogueGraph):
+                record['links'] = dialogue_tree.export_links()
+            data = _encode(record)
+            index[npc_id] = [f.tell(), len(data)]
+            f.write(data)
+        index_data = _encode(index)
+        index_offset = f.tell()
+        f.write(index_data)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, index_offset, len(index_data)))
+
+
+def _build_dialogue(record: dict) -> DialogueTree:
+    dialogue_tree = DialogueGraph(record['entry_text']) if 'links' in record else DialogueTree(record['entry_text'])
+    for full_node_name, player_line, response in record['nodes']:
+        from_node, _, node_name = full_node_name.rpartition('_')
+        dialogue_tree.add_node(node_name, player_line, response, from_node=from_node or None)
+    for source, targets in record.get('links', {}).items():
+        for target in targets:
+            dialogue_tree.add_link(target, from_node=source or None)
+    return dialogue_tree
+
+
+class DialogueRepository:
+    """
+    NPC dialogues kept on disk in a bundle written by write_dialogue_bundle. Only the index is read up front; an
+    NPC's dialogue is decoded the first time it is asked for and kept in a least-recently-used cache of at most
+    capacity dialogues. Triggers registered with register_trigger, or added to a loaded dialogue with
+    add_or_replace_trigger, are reattached whenever that dialogue is loaded again. Other changes to a loaded
+    dialogue are lost when it is evicted.
+    :param path (str): Path of a file written by write_dialogue_bundle
+    :param capacity (int): Maximum number of dialogues kept loaded
+    """
+
+    def __init__(self, path: str, capacity: int = 32):
+        if capacity < 1:
+            raise ValueError('Capacity must be at least 1.')
+        self.capacity: int = capacity
+        self._file = open(path, 'rb')
+        try:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise DialogueBundleFormatError(f'{path} is empty.')
+        if len(self._buffer) < _HEADER.size or self._buffer[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise DialogueBundleFormatError(f'{path} is not a dialogue bundle.')
+        _, index_offset, index_length = _HEADER.unpack_from(self._buffer)
+        self._index: dict[str, list[int]] = _decode(self._buffer[index_offset:index_offset + index_length])
+        self._loaded: OrderedDict[str, DialogueTree] = OrderedDict()
+        # npc id -> full node name -> action, kept while the dialogue is not loaded
+        self._triggers: dict[str, dict[str, Callable]] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __contains__(self, npc_id: str) -> bool:
+        return npc_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+    def get_npc_ids(self) -> list[str]:
+        return list(self._index)
+
+    def get_loaded_npc_ids(self) -> list[str]:
+        """
+        :return: NPCs whose dialogue is currently loaded, least recently used first
+        """
+        return list(self._loaded)
+
+    def _check_npc(self, npc_id: str) -> None:
+        if npc_id not in self._index:
+            raise ValueError(f'No dialogue for NPC {npc_id}.')
+
+    def register_trigger(self, npc_id: str, node_full_name: str, action: Callable) -> None:
+        """
+        Registers action to run when node_full_name is chosen in npc_id's dialogue, whether or not it is loaded.
+        """
+        self._check_npc(npc_id)
+        if npc_id in self._loaded:
+            self._loaded[npc_id].add_or_replace_trigger(node_full_name, action)
+        else:
+            self._triggers.setdefault(npc_id, {})[node_full_name.strip()] = action
+
+    def get_dialogue(self, npc_id: str) -> Union[DialogueTree, DialogueGraph]:
+        self._check_npc(npc_id)
+        if npc_id in self._loaded:
+            self._loaded.move_to_end(npc_id)
+            return self._loaded[npc_id]
+        offset, length = self._index[npc_id]
+        dialogue_tree = _build_dialogue(_decode(self._buffer[offset:offset + length]))
+        for node_full_name, action in self._triggers.pop(npc_id, {}).items():
+            dialogue_tree.add_or_replace_trigger(node_full_name, action)
+        self._loaded[npc_id] = dialogue_tree
+        if len(self._loaded) > self.capacity:
+            self._evict()
+        return dialogue_tree
+
+    def _evict(self) -> None:
+        npc_id, dialogue_tree = self._loaded.popitem(last=False)
+        if dialogue_tree.dialogue_action_triggers:
+            self._triggers[npc_id] = dict(dialogue_tree.dialogue_action_triggers)
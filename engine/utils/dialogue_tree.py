@@ -6,6 +6,11 @@ class DialogueTree:
     def __init__(self, entry_text: str):
         self.entry_text: str = entry_text
         self.dialogue_paths: dict[str, tuple[str, str]] = {}
+        # full node name ('' for the entry point) -> full names of the nodes that follow it (dict used as an ordered
+        # set), so that navigating and pruning never scan every node
+        self._children: dict[str, dict[str, None]] = {'': {}}
+        # incremented by every change to the nodes, so that callers can tell when the available choices may differ
+        self._version: int = 0
         self.curr_node: str = ''
         self.dialogue_action_triggers: dict[str, Callable] = {}
 
@@ -28,6 +33,10 @@ class DialogueTree:
         if full_node_name in self.dialogue_paths.keys():
             raise ValueError(f'Node path {full_node_name} already taken.')
         self.dialogue_paths[full_node_name] = (player_line, response)
+        self._children.setdefault('' if from_node is None else from_node, {})[full_node_name] = None
+        # a child may have been added before its parent
+        self._children.setdefault(full_node_name, {})
+        self._version += 1
 
     def replace_node(self, node_name: str, player_line: str, response: str,
                      from_node: str = None) -> None:
@@ -35,6 +44,10 @@ class DialogueTree:
         if full_node_name not in self.dialogue_paths.keys():
             raise ValueError(f'Node {full_node_name} does not exist.')
         self.dialogue_paths[full_node_name] = (player_line, response)
+        self._version += 1
+
+    def get_version(self) -> int:
+        return self._version
 
     def get_player_line(self, full_node_name: str) -> str:
         return self.dialogue_paths[full_node_name][0]
@@ -43,11 +56,7 @@ class DialogueTree:
         return self.dialogue_paths[full_node_name][1]
 
     def get_available_nodes(self) -> list[str]:
-        all_nodes = list(self.dialogue_paths.keys())
-        current_node = self.get_current_node()
-        if current_node == '':
-            return list(filter(lambda x: '_' not in x, all_nodes))
-        return list(filter(lambda x: x.rsplit('_', maxsplit=1)[0] == current_node, all_nodes))
+        return list(self._children.get(self.get_current_node(), ()))
 
     def update_current_node(self, new_node_full_name: str):
         if new_node_full_name == '':
@@ -58,11 +67,16 @@ class DialogueTree:
         self.curr_node = new_node_full_name
 
     def cut_branch(self, head_full_name: str):
-        all_nodes: list[str] = list(self.dialogue_paths.keys())
-        if head_full_name.strip() not in all_nodes:
+        head = head_full_name.strip()
+        if head not in self.dialogue_paths:
             raise ValueError(f'Node does not exist.')
-        nodes_to_remove = list(filter(lambda x: x.startswith(head_full_name.strip()), all_nodes))
-        for node in nodes_to_remove:
+        parent = head.rsplit('_', maxsplit=1)[0] if '_' in head else ''
+        self._children[parent].pop(head)
+        self._version += 1
+        nodes_to_remove = [head]
+        while nodes_to_remove:
+            node = nodes_to_remove.pop()
+            nodes_to_remove.extend(self._children.pop(node))
             self.dialogue_paths.pop(node)
             if node in self.dialogue_action_triggers:
                 self.dialogue_action_triggers.pop(node)
@@ -88,3 +102,104 @@ class DialogueTree:
         if node.strip() not in self.dialogue_action_triggers.keys():
             raise ValueError(f'Node {node.strip()} does not exist or does not have triggered action.')
         self.dialogue_action_triggers.pop(node.strip())
+
+
+class DialogueGraph(DialogueTree):
+    """
+    A DialogueTree whose nodes can also follow nodes other than their parent, through links. Common sub-conversations
+    such as shop menus or farewells are then written once and linked to from wherever they are offered, instead of
+    being copied under every parent. A linked node keeps its own full name, so get_available_nodes,
+    update_current_node and the triggers work unchanged; following a link simply moves to the shared node. Links may
+    point back up the dialogue, so the graph can have cycles.
+    """
+
+    def __init__(self, entry_text: str):
+        super().__init__(entry_text)
+        # linked node -> nodes linking to it ('' for the entry point), so cutting a branch can drop links into it
+        self._link_sources: dict[str, dict[str, None]] = {}
+
+    @staticmethod
+    def _parent_of(full_node_name: str) -> str:
+        return full_node_name.rsplit('_', maxsplit=1)[0] if '_' in full_node_name else ''
+
+    def add_link(self, target_full_name: str, from_node: str = None) -> None:
+        """
+        Offers an existing node after from_node, as well as after its own parent.
+        :param target_full_name: Full name of the node to link to
+        :param from_node: Full name of the node the link is offered after, or None for the entry point
+        """
+        target = target_full_name.strip()
+        source = '' if from_node is None else from_node.strip()
+        if target not in self.dialogue_paths:
+            raise ValueError(f'Node {target} does not exist.')
+        if source != '' and source not in self.dialogue_paths:
+            raise ValueError(f'Node {source} does not exist.')
+        if target in self._children[source]:
+            raise ValueError(f'Node {target} already follows {source or "the entry point"}.')
+        self._children[source][target] = None
+        self._link_sources.setdefault(target, {})[source] = None
+        self._version += 1
+
+    def remove_link(self, target_full_name: str, from_node: str = None) -> None:
+        target = target_full_name.strip()
+        source = '' if from_node is None else from_node.strip()
+        if source not in self._link_sources.get(target, {}):
+            raise ValueError(f'No link from {source or "the entry point"} to {target}.')
+        self._link_sources[target].pop(source)
+        if not self._link_sources[target]:
+            self._link_sources.pop(target)
+        self._children[source].pop(target)
+        self._version += 1
+
+    def export_links(self) -> dict[str, list[str]]:
+        """
+        :return: Full names of the linked nodes following each node ('' for the entry point), to be stored alongside
+        export_dialogue
+        """
+        links = {}
+        for target, sources in self._link_sources.items():
+            for source in sources:
+                links.setdefault(source, []).append(target)
+        return links
+
+    def get_reachable_nodes(self, start_node: str = '') -> list[str]:
+        """
+        :return: Full names of every node that can be reached from start_node by following nodes and links, each
+        listed once even if the dialogue loops back on itself
+        """
+        visited = {start_node: None}
+        stack = [start_node]
+        while stack:
+            for node in self._children.get(stack.pop(), ()):
+                if node not in visited:
+                    visited[node] = None
+                    stack.append(node)
+        visited.pop(start_node)
+        return list(visited)
+
+    def cut_branch(self, head_full_name: str):
+        head = head_full_name.strip()
+        if head not in self.dialogue_paths:
+            raise ValueError(f'Node does not exist.')
+        self._children[self._parent_of(head)].pop(head)
+        self._version += 1
+        # follow only parent -> child edges, so shared nodes linked from inside the branch are kept
+        removed = []
+        stack = [head]
+        while stack:
+            node = stack.pop()
+            removed.append(node)
+            for child in self._children.pop(node):
+                if self._parent_of(child) == node:
+                    stack.append(child)
+                else:
+                    self._link_sources[child].pop(node)
+                    if not self._link_sources[child]:
+                        self._link_sources.pop(child)
+        for node in removed:
+            for source in self._link_sources.pop(node, {}):
+                if source in self._children:
+                    self._children[source].pop(node)
+            self.dialogue_paths.pop(node)
+            if node in self.dialogue_action_triggers:
+                self.dialogue_action_triggers.pop(node)
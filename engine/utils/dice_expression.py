@@ -0,0 +1,288 @@
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import factorial
+from typing import NamedTuple, Union
+from engine.utils.rng import RngStream, get_session_stream, numpy
+from engine.utils.roll import Roll, _Distribution, _advantage_ways, _dice_sum_counts, _distribution_from_ways
+
+# one term of an expression: an optional sign, then either dice with an optional drop/keep modifier, or a constant
+_TERM_PATTERN = re.compile(r'\s*([+-])?\s*(?:(\d*)d(\d+)(?:\s*(drop|keep|d|k)\s*(lowest|highest|l|h)\s*(\d+)?)?|(\d+))'
+                           r'\s*')
+_MINIMUM_PATTERN = re.compile(r'\(\s*min\.?\s*(-?\d+)\s*\)\s*$')
+
+
+class _DiceTerm(NamedTuple):
+    sign: int
+    n: int
+    d: int
+    # number of dice kept after dropping, and whether the highest or lowest ones are kept
+    keep: int
+    keep_highest: bool
+
+    def get_display_text(self) -> str:
+        text = f'{self.n}d{self.d}'
+        if self.keep < self.n:
+            dropped = self.n - self.keep
+            text += ' drop lowest' if self.keep_highest else ' drop highest'
+            if dropped > 1:
+                text += f' {dropped}'
+        return text
+
+
+@lru_cache(maxsize=256)
+def _term_sum_counts(n: int, d: int, keep: int, keep_highest: bool) -> tuple[tuple[int, int], ...]:
+    """
+    :return: Pairs of total and number of ways the kept dice of nDd can add up to it, out of d ** n
+    """
+    if keep == n:
+        return tuple(enumerate(_dice_sum_counts(n, d), start=n))
+    # go through the sorted outcomes, each standing for every ordering of its dice
+    n_orderings = factorial(n)
+    counts = {}
+    for dice in combinations_with_replacement(range(1, d + 1), n):
+        total = sum(dice[n - keep:] if keep_highest else dice[:keep])
+        ways = n_orderings
+        for count in Counter(dice).values():
+            ways //= factorial(count)
+        counts[total] = counts.get(total, 0) + ways
+    return tuple(sorted(counts.items()))
+
+
+@lru_cache(maxsize=1024)
+def _expression_distribution(dice_terms: tuple[_DiceTerm, ...], bonus: int, adv: int,
+                             minimum: Union[int, None]) -> _Distribution:
+    ways = {0: 1}
+    total_ways = 1
+    for term in dice_terms:
+        term_counts = _term_sum_counts(term.n, term.d, term.keep, term.keep_highest)
+        new_ways = {}
+        for total, count in ways.items():
+            for term_total, term_count in term_counts:
+                result = total + term.sign * term_total
+                new_ways[result] = new_ways.get(result, 0) + count * term_count
+        ways = new_ways
+        total_ways *= term.d ** term.n
+    raw_totals = sorted(ways)
+    branch_ways = [ways[raw_total] for raw_total in raw_totals]
+    if adv != 0:
+        branch_ways = _advantage_ways(branch_ways, total_ways, adv)
+        total_ways **= 2
+    ways = {}
+    for raw_total, count in zip(raw_totals, branch_ways):
+        result = raw_total + bonus if minimum is None else max(raw_total + bonus, minimum)
+        ways[result] = ways.get(result, 0) + count
+    return _distribution_from_ways(ways, total_ways)
+
+
+class DiceExpression(Roll):
+    """
+    A compiled dice expression such as '2d6+1d4+3', '4d6 drop lowest' or '1d4-2 (min. 1)', usable anywhere a Roll
+    is. bonus is the sum of the constant terms, and n and d are those of the first dice term, so the Roll mutators
+    work on expressions too. Unlike a Roll's, the minimum applies whatever the bonus, and None means there is none.
+    Advantage rolls the whole expression twice.
+
+    Plans from compile_dice_expression are shared between everything compiled from the same string, so get them
+    from there rather than building them directly, and only change copies of them.
+    :param dice_terms (list[_DiceTerm]): The dice terms, in the order written
+    :param bonus (int): Sum of the constant terms
+    :param minimum (int, None): Lowest possible result, or None for no minimum
+    :param adv (int): 1 for advantage, -1 for disadvantage, 0 for neither
+    """
+
+    def __init__(self, dice_terms: list[_DiceTerm], bonus: int = 0, minimum: Union[int, None] = None,
+                 adv: int = 0):
+        self._dice_terms: tuple[_DiceTerm, ...] = tuple(dice_terms)
+        self.bonus: int = int(bonus)
+        self.min: Union[int, None] = minimum
+        self.adv: int = 0
+        self.set_advantage(adv)
+
+    def __repr__(self) -> str:
+        return f'DiceExpression({self.get_display_text()!r})'
+
+    @property
+    def n(self) -> int:
+        return self._dice_terms[0].n if self._dice_terms else 0
+
+    @n.setter
+    def n(self, new_n: int) -> None:
+        term = self._first_dice_term()
+        # a term that drops dice keeps as many as before, as far as it can
+        keep = new_n if term.keep == term.n else min(term.keep, new_n)
+        self._dice_terms = (term._replace(n=new_n, keep=keep),) + self._dice_terms[1:]
+
+    @property
+    def d(self) -> int:
+        return self._dice_terms[0].d if self._dice_terms else 0
+
+    @d.setter
+    def d(self, new_size: int) -> None:
+        self._dice_terms = (self._first_dice_term()._replace(d=new_size),) + self._dice_terms[1:]
+
+    def _first_dice_term(self) -> _DiceTerm:
+        if not self._dice_terms:
+            raise ValueError(f'Dice expression {self.get_display_text()!r} has no dice.')
+        return self._dice_terms[0]
+
+    def _get_maximum(self) -> int:
+        return self.bonus + sum(term.keep * term.d if term.sign > 0 else -term.keep for term in self._dice_terms)
+
+    def minimum_forces_constant(self) -> bool:
+        return self.min is not None and self._get_maximum() <= self.min
+
+    def get_display_text(self) -> str:
+        if self.minimum_forces_constant():
+            return str(self.min)
+        parts = [term.get_display_text() for term in self._dice_terms]
+        signs = [term.sign for term in self._dice_terms]
+        if self.bonus != 0 or not parts:
+            parts.append(str(abs(self.bonus)))
+            signs.append(1 if self.bonus >= 0 else -1)
+        separator = ' ' if any(term.keep < term.n for term in self._dice_terms) else ''
+        text = ('-' if signs[0] < 0 else '') + parts[0]
+        for sign, part in zip(signs[1:], parts[1:]):
+            text += f'{separator}{"+" if sign > 0 else "-"}{separator}{part}'
+        if self.adv == 1:
+            text += ' with advantage'
+        elif self.adv == -1:
+            text += ' with disadvantage'
+        if self.min is not None:
+            text += f' (min. {self.min})'
+        return text
+
+    def copy(self) -> 'DiceExpression':
+        return DiceExpression(list(self._dice_terms), bonus=self.bonus, minimum=self.min, adv=self.adv)
+
+    def raw_roll_once(self, rng: RngStream = None) -> int:
+        """
+        :return: Total of the dice terms, without the bonus, advantage or minimum
+        """
+        if rng is None:
+            rng = get_session_stream()
+        total = 0
+        for term in self._dice_terms:
+            rolls = rng.dice(term.d, term.n)
+            if term.keep < term.n:
+                rolls.sort()
+                rolls = rolls[term.n - term.keep:] if term.keep_highest else rolls[:term.keep]
+            total += term.sign * sum(rolls)
+        return total
+
+    def roll(self, rng: RngStream = None) -> int:
+        """
+        :param rng: Stream to roll from. Defaults to the session stream.
+        """
+        if rng is None:
+            rng = get_session_stream()
+        total = self.raw_roll_once(rng)
+        if self.adv != 0:
+            other_total = self.raw_roll_once(rng)
+            total = max(total, other_total) if self.adv == 1 else min(total, other_total)
+        total += self.bonus
+        return total if self.min is None else max(total, self.min)
+
+    def roll_many(self, k: int, rng: RngStream = None) -> Union[array, 'numpy.ndarray']:
+        """
+        Rolls k times at once, drawing all the dice of each term in one call, from NumPy when it is installed.
+        :param k: Number of rolls
+        :param rng: Stream to roll from. Defaults to the session stream.
+        :return: The k results, as a NumPy int64 array if NumPy is installed, or an array.array('q') if not
+        """
+        k = max(0, int(k))
+        branches = abs(self.adv) + 1
+        if rng is None:
+            rng = get_session_stream()
+        if numpy is not None:
+            totals = numpy.zeros(k * branches, dtype=numpy.int64)
+            for term in self._dice_terms:
+                rolls = rng.numpy_generator().integers(1, term.d + 1, size=(k * branches, term.n), dtype=numpy.int64)
+                if term.keep < term.n:
+                    rolls.sort(axis=1)
+                    rolls = rolls[:, term.n - term.keep:] if term.keep_highest else rolls[:, :term.keep]
+                totals += term.sign * rolls.sum(axis=1)
+            if self.adv != 0:
+                totals = totals.reshape(k, branches)
+                totals = totals.max(axis=1) if self.adv == 1 else totals.min(axis=1)
+            totals += self.bonus
+            return totals if self.min is None else numpy.maximum(totals, self.min)
+        totals = [0] * (k * branches)
+        for term in self._dice_terms:
+            rolls = iter(rng.dice(term.d, k * branches * term.n))
+            groups = zip(*[rolls] * term.n)
+            if term.keep == term.n:
+                sums = map(sum, groups)
+            elif term.keep_highest:
+                sums = (sum(sorted(group)[term.n - term.keep:]) for group in groups)
+            else:
+                sums = (sum(sorted(group)[:term.keep]) for group in groups)
+            totals = [total + term.sign * term_sum for total, term_sum in zip(totals, sums)]
+        if self.adv != 0:
+            totals = map(max if self.adv == 1 else min, zip(*[iter(totals)] * branches))
+        totals = (total + self.bonus for total in totals)
+        if self.min is not None:
+            totals = (max(total, self.min) for total in totals)
+        return array('q', totals)
+
+    def _get_distribution(self) -> _Distribution:
+        """
+        Exact, like a Roll's. Terms that drop dice are counted by going through every sorted outcome of their dice,
+        so they cost time in proportion to the number of those, which grows quickly with the number of dice.
+        """
+        if self.minimum_forces_constant():
+            return _Distribution((self.min,), (1.0,), (1.0,), (1.0,), float(self.min), 0.0)
+        return _expression_distribution(self._dice_terms, self.bonus, self.adv, self.min)
+
+
+def _parse(text: str) -> DiceExpression:
+    expression = text.strip().lower()
+    minimum = None
+    if minimum_match := _MINIMUM_PATTERN.search(expression):
+        minimum = int(minimum_match.group(1))
+        expression = expression[:minimum_match.start()]
+    if expression.strip() == '':
+        raise ValueError(f'Cannot parse dice expression {text!r}: Empty expression.')
+    dice_terms = []
+    bonus = 0
+    position = 0
+    while position < len(expression):
+        match = _TERM_PATTERN.match(expression, position)
+        if match is None or match.end() == position or (position > 0 and match.group(1) is None):
+            raise ValueError(f'Cannot parse dice expression {text!r}: Unexpected {expression[position:].strip()!r}.')
+        sign_text, n_text, d_text, modifier, which, count_text, constant_text = match.groups()
+        sign = -1 if sign_text == '-' else 1
+        position = match.end()
+        if constant_text is not None:
+            bonus += sign * int(constant_text)
+            continue
+        n = int(n_text) if n_text else 1
+        d = int(d_text)
+        if n < 1 or d < 2:
+            raise ValueError(f'Cannot parse dice expression {text!r}: Need at least one die of at least 2 sides.')
+        keep, keep_highest = n, True
+        if modifier is not None:
+            count = int(count_text) if count_text else 1
+            highest = which in ('highest', 'h')
+            if modifier in ('drop', 'd'):
+                keep, keep_highest = n - count, not highest
+            else:
+                keep, keep_highest = count, highest
+            if not 1 <= keep <= n:
+                raise ValueError(f'Cannot parse dice expression {text!r}: Must keep between 1 and {n} of {n}d{d}.')
+        dice_terms.append(_DiceTerm(sign, n, d, keep, keep_highest))
+    return DiceExpression(dice_terms, bonus, minimum)
+
+
+@lru_cache(maxsize=4096)
+def compile_dice_expression(text: str) -> DiceExpression:
+    """
+    Compiles a dice expression into a reusable plan. Each distinct string is only parsed once, and every call with
+    it returns the same plan.
+    :param text: Dice and integer constants joined by + or -. Dice are written NdD or dD, optionally followed by
+    'drop lowest', 'drop highest', 'keep highest' or 'keep lowest' and a count (1 if left out), or the short forms
+    dl, dh, kh and kl. The expression may end with a minimum result in the form '(min. X)'.
+    :return: DiceExpression
+    """
+    return _parse(text)
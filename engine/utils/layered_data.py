@@ -0,0 +1,125 @@
+from collections.abc import Mapping, MutableMapping
+from copy import deepcopy
+from typing import Any, Iterator
+
+# values of these types are shared between layers rather than copied
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, tuple, frozenset, type(None))
+
+
+def _read_only(value: Any) -> Any:
+    """
+    :return: value if it is immutable, a frozen layer over it if it is a mapping, otherwise a deep copy of it
+    """
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, Mapping):
+        layer = LayeredDict(value)
+        layer._frozen = True
+        return layer
+    return deepcopy(value)
+
+
+class LayeredDict(MutableMapping):
+    """
+    A dict-like overlay on a parent mapping. Writes and deletions go to this layer only, so deriving one from another
+    costs O(changed keys) however large the parent is. A nested mapping read from the parent comes back as a layer
+    over it, and any other mutable value is deep-copied into this layer the first time it is read, so changing what
+    is read never changes the parent.
+
+    The parent must not change while layers over it are in use. A LayeredDict is frozen, and rejects writes, once a
+    layer has been put over it; a plain dict parent is trusted not to change. Reading a frozen layer gives frozen
+    layers over nested mappings and copies of other mutable values, so nothing read from it changes it.
+    :param parent (Mapping): The mapping to overlay
+    :param changes (Mapping): Keys to set in this layer
+    """
+
+    def __init__(self, parent: Mapping = None, changes: Mapping = None):
+        if isinstance(parent, LayeredDict):
+            parent._frozen = True
+        self._parent: Mapping = parent if parent is not None else {}
+        self._layer: dict = {}
+        # keys of the parent deleted in this layer; dict used as an ordered set
+        self._deleted: dict = {}
+        self._frozen: bool = False
+        if changes is not None:
+            self.update(changes)
+
+    def derive(self, changes: Mapping = None) -> 'LayeredDict':
+        """
+        :return: A new layer over this one, which freezes this one
+        """
+        return LayeredDict(self, changes)
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def _check_not_frozen(self) -> None:
+        if self._frozen:
+            raise ValueError('Layer is frozen because other layers are built on it. Derive a new layer to change it.')
+
+    def _get_raw(self, key) -> Any:
+        """
+        :return: The value stored for key in this layer or below, neither wrapped nor copied
+        """
+        if key in self._layer:
+            return self._layer[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        if isinstance(self._parent, LayeredDict):
+            return self._parent._get_raw(key)
+        return self._parent[key]
+
+    def __getitem__(self, key) -> Any:
+        if self._frozen:
+            # values stored here are shared with the layers built on this one, so they are never handed out as is
+            return _read_only(self._get_raw(key))
+        if key in self._layer:
+            return self._layer[key]
+        value = self._get_raw(key)
+        if isinstance(value, _IMMUTABLE_TYPES):
+            return value
+        value = LayeredDict(value) if isinstance(value, Mapping) else deepcopy(value)
+        self._layer[key] = value
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self._check_not_frozen()
+        self._deleted.pop(key, None)
+        self._layer[key] = value
+
+    def __delitem__(self, key) -> None:
+        self._check_not_frozen()
+        if key not in self:
+            raise KeyError(key)
+        self._layer.pop(key, None)
+        if key in self._parent:
+            self._deleted[key] = None
+
+    def __contains__(self, key) -> bool:
+        if key in self._layer:
+            return True
+        return key not in self._deleted and key in self._parent
+
+    def __iter__(self) -> Iterator:
+        for key in self._parent:
+            if key not in self._deleted:
+                yield key
+        for key in self._layer:
+            if key not in self._parent:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f'LayeredDict({self.to_dict()!r})'
+
+    def to_dict(self) -> dict:
+        """
+        :return: A plain dict of this layer's contents, with nested layers turned into dicts too
+        """
+        result = {}
+        for key in self:
+            value = self._layer[key] if key in self._layer else self._parent[key]
+            result[key] = value.to_dict() if isinstance(value, LayeredDict) else deepcopy(value)
+        return result
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Iterable, Iterator, Union
+
+
+class InputSource:
+    """
+    Where a context reads the player's input from, one line at a time, blocking until a line is available.
+    """
+
+    def read_line(self) -> str:
+        raise NotImplementedError
+
+
+class StdinSource(InputSource):
+
+    def read_line(self) -> str:
+        return input()
+
+
+class ScriptedInputSource(InputSource):
+    """
+    Reads scripted lines, for tests and headless sessions.
+    :param lines (Iterable[str]): The lines, in order
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines: Iterator[str] = iter(lines)
+        self.lines_read: int = 0
+
+    def read_line(self) -> str:
+        """
+        :raises EOFError: once the script has run out
+        """
+        line = next(self._lines, None)
+        if line is None:
+            raise EOFError('Script has run out.')
+        self.lines_read += 1
+        return line
+
+
+class AsyncLineSource:
+    """
+    Where Context.enter_async reads the player's input from. Waiting for a line suspends only the session waiting for
+    it, so an idle session costs its state and no thread.
+    """
+
+    async def read_line(self) -> str:
+        """
+        :raises EOFError: if the player is gone
+        """
+        raise NotImplementedError
+
+
+class QueueLineSource(AsyncLineSource):
+    """
+    Lines fed in by whatever owns the session, for example a server dispatching messages to sessions.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue[Union[str, None]] = asyncio.Queue()
+
+    def feed(self, line: str) -> None:
+        self._queue.put_nowait(line)
+
+    def close(self) -> None:
+        """
+        Makes the next read raise EOFError once the lines fed so far have been read.
+        """
+        self._queue.put_nowait(None)
+
+    async def read_line(self) -> str:
+        line = await self._queue.get()
+        if line is None:
+            self.close()
+            raise EOFError('Line source closed.')
+        return line
+
+
+class StreamLineSource(AsyncLineSource):
+    """
+    Lines read from an asyncio stream, such as a client connection accepted by asyncio.start_server.
+    :param reader (asyncio.StreamReader): The stream to read
+    :param encoding (str): Text encoding used on the wire
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, encoding: str = 'utf-8'):
+        self.reader: asyncio.StreamReader = reader
+        self.encoding: str = encoding
+
+    async def read_line(self) -> str:
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError('Stream closed.')
+        return line.decode(self.encoding).rstrip('\r\n')
+
+
+class BlockingLineSource(InputSource):
+    """
+    Adapts an AsyncLineSource for synchronous code running in a worker thread, by waiting on the event loop that owns
+    the source. Must not be read from the event loop's own thread.
+    :param line_source (AsyncLineSource): The source to read
+    :param loop (asyncio.AbstractEventLoop): The running loop that line_source belongs to
+    """
+
+    def __init__(self, line_source: AsyncLineSource, loop: asyncio.AbstractEventLoop):
+        self.line_source: AsyncLineSource = line_source
+        self.loop: asyncio.AbstractEventLoop = loop
+
+    def read_line(self) -> str:
+        return asyncio.run_coroutine_threadsafe(self.line_source.read_line(), self.loop).result()
+
+
+async def run_sync_context(context, line_source: AsyncLineSource, exit_choice: str = 'b') -> bool:
+    """
+    Runs the synchronous loop of context in a worker thread, reading from line_source. For contexts whose executors
+    enter other contexts or read input directly rather than through enter_child and prompt_async; the session holds a
+    thread while it runs. The context's own input source is replaced for the duration and reset to None afterwards.
+    :param context (Context): The context to enter
+    :param line_source: Where to read input from
+    :param exit_choice: Passed on to enter
+    :return: What enter returns
+    """
+    context.set_input_source(BlockingLineSource(line_source, asyncio.get_running_loop()))
+    try:
+        return await asyncio.to_thread(context.enter, exit_choice)
+    finally:
+        context.set_input_source(None)
+
+
+_default_input_source: InputSource = StdinSource()
+
+
+def get_default_input_source() -> InputSource:
+    return _default_input_source
+
+
+def set_default_input_source(input_source: Union[InputSource, None]) -> None:
+    """
+    Sets the source read by contexts that have no source of their own and no ancestor with one.
+    :param input_source: The new default source, or None to go back to stdin
+    """
+    global _default_input_source
+    _default_input_source = input_source if input_source is not None else StdinSource()
@@ -0,0 +1,141 @@
+from typing import Union
+
+
+class LocationIdRegistry:
+    """
+    Hands out integer ids for regions, localities and lowest-level locations and remembers how they nest, so that
+    code on hot paths can move between a location, its parent and its children without parsing global location
+    strings. Ids are assigned consecutively and are not reused after being unregistered, so a stale id can never
+    silently refer to a different location.
+    """
+
+    def __init__(self):
+        self._global_locations: list[Union[str, None]] = []
+        self._ids: dict[str, int] = {}
+        self._parents: list[int] = []
+        self._children: list[Union[dict[int, None], None]] = []
+        self._levels: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, global_location: str) -> bool:
+        return global_location in self._ids
+
+    def register(self, global_location: str, parent_id: int = -1) -> int:
+        """
+        :param global_location: The global location string to register
+        :param parent_id: Id of the containing region or locality, or -1 for a region
+        :return: The new id
+        """
+        if global_location in self._ids:
+            raise ValueError(f'{global_location} is already registered.')
+        level = 1 if parent_id == -1 else self.get_level(parent_id) + 1
+        if level > 3:
+            raise ValueError('Lowest-level locations cannot contain other locations.')
+        location_id = len(self._global_locations)
+        self._global_locations.append(global_location)
+        self._ids[global_location] = location_id
+        self._parents.append(parent_id)
+        self._children.append({} if level < 3 else None)
+        self._levels.append(level)
+        if parent_id != -1:
+            self._children[parent_id][location_id] = None
+        return location_id
+
+    def register_many(self, locations: list[tuple[str, Union[str, None]]]) -> None:
+        """
+        Registers many locations in order, faster than calling register for each. Nothing is registered if any of
+        them cannot be.
+        :param locations: Pairs of global location and the global location of its parent, or None for a region. A
+        parent may be registered earlier in the same call.
+        """
+        first_id = len(self._global_locations)
+        ids, global_locations, parents, children, levels = (self._ids, self._global_locations, self._parents,
+                                                            self._children, self._levels)
+        location_id = first_id
+        try:
+            for global_location, parent in locations:
+                if global_location in ids:
+                    raise ValueError(f'{global_location} is already registered.')
+                if parent is None:
+                    parent_id = -1
+                    level = 1
+                else:
+                    parent_id = ids.get(parent, -1)
+                    if parent_id == -1:
+                        raise ValueError(f'Location {parent} does not exist.')
+                    level = levels[parent_id] + 1
+                    if level > 3:
+                        raise ValueError('Lowest-level locations cannot contain other locations.')
+                    children[parent_id][location_id] = None
+                global_locations.append(global_location)
+                ids[global_location] = location_id
+                parents.append(parent_id)
+                children.append({} if level < 3 else None)
+                levels.append(level)
+                location_id += 1
+        except ValueError:
+            # take back the ones registered so far
+            for location_id in range(len(self._global_locations) - 1, first_id - 1, -1):
+                parent_id = self._parents[location_id]
+                if parent_id != -1:
+                    self._children[parent_id].pop(location_id)
+                self._ids.pop(self._global_locations[location_id])
+            for fields in (self._global_locations, self._parents, self._children, self._levels):
+                del fields[first_id:]
+            raise
+
+    def unregister(self, location_id: int) -> None:
+        """
+        Unregisters location_id and everything it contains.
+        """
+        self._check(location_id)
+        parent_id = self._parents[location_id]
+        if parent_id != -1:
+            self._children[parent_id].pop(location_id)
+        stack = [location_id]
+        while stack:
+            current = stack.pop()
+            if self._children[current]:
+                stack.extend(self._children[current])
+            self._ids.pop(self._global_locations[current])
+            self._global_locations[current] = None
+            self._children[current] = None
+
+    def _check(self, location_id: int) -> None:
+        if not 0 <= location_id < len(self._global_locations) or self._global_locations[location_id] is None:
+            raise ValueError(f'Location id {location_id} does not exist.')
+
+    def get_id(self, global_location: str) -> int:
+        if global_location not in self._ids:
+            raise ValueError(f'Location {global_location} does not exist.')
+        return self._ids[global_location]
+
+    def get_global_location(self, location_id: int) -> str:
+        self._check(location_id)
+        return self._global_locations[location_id]
+
+    def get_level(self, location_id: int) -> int:
+        """
+        :return: 1 for a region, 2 for a locality, 3 for a lowest-level location
+        """
+        self._check(location_id)
+        return self._levels[location_id]
+
+    def get_parent_id(self, location_id: int) -> int:
+        """
+        :return: Id of the containing region or locality, or -1 for a region
+        """
+        self._check(location_id)
+        return self._parents[location_id]
+
+    def get_child_ids(self, location_id: int) -> list[int]:
+        self._check(location_id)
+        return list(self._children[location_id] or ())
+
+    def get_region_id(self, location_id: int) -> int:
+        self._check(location_id)
+        while self._parents[location_id] != -1:
+            location_id = self._parents[location_id]
+        return location_id
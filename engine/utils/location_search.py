@@ -0,0 +1,220 @@
+import heapq
+from itertools import islice
+from typing import Union
+from engine.utils.location_tree import LocationTree
+
+# a trie leaf holding more keys than this is split into one child per next character
+_BURST_LIMIT = 32
+# fuzzy candidates are drawn from the rarest trigrams of the query until about this many have been counted, so a
+# query made only of very common trigrams only scores the first this many names that share its rarest one
+_CANDIDATE_BUDGET = 1024
+
+
+def _normalize(display_name: str) -> str:
+    return ' '.join(display_name.lower().split())
+
+
+def _trigrams(name: str) -> set[str]:
+    padded = f' {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    """
+    Node of a burst trie. Until it bursts, a node is a leaf and bucket holds every key below it. Once it has
+    children, bucket only holds the key that ends exactly at this node, if any.
+    """
+    __slots__ = ('children', 'bucket')
+
+    def __init__(self):
+        self.children: Union[dict[str, '_TrieNode'], None] = None
+        # key -> global locations indexed under it (dict used as an ordered set)
+        self.bucket: dict[str, dict[str, None]] = {}
+
+
+class LocationSearchIndex:
+    """
+    Search over the display names of the regions, localities and lowest-level locations of a LocationTree, for
+    players typing part of a place name. Matching ignores case and repeated whitespace.
+
+    A query first matches by prefix, against the start of a display name or the start of any word in it, through
+    a burst trie: small buckets of keys that split into per-character children once they grow, so lookups touch a
+    handful of nodes and no per-character node is made for the tail of a rare name. Prefix matches are returned
+    shortest completion first. If there are fewer than k of them, the rest are filled in by trigram similarity,
+    which tolerates typos. The index listens to the tree and updates itself on every mutation.
+    :param location_tree (LocationTree): The tree to index
+    """
+
+    def __init__(self, location_tree: LocationTree):
+        self.location_tree: LocationTree = location_tree
+        self._root: _TrieNode = _TrieNode()
+        # global location -> normalized display name
+        self._names: dict[str, str] = {}
+        # global location -> number of distinct trigrams in its normalized display name
+        self._trigram_counts: dict[str, int] = {}
+        # trigram -> global locations whose display name contains it (dict used as an ordered set)
+        self._trigram_postings: dict[str, dict[str, None]] = {}
+        for region, display_name in location_tree.regions:
+            self._add(region, display_name)
+        for locality, locality_data in location_tree.get_localities().items():
+            self._add(locality, locality_data['display_name'])
+        for global_location, display_name in location_tree.lowest_level_locations:
+            self._add(global_location, display_name)
+        location_tree.add_change_listener(self._on_tree_change)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def close(self) -> None:
+        """
+        Stops following changes to the tree.
+        """
+        self.location_tree.remove_change_listener(self._on_tree_change)
+
+    def _on_tree_change(self, event: str, global_location: str, display_name: Union[str, None]) -> None:
+        if event != 'added':
+            self._remove(global_location)
+        if event != 'removed':
+            self._add(global_location, display_name)
+
+    @staticmethod
+    def _keys(name: str) -> list[str]:
+        words = name.split(' ')
+        return list(dict.fromkeys(' '.join(words[i:]) for i in range(len(words))))
+
+    def _add(self, global_location: str, display_name: str) -> None:
+        name = _normalize(display_name)
+        self._names[global_location] = name
+        for key in self._keys(name):
+            self._insert_key(key, global_location)
+        trigrams = _trigrams(name)
+        self._trigram_counts[global_location] = len(trigrams)
+        for trigram in trigrams:
+            self._trigram_postings.setdefault(trigram, {})[global_location] = None
+
+    def _remove(self, global_location: str) -> None:
+        name = self._names.pop(global_location)
+        self._trigram_counts.pop(global_location)
+        for key in self._keys(name):
+            node = self._find_node(key)
+            global_locations = node.bucket[key]
+            global_locations.pop(global_location)
+            if not global_locations:
+                node.bucket.pop(key)
+        for trigram in _trigrams(name):
+            postings = self._trigram_postings[trigram]
+            postings.pop(global_location)
+            if not postings:
+                self._trigram_postings.pop(trigram)
+
+    def _find_node(self, key: str) -> Union[_TrieNode, None]:
+        """
+        :return: The node whose bucket holds key if it is indexed, or None if no indexed key starts with key
+        """
+        node = self._root
+        for depth in range(len(key)):
+            if node.children is None:
+                return node
+            node = node.children.get(key[depth])
+            if node is None:
+                return None
+        return node
+
+    def _insert_key(self, key: str, global_location: str) -> None:
+        node, depth = self._root, 0
+        while node.children is not None and depth < len(key):
+            node = node.children.setdefault(key[depth], _TrieNode())
+            depth += 1
+        node.bucket.setdefault(key, {})[global_location] = None
+        if node.children is None and len(node.bucket) > _BURST_LIMIT:
+            self._burst(node, depth)
+
+    def _burst(self, node: _TrieNode, depth: int) -> None:
+        bucket, node.bucket, node.children = node.bucket, {}, {}
+        for key, global_locations in bucket.items():
+            if len(key) == depth:
+                node.bucket[key] = global_locations
+            else:
+                node.children.setdefault(key[depth], _TrieNode()).bucket[key] = global_locations
+        for child in node.children.values():
+            if len(child.bucket) > _BURST_LIMIT:
+                self._burst(child, depth + 1)
+
+    def search_prefix(self, prefix: str, k: int = 10) -> list[str]:
+        """
+        :param prefix: Start of a display name, or of any word in it
+        :param k: Maximum number of results
+        :return: Global locations of matching display names, shortest completion first
+        """
+        prefix = _normalize(prefix)
+        if not prefix or k <= 0:
+            return []
+        node = self._find_node(prefix)
+        if node is None:
+            return []
+        results: dict[str, None] = {}
+        # best-first walk ordered by key length then key, with nodes ordered before the keys they hold; a node at
+        # depth d only holds keys at least d characters long, so popping in order never skips a shorter key
+        heap: list[tuple[int, str, int, Union[_TrieNode, dict[str, None]]]] = [(len(prefix), prefix, 0, node)]
+        while heap and len(results) < k:
+            path_length, path, is_key, item = heapq.heappop(heap)
+            if is_key:
+                for global_location in item:
+                    results[global_location] = None
+                    if len(results) == k:
+                        break
+                continue
+            for key, global_locations in item.bucket.items():
+                if key.startswith(prefix):
+                    heapq.heappush(heap, (len(key), key, 1, global_locations))
+            if item.children is not None:
+                for char, child in item.children.items():
+                    heapq.heappush(heap, (path_length + 1, path + char, 0, child))
+        return list(results)
+
+    def search_fuzzy(self, query: str, k: int = 10, min_similarity: float = 0.3) -> list[str]:
+        """
+        :param query: Display name, possibly misspelt
+        :param k: Maximum number of results
+        :param min_similarity: Lowest Jaccard similarity between trigram sets that still counts as a match
+        :return: Global locations of the most similar display names, most similar first
+        """
+        query = _normalize(query)
+        if not query or k <= 0:
+            return []
+        query_trigrams = _trigrams(query)
+        postings = sorted((self._trigram_postings[trigram] for trigram in query_trigrams
+                           if trigram in self._trigram_postings), key=len)
+        overlaps: dict[str, int] = {}
+        counted = 0
+        for i, global_locations in enumerate(postings):
+            if overlaps and counted + len(global_locations) > _CANDIDATE_BUDGET:
+                # the remaining trigrams are too common to draw candidates from, but still count towards the
+                # overlap of the candidates already found
+                for candidate in overlaps:
+                    overlaps[candidate] += sum(candidate in rest for rest in postings[i:])
+                break
+            counted += len(global_locations)
+            for global_location in islice(global_locations, _CANDIDATE_BUDGET):
+                overlaps[global_location] = overlaps.get(global_location, 0) + 1
+        scored = []
+        for global_location, overlap in overlaps.items():
+            similarity = overlap / (len(query_trigrams) + self._trigram_counts[global_location] - overlap)
+            if similarity >= min_similarity:
+                scored.append((similarity, global_location))
+        return [global_location for _, global_location in heapq.nlargest(k, scored, key=lambda item: item[0])]
+
+    def search(self, query: str, k: int = 10) -> list[str]:
+        """
+        :param query: What the player typed
+        :param k: Maximum number of results
+        :return: Global locations of up to k matching regions, localities and lowest-level locations, prefix
+        matches first, then similar names
+        """
+        results = dict.fromkeys(self.search_prefix(query, k))
+        if len(results) < k:
+            for global_location in self.search_fuzzy(query, k):
+                results[global_location] = None
+                if len(results) == k:
+                    break
+        return list(results)
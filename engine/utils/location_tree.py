@@ -1,4 +1,16 @@
-from typing import Union
+from typing import Callable, Union
+from engine.utils.location_ids import LocationIdRegistry
+
+
+class MapValidationError(ValueError):
+    """
+    Raised by map_from_json with every problem found in the map data, instead of only the first one.
+    :param errors (list[str]): One message per problem, prefixed with the path of the offending entry
+    """
+
+    def __init__(self, errors: list[str]):
+        super().__init__(f'{len(errors)} error(s) in map data:\n' + '\n'.join(errors))
+        self.errors: list[str] = errors
 
 
 class LocationTree:
@@ -32,40 +44,205 @@ class LocationTree:
             raise ValueError('Arguments cannot be empty string/whitespace-only.')
         if first_region_name.strip() == 'world':
             raise ValueError('Region cannot be named "world".')
-        self.world_display_name = world_display_name.strip()
-        self.regions: list[list[str]] = [[first_region_name.strip(), first_region_display_name.strip()]]
-        self.localities: dict[str, dict[str, str]] = {
-            '_'.join([first_region_name.strip(), first_locality_name.strip()]):
-                {
-                    'display_name': first_locality_display_name.strip(),
-                    'entrypoint_global_location': '_'.join([first_region_name.strip(), first_locality_name.strip(),
-                                                            first_locality_entrypoint_name.strip()]),
-                    'entrypoint_display_name': first_locality_entrypoint_display_name.strip()
-                }
+        self._init_indexes(world_display_name.strip())
+        region_name = first_region_name.strip()
+        locality_global_location = f'{region_name}_{first_locality_name.strip()}'
+        self._insert_region(region_name, first_region_display_name.strip())
+        self._insert_locality(region_name, locality_global_location, first_locality_display_name.strip(),
+                              f'{locality_global_location}_{first_locality_entrypoint_name.strip()}',
+                              first_locality_entrypoint_display_name.strip())
+
+    def _init_indexes(self, world_display_name: str) -> None:
+        self.world_display_name = world_display_name
+        # region name -> region display name, in insertion order
+        self._regions: dict[str, str] = {}
+        self._region_display_names: set[str] = set()
+        # region name -> locality global locations in that region (dict used as an ordered set)
+        self._region_localities: dict[str, dict[str, None]] = {}
+        # region name -> display names of the localities in that region
+        self._locality_display_names: dict[str, set[str]] = {}
+        self.localities: dict[str, dict[str, str]] = {}
+        # lowest-level global location -> display name, in insertion order
+        self._locations: dict[str, str] = {}
+        # locality global location -> lowest-level global locations in that locality (dict used as an ordered set)
+        self._locality_locations: dict[str, dict[str, None]] = {}
+        # locality global location -> display names of the locations in that locality
+        self._location_display_names: dict[str, set[str]] = {}
+        self.location_ids: LocationIdRegistry = LocationIdRegistry()
+        # region name -> exported region data, rebuilt by export_world_map only for regions in _stale_regions
+        self._export_cache: dict[str, dict] = {}
+        self._stale_regions: set[str] = set()
+        # regions changed since the last export_changed_regions call
+        self._changed_regions: set[str] = set()
+        self._world_name_changed: bool = True
+        # incremented by every mutation, so that caches built on top of the tree can tell when they are stale
+        self._version: int = 0
+        # callables told about every added, removed or renamed region, locality and lowest-level location
+        self._listeners: list[Callable[[str, str, Union[str, None]], None]] = []
+
+    @classmethod
+    def _empty(cls, world_display_name: str):
+        """
+        Creates a tree with no regions, for loaders that fill in the indexes themselves after validating their input.
+        """
+        location_tree = cls.__new__(cls)
+        location_tree._init_indexes(world_display_name)
+        return location_tree
+
+    @property
+    def regions(self) -> list[list[str]]:
+        return [[region, display_name] for region, display_name in self._regions.items()]
+
+    @property
+    def lowest_level_locations(self) -> list[list[str]]:
+        return [[location, display_name] for location, display_name in self._locations.items()]
+
+    def _mark_region_changed(self, region: str) -> None:
+        self._version += 1
+        self._stale_regions.add(region)
+        self._changed_regions.add(region)
+
+    def add_change_listener(self, listener: Callable[[str, str, Union[str, None]], None]) -> None:
+        """
+        :param listener: Called as listener(event, global_location, display_name) after every region, locality or
+        lowest-level location is added, removed or renamed. event is 'added', 'removed' or 'renamed', and
+        display_name is None for 'removed'.
+        """
+        self._listeners.append(listener)
+
+    def remove_change_listener(self, listener: Callable[[str, str, Union[str, None]], None]) -> None:
+        self._listeners.remove(listener)
+
+    def _notify_listeners(self, event: str, global_location: str, display_name: Union[str, None] = None) -> None:
+        for listener in self._listeners:
+            listener(event, global_location, display_name)
+
+    def _insert_region(self, region: str, display_name: str) -> None:
+        self._mark_region_changed(region)
+        self._regions[region] = display_name
+        self.location_ids.register(region)
+        self._region_display_names.add(display_name)
+        self._region_localities[region] = {}
+        self._locality_display_names[region] = set()
+        self._notify_listeners('added', region, display_name)
+
+    def _insert_locality(self, region: str, locality_global_location: str, display_name: str,
+                         entrypoint_global_location: str, entrypoint_display_name: str) -> None:
+        self.localities[locality_global_location] = {
+            'display_name': display_name,
+            'entrypoint_global_location': entrypoint_global_location,
+            'entrypoint_display_name': entrypoint_display_name
         }
+        self._region_localities[region][locality_global_location] = None
+        self._mark_region_changed(region)
+        self.location_ids.register(locality_global_location, self.location_ids.get_id(region))
+        self._locality_display_names[region].add(display_name)
+        self._locality_locations[locality_global_location] = {}
+        self._location_display_names[locality_global_location] = set()
+        self._notify_listeners('added', locality_global_location, display_name)
+        self._insert_location(locality_global_location, entrypoint_global_location, entrypoint_display_name)
+
+    def _insert_location(self, locality_global_location: str, global_location: str, display_name: str) -> None:
+        self._locations[global_location] = display_name
+        self._locality_locations[locality_global_location][global_location] = None
+        self._mark_region_changed(locality_global_location.split('_', maxsplit=1)[0])
+        self.location_ids.register(global_location, self.location_ids.get_id(locality_global_location))
+        self._location_display_names[locality_global_location].add(display_name)
+        self._notify_listeners('added', global_location, display_name)
+
+    def _delete_locality(self, region: str, locality_global_location: str) -> None:
+        for location in self._locality_locations.pop(locality_global_location):
+            self._locations.pop(location)
+            self._notify_listeners('removed', location)
+        self._location_display_names.pop(locality_global_location)
+        self._locality_display_names[region].discard(self.localities.pop(locality_global_location)['display_name'])
+        self._region_localities[region].pop(locality_global_location)
+        self._mark_region_changed(region)
+        self.location_ids.unregister(self.location_ids.get_id(locality_global_location))
+        self._notify_listeners('removed', locality_global_location)
 
-        self.lowest_level_locations: list[list[str]] = [['_'.join(
-            [first_region_name.strip(), first_locality_name.strip(), first_locality_entrypoint_name.strip()]),
-            first_locality_entrypoint_display_name.strip()]]
+    def get_version(self) -> int:
+        return self._version
 
     def get_world_display_name(self) -> str:
         return self.world_display_name
 
     def get_region_names(self) -> list[str]:
-        return [tup[0] for tup in self.regions]
+        return list(self._regions)
 
     def get_region_names_and_display_names(self) -> list[list[str]]:
         return self.regions
 
+    def get_region_display_name(self, region_name: str) -> str:
+        if region_name not in self._regions:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return self._regions[region_name]
+
     def get_localities(self) -> dict[str, dict[str, str]]:
         return self.localities
 
     def get_locality_global_locations(self) -> list[str]:
         return list(self.get_localities().keys())
 
+    def get_localities_in_region(self, region_name: str) -> list[str]:
+        if region_name not in self._region_localities:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return list(self._region_localities[region_name])
+
     def get_lowest_level_locations(self) -> list[list[str]]:
         return self.lowest_level_locations
 
+    def get_locations_in_locality(self, locality_global_location: str) -> list[list[str]]:
+        if locality_global_location not in self._locality_locations:
+            raise ValueError(f'Locality {locality_global_location} does not exist.')
+        return [[location, self._locations[location]] for location in
+                self._locality_locations[locality_global_location]]
+
+    def get_location_display_name(self, global_location: str) -> str:
+        if global_location not in self._locations:
+            raise ValueError(f'Location {global_location} does not exist.')
+        return self._locations[global_location]
+
+    def get_location_id(self, global_location: str) -> int:
+        """
+        :param global_location: A region name, locality global location or lowest-level global location
+        :return: The integer id of that location, stable until the location is removed
+        """
+        return self.location_ids.get_id(global_location)
+
+    def get_global_location(self, location_id: int) -> str:
+        return self.location_ids.get_global_location(location_id)
+
+    def get_parent_id(self, location_id: int) -> int:
+        return self.location_ids.get_parent_id(location_id)
+
+    def get_child_ids(self, location_id: int) -> list[int]:
+        return self.location_ids.get_child_ids(location_id)
+
+    def get_display_name_by_id(self, location_id: int) -> str:
+        global_location = self.location_ids.get_global_location(location_id)
+        level = self.location_ids.get_level(location_id)
+        if level == 1:
+            return self._regions[global_location]
+        if level == 2:
+            return self.localities[global_location]['display_name']
+        return self._locations[global_location]
+
+    def get_entrypoint_id(self, locality_id: int) -> int:
+        if self.location_ids.get_level(locality_id) != 2:
+            raise ValueError(f'Location id {locality_id} is not a locality.')
+        locality_global_location = self.location_ids.get_global_location(locality_id)
+        return self.location_ids.get_id(self.localities[locality_global_location]['entrypoint_global_location'])
+
+    def has_region(self, region_name: str) -> bool:
+        return region_name in self._regions
+
+    def has_locality(self, locality_global_location: str) -> bool:
+        return locality_global_location in self.localities
+
+    def has_lowest_level_location(self, global_location: str) -> bool:
+        return global_location in self._locations
+
     def add_region(self, region_name: str,
                    region_display_name: str,
                    first_locality_name: str,
@@ -84,20 +261,15 @@ class LocationTree:
             raise ValueError('Name or display name cannot be empty/whitespace-only.')
         if region_name.strip() == 'world':
             raise ValueError('Region cannot be named "world".')
-        region_names_and_display_names = self.get_region_names_and_display_names()
-        if any([ls[0] == region_name.strip() for ls in region_names_and_display_names]):
+        if region_name.strip() in self._regions:
             raise ValueError(f'{region_name.strip()} already exists.')
-        if any([ls[1] == region_display_name.strip() for ls in region_names_and_display_names]):
+        if region_display_name.strip() in self._region_display_names:
             raise ValueError(f'{region_display_name.strip()} already taken as a display name.')
-        self.regions.append([region_name.strip(), region_display_name.strip()])
         new_locality_global_location = '_'.join([region_name.strip(), first_locality_name.strip()])
         entrypoint_global_location = '_'.join([new_locality_global_location, first_locality_entrypoint_name.strip()])
-        self.localities[new_locality_global_location] = {
-            'display_name': first_locality_display_name.strip(),
-            'entrypoint_global_location': entrypoint_global_location,
-            'entrypoint_display_name': first_locality_entrypoint_display_name.strip()
-        }
-        self.lowest_level_locations.append([entrypoint_global_location, first_locality_entrypoint_display_name.strip()])
+        self._insert_region(region_name.strip(), region_display_name.strip())
+        self._insert_locality(region_name.strip(), new_locality_global_location, first_locality_display_name.strip(),
+                              entrypoint_global_location, first_locality_entrypoint_display_name.strip())
 
     def add_locality(self, locality_global_location: str,
                      locality_display_name: str,
@@ -112,77 +284,68 @@ class LocationTree:
             raise ValueError('Empty/whitespace-only string detected in arguments.')
         if '_' in entrypoint_name:
             raise ValueError('Entrypoint name cannot have underscores.')
-        if region not in self.get_region_names():
+        if region not in self._regions:
             raise ValueError(f'Region {region} does not currently exist.')
-        localities = self.get_localities()
-        if f'{region}_{locality}' in localities:
+        if f'{region}_{locality}' in self.localities:
             raise ValueError(f'Locality of name {locality} in region {region} already exists.')
-        locality_display_names_in_region: list[str] = [localities[loc]['display_name'] for loc in localities
-                                                       if loc.split('_')[0] == region]
-        if locality_display_name.strip() in locality_display_names_in_region:
+        if locality_display_name.strip() in self._locality_display_names[region]:
             raise ValueError(f'Display name {locality_display_name.strip()} in region {region} already taken.')
 
         entrypoint_global_location = '_'.join([region, locality, entrypoint_name.strip()])
-        self.localities[f'{region}_{locality}'] = {
-            'display_name': locality_display_name.strip(),
-            'entrypoint_global_location': entrypoint_global_location,
-            'entrypoint_display_name': entrypoint_display_name.strip()
-        }
-        self.lowest_level_locations.append([entrypoint_global_location, entrypoint_display_name.strip()])
+        self._insert_locality(region, f'{region}_{locality}', locality_display_name.strip(),
+                              entrypoint_global_location, entrypoint_display_name.strip())
 
     def add_lowest_level_location(self, global_location: str, display_name: str) -> None:
         if len(global_location.split('_')) != 3:
             raise ValueError('global_location must conform to region_locality_lowest-level-location form.')
         region, locality, location_name = [s.strip() for s in global_location.split('_')]
-        if '_'.join([region, locality, location_name]) in [ls[0] for ls in self.get_lowest_level_locations()]:
+        if '_'.join([region, locality, location_name]) in self._locations:
             raise ValueError('Location already exists.')
-        if region not in self.get_region_names():
+        if region not in self._regions:
             raise ValueError(f'Region {region} does not exist.')
-        if f'{region}_{locality}' not in self.get_locality_global_locations():
+        if f'{region}_{locality}' not in self.localities:
             raise ValueError(f'Locality {locality} does not exist in region {region}.')
         if location_name.strip() == '' or display_name.strip() == '':
             raise ValueError('Location name or display name cannot be empty.')
-        display_names_in_locality = [ls[1] for ls in self.get_lowest_level_locations() if
-                                     ls[0].startswith(f'{region}_{locality}_')]
-        if display_name.strip() in display_names_in_locality:
+        if display_name.strip() in self._location_display_names[f'{region}_{locality}']:
             raise ValueError(f'Display name {display_name.strip()} in {region}_{locality} already taken.')
-        self.lowest_level_locations.append(['_'.join([region, locality, location_name]), display_name.strip()])
+        self._insert_location(f'{region}_{locality}', '_'.join([region, locality, location_name]),
+                              display_name.strip())
 
     def remove_region(self, region_name: str) -> None:
-        if region_name.strip() not in self.get_region_names():
+        if region_name.strip() not in self._regions:
             raise ValueError(f'Region {region_name.strip()} does not exist.')
-        if len(self.get_region_names()) == 1:
+        if len(self._regions) == 1:
             raise ValueError('Cannot remove the only region in the world.')
-        self.regions: list[list[str]] = list(filter(lambda x: x[0] != region_name.strip(), self.regions))
-        localities: list[str] = self.get_locality_global_locations()
-        for locality in localities:
-            if locality.startswith(f'{region_name.strip()}_'):
-                self.localities.pop(locality)
-        self.lowest_level_locations: list[list[str]] = list(
-            filter(lambda x: not x[0].startswith(f'{region_name.strip()}_'),
-                   self.lowest_level_locations))
+        region = region_name.strip()
+        for locality in list(self._region_localities[region]):
+            self._delete_locality(region, locality)
+        self._region_display_names.discard(self._regions.pop(region))
+        self._region_localities.pop(region)
+        self._locality_display_names.pop(region)
+        self._mark_region_changed(region)
+        self.location_ids.unregister(self.location_ids.get_id(region))
+        self._notify_listeners('removed', region)
 
     def remove_locality(self, locality_global_location: str) -> None:
-        localities: list[str] = self.get_locality_global_locations()
-        if locality_global_location.strip() not in localities:
+        if locality_global_location.strip() not in self.localities:
             raise ValueError(f'No such locality exists')
         region = locality_global_location.split('_')[0]
-        localities_in_region: list[str] = list(filter(lambda x: x.startswith(f'{region}_'), localities))
-        if len(localities_in_region) == 1:
+        if len(self._region_localities[region]) == 1:
             raise ValueError('Cannot remove only locality in region.')
-        self.localities.pop(locality_global_location.strip())
-        self.lowest_level_locations = list(filter(lambda x: not x[0].startswith(f'{locality_global_location.strip()}_'),
-                                                  self.lowest_level_locations))
+        self._delete_locality(region, locality_global_location.strip())
 
     def remove_lowest_level_location(self, global_location: str) -> None:
-        lowest_level_locations = [ls[0] for ls in self.lowest_level_locations]
-        if global_location.strip() not in lowest_level_locations:
+        if global_location.strip() not in self._locations:
             raise ValueError(f'Location {global_location.strip()} does not exist.')
         locality_global_location = global_location.strip().rsplit('_', maxsplit=1)[0]
         if global_location.strip() == self.localities[locality_global_location]['entrypoint_global_location']:
             raise ValueError('Cannot remove the locality entrypoint.')
-        self.lowest_level_locations = list(filter(lambda x: x[0] != global_location.strip(),
-                                                  self.lowest_level_locations))
+        self._location_display_names[locality_global_location].discard(self._locations.pop(global_location.strip()))
+        self._locality_locations[locality_global_location].pop(global_location.strip())
+        self._mark_region_changed(locality_global_location.split('_', maxsplit=1)[0])
+        self.location_ids.unregister(self.location_ids.get_id(global_location.strip()))
+        self._notify_listeners('removed', global_location.strip())
 
     def change_display_name(self, global_location: str, new_display_name: str) -> None:
         if new_display_name.strip() == '':
@@ -192,169 +355,261 @@ class LocationTree:
         elif location_level == 1:
             if global_location.strip() == 'world':
                 self.world_display_name = new_display_name.strip()
+                self._world_name_changed = True
+                self._version += 1
                 return
             region = global_location.strip()
-            if region not in self.get_region_names():
+            if region not in self._regions:
                 raise ValueError(f'Region {region} does not exist.')
-            existing_display_names = [ls[1] for ls in self.get_region_names_and_display_names() if ls[0] != region]
-            if new_display_name.strip() in existing_display_names:
+            old_display_name = self._regions[region]
+            if new_display_name.strip() != old_display_name and new_display_name.strip() in self._region_display_names:
                 raise ValueError(f'Display name {new_display_name.strip()} already taken.')
-            for i in range(len(self.get_region_names_and_display_names())):
-                if self.regions[i][0] == region:
-                    self.regions[i][1] = new_display_name.strip()
-                    break
+            self._region_display_names.discard(old_display_name)
+            self._region_display_names.add(new_display_name.strip())
+            self._regions[region] = new_display_name.strip()
+            self._mark_region_changed(region)
+            self._notify_listeners('renamed', region, new_display_name.strip())
         elif location_level == 2:
             locality_global_location = global_location.strip()
-            localities = self.get_locality_global_locations()
-            if locality_global_location not in localities:
+            if locality_global_location not in self.localities:
                 raise ValueError(f'Locality {locality_global_location} does not exist.')
             region = locality_global_location.split('_')[0]
-            display_names_in_region = [self.get_localities()[loc]['display_name'] for loc in localities
-                                       if loc.startswith(f'{region}_') and loc != locality_global_location]
-            if new_display_name.strip() in display_names_in_region:
+            old_display_name = self.localities[locality_global_location]['display_name']
+            display_names_in_region = self._locality_display_names[region]
+            if new_display_name.strip() != old_display_name and new_display_name.strip() in display_names_in_region:
                 raise ValueError(f'Display name {new_display_name.strip()} in region {region} already taken.')
+            display_names_in_region.discard(old_display_name)
+            display_names_in_region.add(new_display_name.strip())
             self.localities[locality_global_location]['display_name'] = new_display_name.strip()
+            self._mark_region_changed(region)
+            self._notify_listeners('renamed', locality_global_location, new_display_name.strip())
         else:
             global_location_to_rename = global_location.strip()
-            lowest_level_locations = self.get_lowest_level_locations()
-            if global_location_to_rename not in [ls[0] for ls in lowest_level_locations]:
+            if global_location_to_rename not in self._locations:
                 raise ValueError(f'Location {global_location_to_rename} does not exist.')
             locality_global_location = global_location_to_rename.rsplit('_', maxsplit=1)[0]
-            locations_in_locality: list[list[str]] = [ls for ls in lowest_level_locations
-                                                      if ls[0].startswith(f'{locality_global_location}_')]
-            display_names_in_locality: list[str] = [ls[1] for ls in locations_in_locality
-                                                    if ls[0] != global_location_to_rename]
-            if new_display_name.strip() in display_names_in_locality:
+            old_display_name = self._locations[global_location_to_rename]
+            display_names_in_locality = self._location_display_names[locality_global_location]
+            if new_display_name.strip() != old_display_name and new_display_name.strip() in display_names_in_locality:
                 raise ValueError(f'Display name {new_display_name.strip()} in locality\
 {locality_global_location} already taken.')
-            for i in range(len(self.lowest_level_locations)):
-                if self.lowest_level_locations[i][0] == global_location_to_rename:
-                    self.lowest_level_locations[i][1] = new_display_name.strip()
-                    break
+            display_names_in_locality.discard(old_display_name)
+            display_names_in_locality.add(new_display_name.strip())
+            self._locations[global_location_to_rename] = new_display_name.strip()
             if self.localities[locality_global_location]['entrypoint_global_location'] == global_location_to_rename:
                 self.localities[locality_global_location]['entrypoint_display_name'] = new_display_name.strip()
+            self._mark_region_changed(locality_global_location.split('_', maxsplit=1)[0])
+            self._notify_listeners('renamed', global_location_to_rename, new_display_name.strip())
 
     def change_locality_entrypoint(self, locality_global_location: str, new_entrypoint_global_location: str) -> None:
-        localities = self.get_localities()
-        if locality_global_location.strip() not in localities:
+        if locality_global_location.strip() not in self.localities:
             raise ValueError(f'Locality {locality_global_location.strip()} does not exist.')
-        locations_in_locality: list[list[str]] = list(filter(lambda x: x[0].startswith(f'{locality_global_location}_'),
-                                                             self.get_lowest_level_locations()))
-        if new_entrypoint_global_location.strip() not in [ls[0] for ls in locations_in_locality]:
+        if new_entrypoint_global_location.strip() not in self._locality_locations[locality_global_location.strip()]:
             raise ValueError(f'Location {new_entrypoint_global_location.strip()} does not exist.')
-        new_entrypoint_display_name = locations_in_locality[0][1]
-        for ls in locations_in_locality:
-            if ls[0] == new_entrypoint_global_location.strip():
-                new_entrypoint_display_name = ls[1]
-                break
         self.localities[locality_global_location.strip()][
             'entrypoint_global_location'] = new_entrypoint_global_location.strip()
-        self.localities[locality_global_location.strip()]['entrypoint_display_name'] = new_entrypoint_display_name
+        self.localities[locality_global_location.strip()]['entrypoint_display_name'] = self._locations[
+            new_entrypoint_global_location.strip()]
+        self._mark_region_changed(locality_global_location.strip().split('_', maxsplit=1)[0])
+
+    def _export_region(self, region: str) -> dict:
+        region_data = {'display_name': self._regions[region], 'localities': {}}
+        for locality in self._region_localities[region]:
+            locality_short_name = locality.split('_', maxsplit=1)[1]
+            locality_display_name = self.localities[locality]['display_name']
+            locality_entrypoint = self.localities[locality]['entrypoint_global_location'].split('_')[-1]
+            entrypoint_display_name = self.localities[locality]['entrypoint_display_name']
+            locality_data = {'display_name': locality_display_name,
+                             'locations': {'entrypoint': locality_entrypoint,
+                                           'entrypoint_display_name': entrypoint_display_name,
+                                           'other_locations': {}}}
+            for location in self._locality_locations[locality]:
+                location_short_name = location.split('_')[-1]
+                if location_short_name == locality_entrypoint:
+                    continue
+                locality_data['locations']['other_locations'][location_short_name] = {
+                    'display_name': self._locations[location]}
+            region_data['localities'][locality_short_name] = locality_data
+        return region_data
+
+    def _refresh_export_cache(self) -> None:
+        for region in self._stale_regions:
+            if region in self._regions:
+                self._export_cache[region] = self._export_region(region)
+            else:
+                self._export_cache.pop(region, None)
+        self._stale_regions.clear()
 
     def export_world_map(self) -> dict[str, Union[str, dict]]:
-        map_data = {'world_name': self.world_display_name, 'regions': {}}
-        all_localities = self.get_localities()
-        all_lowest_level_locations = self.get_lowest_level_locations()
-        for region, display_name in self.get_region_names_and_display_names():
-            map_data['regions'][region] = {'display_name': display_name, 'localities': {}}
-            localities_in_region: list[str] = list(
-                filter(lambda x: x.startswith(f'{region}_'), list(all_localities.keys())))
-            for locality in localities_in_region:
-                locality_short_name = locality.split('_', maxsplit=1)[1]
-                locality_display_name = all_localities[locality]['display_name']
-                locality_entrypoint = all_localities[locality]['entrypoint_global_location'].split('_')[-1]
-                entrypoint_display_name = all_localities[locality]['entrypoint_display_name']
-                locality_data = {'display_name': locality_display_name,
-                                 'locations': {'entrypoint': locality_entrypoint,
-                                               'entrypoint_display_name': entrypoint_display_name,
-                                               'other_locations': {}}}
-                locations_in_locality: list[list[str]] = list(filter(lambda x: x[0].startswith(f'{locality}_'),
-                                                                     all_lowest_level_locations))
-                for location, location_display_name in locations_in_locality:
-                    location_short_name = location.split('_')[-1]
-                    if location_short_name == locality_entrypoint:
-                        continue
-                    locality_data['locations']['other_locations'][location_short_name] = {'display_name': location_display_name}
-                map_data['regions'][region]['localities'][locality_short_name] = locality_data
-        return map_data
+        """
+        Exports the tree in the format read by map_from_json. Only regions changed since the previous export are
+        re-serialized; the data of unchanged regions is shared between exports, so treat the result as read-only.
+        :return: dict
+        """
+        self._refresh_export_cache()
+        return {'world_name': self.world_display_name,
+                'regions': {region: self._export_cache[region] for region in self._regions}}
 
+    def export_changed_regions(self) -> dict[str, Union[str, dict, None]]:
+        """
+        Exports only what changed since the last call (or since the tree was loaded), for delta saves. Changed regions
+        map to their full export data, removed regions map to None. world_name is only present if it changed.
+        Treat the result as read-only.
+        :return: dict
+        """
+        self._refresh_export_cache()
+        changes = {'regions': {region: self._export_cache.get(region) for region in self._changed_regions}}
+        if self._world_name_changed:
+            changes['world_name'] = self.world_display_name
+        self.mark_changes_saved()
+        return changes
 
-def map_from_json(map_json: dict[str, Union[str, dict]]) -> LocationTree:
-    world_name = map_json['world_name']
-    regions = list(map_json['regions'].keys())
-    first_region = regions[0]
-    all_locality_global_locations: list[str] = []
-    for region in regions:
-        region_data: dict[str, Union[str, dict]] = map_json['regions'][region]
-        for locality in region_data['localities'].keys():
-            all_locality_global_locations.append(f'{region}_{locality}')
-    first_locality: str = list(filter(lambda x: x.startswith(f'{first_region}_'), all_locality_global_locations))[0]
-    first_region_data: dict[str, Union[str, dict]] = map_json['regions'][first_region]
-    first_locality_data: dict[str, Union[str, dict]] = first_region_data['localities'][first_locality.split('_')[1]]
-    entrypoint_short_name: str = first_locality_data['locations']['entrypoint']
-    entrypoint_display_name: str = first_locality_data['locations']['entrypoint_display_name']
-    location_tree = LocationTree(world_display_name=world_name,
-                                 first_region_display_name=first_region_data['display_name'],
-                                 first_region_name=first_region,
-                                 first_locality_display_name=first_locality_data['display_name'],
-                                 first_locality_name=first_locality.split('_')[1],
-                                 first_locality_entrypoint_name=entrypoint_short_name,
-                                 first_locality_entrypoint_display_name=entrypoint_display_name)
-    other_locations_in_first_locality: dict[str, dict[str, str]] = first_locality_data['locations']['other_locations']
-    for location in other_locations_in_first_locality:
-        location_tree.add_lowest_level_location(global_location=f'{first_locality}_{location}',
-                                                display_name=other_locations_in_first_locality[location][
-                                                    'display_name'])
-
-    def add_locality_to_tree(loc_tree: LocationTree, locality_global_location: str,
-                             locality_data: dict[str, Union[str, dict]]) -> None:
-        display_name: str = locality_data['display_name']
-        entrypoint_name: str = locality_data['locations']['entrypoint']
-        entrypoint_display: str = locality_data['locations']['entrypoint_display_name']
-        loc_tree.add_locality(locality_global_location=locality_global_location,
-                              locality_display_name=display_name,
-                              entrypoint_name=entrypoint_name,
-                              entrypoint_display_name=entrypoint_display)
-        other_locations: dict[str, dict[str, str]] = locality_data['locations']['other_locations']
-        for loc in other_locations:
-            loc_tree.add_lowest_level_location(global_location=f'{locality_global_location}_{loc}',
-                                               display_name=other_locations[loc]['display_name'])
-
-    def add_region_to_tree(loc_tree: LocationTree, region_name: str, rgn_data: dict[str, Union[str, dict]]) -> None:
-        region_display_name: str = rgn_data['display_name']
-        localities_in_region: list[str] = list(rgn_data['localities'].keys())
-        first_locality_short_name = localities_in_region[0]
-        first_locality_info: dict[str, Union[str, dict]] = rgn_data['localities'][first_locality_short_name]
-        first_locality_display_name: str = first_locality_info['display_name']
-        entrypoint: str = first_locality_info['locations']['entrypoint']
-        entrypoint_display: str = first_locality_info['locations']['entrypoint_display_name']
-        other_locations: dict[str, dict[str, str]] = first_locality_info['locations']['other_locations']
-        loc_tree.add_region(region_name=region_name,
-                            region_display_name=region_display_name,
-                            first_locality_name=first_locality_short_name,
-                            first_locality_display_name=first_locality_display_name,
-                            first_locality_entrypoint_name=entrypoint,
-                            first_locality_entrypoint_display_name=entrypoint_display)
-        for locn in other_locations:
-            loc_tree.add_lowest_level_location(global_location=f'{region_name}_{first_locality_short_name}_{locn}',
-                                               display_name=other_locations[locn]['display_name'])
-        for locality_name in localities_in_region:
-            if locality_name == first_locality_short_name:
-                continue
-            locality_data: dict[str, Union[str, dict]] = rgn_data['localities'][locality_name]
-            add_locality_to_tree(loc_tree=loc_tree, locality_global_location=f'{region_name}_{locality_name}',
-                                 locality_data=locality_data)
-
-    for rgn in regions:
-        if rgn == first_region:
-            first_region_locality_short_names: list[str] = list(first_region_data['localities'].keys())
-            for loc in first_region_locality_short_names:
-                if loc != first_locality.split('_')[1]:
-                    add_locality_to_tree(loc_tree=location_tree,
-                                         locality_global_location=f'{rgn}_{loc}',
-                                         locality_data=first_region_data['localities'][loc])
+    def mark_changes_saved(self) -> None:
+        """
+        Resets the tracking used by export_changed_regions, e.g. after a full save.
+        """
+        self._changed_regions.clear()
+        self._world_name_changed = False
+
+
+def _get_field(data: dict, key: str, expected_type: type, path: str, errors: list[str]):
+    if not isinstance(data, dict):
+        errors.append(f'{path}: expected an object.')
+        return None
+    if key not in data:
+        errors.append(f'{path}: missing "{key}".')
+        return None
+    value = data[key]
+    if not isinstance(value, expected_type):
+        errors.append(f'{path}.{key}: expected {expected_type.__name__}.')
+        return None
+    return value
+
+
+def _check_name(name: str, kind: str, path: str, errors: list[str]) -> bool:
+    if name.strip() == '':
+        errors.append(f'{path}: {kind} name cannot be empty/whitespace-only.')
+        return False
+    if '_' in name:
+        errors.append(f'{path}: {kind} names cannot have underscores.')
+        return False
+    return True
+
+
+def _check_display_name(display_name, taken: set[str], path: str, scope: str, errors: list[str]) -> bool:
+    if display_name is None:
+        return False
+    if display_name.strip() == '':
+        errors.append(f'{path}: display name cannot be empty/whitespace-only.')
+        return False
+    if display_name.strip() in taken:
+        errors.append(f'{path}: display name {display_name.strip()} in {scope} already taken.')
+        return False
+    taken.add(display_name.strip())
+    return True
+
+
+def _load_region(location_tree: LocationTree, region_key: str, region_data: dict, region_display_names: set[str],
+                 errors: list[str]) -> None:
+    """
+    Validates one region's map data and inserts whatever is valid into location_tree. Problems are appended to errors.
+    """
+    region_path = f'regions.{region_key}'
+    if not isinstance(region_data, dict):
+        errors.append(f'{region_path}: expected an object.')
+        return
+    region = region_key.strip()
+    region_ok = _check_name(region_key, 'Region', region_path, errors)
+    if region_ok and region == 'world':
+        errors.append(f'{region_path}: Region cannot be named "world".')
+        region_ok = False
+    if region_ok and location_tree.has_region(region):
+        errors.append(f'{region_path}: {region} already exists.')
+        region_ok = False
+    region_display_name = _get_field(region_data, 'display_name', str, region_path, errors)
+    region_ok = _check_display_name(region_display_name, region_display_names, region_path, 'the world',
+                                    errors) and region_ok
+    localities = _get_field(region_data, 'localities', dict, region_path, errors)
+    if localities is not None and len(localities) == 0:
+        errors.append(f'{region_path}.localities: a region needs at least one locality.')
+    if region_ok:
+        location_tree._insert_region(region, region_display_name.strip())
+    locality_display_names: set[str] = set()
+    for locality_key, locality_data in (localities or {}).items():
+        locality_path = f'{region_path}.localities.{locality_key}'
+        if not isinstance(locality_data, dict):
+            errors.append(f'{locality_path}: expected an object.')
+            continue
+        locality_global_location = f'{region}_{locality_key.strip()}'
+        locality_ok = _check_name(locality_key, 'Locality', locality_path, errors)
+        if locality_ok and location_tree.has_locality(locality_global_location):
+            errors.append(f'{locality_path}: Locality of name {locality_key.strip()} in region {region} '
+                          f'already exists.')
+            locality_ok = False
+        locality_display_name = _get_field(locality_data, 'display_name', str, locality_path, errors)
+        locality_ok = _check_display_name(locality_display_name, locality_display_names, locality_path,
+                                          f'region {region}', errors) and locality_ok
+        locations = _get_field(locality_data, 'locations', dict, locality_path, errors)
+        if locations is None:
+            continue
+        locations_path = f'{locality_path}.locations'
+        entrypoint = _get_field(locations, 'entrypoint', str, locations_path, errors)
+        entrypoint_display_name = _get_field(locations, 'entrypoint_display_name', str, locations_path, errors)
+        other_locations = _get_field(locations, 'other_locations', dict, locations_path, errors)
+        location_display_names: set[str] = set()
+        location_names: set[str] = set()
+        if entrypoint is not None:
+            locality_ok = _check_name(entrypoint, 'Location', f'{locations_path}.entrypoint', errors) and locality_ok
+            location_names.add(entrypoint.strip())
         else:
-            region_info: dict[str, Union[str, dict]] = map_json['regions'][rgn]
-            add_region_to_tree(loc_tree=location_tree, region_name=rgn, rgn_data=region_info)
+            locality_ok = False
+        locality_ok = _check_display_name(entrypoint_display_name, location_display_names,
+                                          f'{locations_path}.entrypoint_display_name',
+                                          locality_global_location, errors) and locality_ok
+        locality_ok = locality_ok and region_ok
+        if locality_ok:
+            location_tree._insert_locality(region, locality_global_location, locality_display_name.strip(),
+                                           f'{locality_global_location}_{entrypoint.strip()}',
+                                           entrypoint_display_name.strip())
+        for location_key, location_data in (other_locations or {}).items():
+            location_path = f'{locations_path}.other_locations.{location_key}'
+            if not isinstance(location_data, dict):
+                errors.append(f'{location_path}: expected an object.')
+                continue
+            location_ok = _check_name(location_key, 'Location', location_path, errors)
+            if location_ok and location_key.strip() in location_names:
+                errors.append(f'{location_path}: Location already exists.')
+                location_ok = False
+            location_names.add(location_key.strip())
+            location_display_name = _get_field(location_data, 'display_name', str, location_path, errors)
+            location_ok = _check_display_name(location_display_name, location_display_names, location_path,
+                                              locality_global_location, errors) and location_ok
+            if location_ok and locality_ok:
+                location_tree._insert_location(locality_global_location,
+                                               f'{locality_global_location}_{location_key.strip()}',
+                                               location_display_name.strip())
+
 
+def map_from_json(map_json: dict[str, Union[str, dict]]) -> LocationTree:
+    """
+    Builds a LocationTree from map data (as produced by LocationTree.export_world_map) in a single pass, filling in
+    the tree's indexes directly. Every name, display name and shape problem is collected and reported together.
+    :param map_json: The map data
+    :return: LocationTree
+    :raises MapValidationError: if the map data has any problems
+    """
+    errors: list[str] = []
+    world_name = _get_field(map_json, 'world_name', str, 'map', errors)
+    regions = _get_field(map_json, 'regions', dict, 'map', errors)
+    if world_name is not None and world_name.strip() == '':
+        errors.append('map.world_name: cannot be empty/whitespace-only.')
+    if regions is not None and len(regions) == 0:
+        errors.append('map.regions: a world needs at least one region.')
+    location_tree = LocationTree._empty((world_name or '').strip())
+    region_display_names: set[str] = set()
+    for region_key, region_data in (regions or {}).items():
+        _load_region(location_tree, region_key, region_data, region_display_names, errors)
+    if errors:
+        raise MapValidationError(errors)
+    location_tree.mark_changes_saved()
     return location_tree
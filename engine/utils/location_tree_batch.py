@@ -0,0 +1,647 @@
+from typing import Callable, Union
+from engine.utils.location_tree import LocationTree
+
+_DELETED = object()
+
+
+class _OverlayDict:
+    """
+    Dict-like view of base that records writes instead of making them. Values read from base are copied with
+    copy_value first (when given), so in-place changes to nested containers stay in the overlay as well. apply
+    merges the recorded writes into base, leaving it in the order the same writes would have.
+    """
+
+    def __init__(self, base: dict, copy_value: Union[Callable, None] = None):
+        self._base = base
+        self._changes: dict = {}
+        # keys of base deleted and then set again, which move to the end of base
+        self._moved: set = set()
+        self._size: int = len(base)
+        self._copy_value = copy_value
+
+    def __contains__(self, key) -> bool:
+        if key in self._changes:
+            return self._changes[key] is not _DELETED
+        return key in self._base
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            value = self._changes[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        value = self._base[key]
+        if self._copy_value is not None:
+            value = self._copy_value(value)
+            self._changes[key] = value
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        changes = self._changes
+        if key in changes:
+            if changes[key] is _DELETED:
+                # deleted earlier in the batch: set it again at the end, as the real dict would
+                self._size += 1
+                del changes[key]
+                if key in self._base:
+                    self._moved.add(key)
+        elif key not in self._base:
+            self._size += 1
+        changes[key] = value
+
+    def __len__(self) -> int:
+        return self._size
+
+    def pop(self, key):
+        value = self[key]
+        self._changes.pop(key, None)
+        self._changes[key] = _DELETED
+        self._size -= 1
+        return value
+
+    def apply(self) -> None:
+        base = self._base
+        if not self._moved and _DELETED not in self._changes.values():
+            base.update(self._changes)
+            return
+        for key, value in self._changes.items():
+            if value is _DELETED:
+                base.pop(key, None)
+            else:
+                if key in self._moved:
+                    base.pop(key)
+                base[key] = value
+
+
+class _OverlaySet:
+
+    def __init__(self, base: set):
+        self._base = base
+        self._changes: dict = {}
+
+    def __contains__(self, item) -> bool:
+        return self._changes[item] if item in self._changes else item in self._base
+
+    def add(self, item) -> None:
+        self._changes[item] = True
+
+    def discard(self, item) -> None:
+        self._changes[item] = False
+
+    def apply(self) -> None:
+        for item, present in self._changes.items():
+            if present:
+                self._base.add(item)
+            else:
+                self._base.discard(item)
+
+
+class _Scope:
+    """
+    Staged copies of the indexes of a region or locality: its children, in order, and the display names taken
+    among them. A locality also keeps the display names of the locations added or renamed in the batch; the rest
+    are read from the tree.
+    """
+    __slots__ = ('children', 'display_names', 'new_display_names')
+
+    def __init__(self, children: dict[str, None], display_names: set[str]):
+        # dict used as an ordered set
+        self.children: dict[str, None] = children
+        self.display_names: set[str] = display_names
+        self.new_display_names: dict[str, str] = {}
+
+
+class _StagedTree:
+    """
+    The changes a batch makes, staged against a real tree's indexes without touching them. The child and
+    display-name indexes of a region or locality are copied into a _Scope the first time a mutation touches it, and
+    every later mutation in that scope is checked and staged against the copies with plain dict and set operations.
+    Writes to the tree-wide index of lowest-level locations are only logged, and replayed on it in order. Staging a
+    batch so costs O(touched scopes) on top of the mutations themselves, and apply_to_tree writes the result into
+    the tree in one pass.
+    """
+
+    def __init__(self, location_tree: LocationTree):
+        self.location_tree: LocationTree = location_tree
+        self.world_display_name: str = location_tree.world_display_name
+        self.world_renamed: bool = False
+        self.regions = _OverlayDict(location_tree._regions)
+        self.region_display_names = _OverlaySet(location_tree._region_display_names)
+        self.localities = _OverlayDict(location_tree.localities, dict)
+        # region name or locality global location -> its staged indexes, or _DELETED once removed
+        self.region_scopes: dict[str, Union[_Scope, object]] = {}
+        self.locality_scopes: dict[str, Union[_Scope, object]] = {}
+        # (lowest-level global location, display name or _DELETED), in order
+        self.location_writes: list[tuple[str, object]] = []
+        # (global location, parent global location or None) to register, or (global location, _DELETED) to unregister
+        self.registrations: list[tuple[str, object]] = []
+        # dict used as an ordered set
+        self.changed_regions: dict[str, None] = {}
+        # events are only kept if there is a listener to tell
+        self.events: Union[list[tuple[str, str, Union[str, None]]], None] = [] if location_tree._listeners else None
+
+    def _region_scope(self, region: str) -> Union[_Scope, None]:
+        """
+        :return: The staged indexes of region, or None if it does not exist
+        """
+        scope = self.region_scopes.get(region)
+        if scope is None:
+            if region not in self.regions:
+                return None
+            scope = self.region_scopes[region] = _Scope(dict(self.location_tree._region_localities[region]),
+                                                        set(self.location_tree._locality_display_names[region]))
+        return None if scope is _DELETED else scope
+
+    def _locality_scope(self, locality_global_location: str) -> Union[_Scope, None]:
+        """
+        :return: The staged indexes of the locality, or None if it does not exist
+        """
+        scope = self.locality_scopes.get(locality_global_location)
+        if scope is None:
+            if locality_global_location not in self.localities:
+                return None
+            scope = self.locality_scopes[locality_global_location] = _Scope(
+                dict(self.location_tree._locality_locations[locality_global_location]),
+                set(self.location_tree._location_display_names[locality_global_location]))
+        return None if scope is _DELETED else scope
+
+    def _display_name(self, scope: _Scope, global_location: str) -> str:
+        """
+        :return: The staged display name of global_location, a location in the locality of scope
+        """
+        if global_location in scope.new_display_names:
+            return scope.new_display_names[global_location]
+        return self.location_tree._locations[global_location]
+
+    def _location_scope(self, global_location: str) -> Union[_Scope, None]:
+        """
+        :return: The staged indexes of the locality holding global_location, or None if there is no such location
+        """
+        if global_location.count('_') != 2:
+            return None
+        scope = self._locality_scope(global_location.rsplit('_', maxsplit=1)[0])
+        return scope if scope is not None and global_location in scope.children else None
+
+    def _event(self, event: str, global_location: str, display_name: Union[str, None] = None) -> None:
+        if self.events is not None:
+            self.events.append((event, global_location, display_name))
+
+    def _insert_region(self, region: str, display_name: str) -> None:
+        self.changed_regions[region] = None
+        self.regions[region] = display_name
+        self.registrations.append((region, None))
+        self.region_display_names.add(display_name)
+        self.region_scopes[region] = _Scope({}, set())
+        self._event('added', region, display_name)
+
+    def _insert_locality(self, region: str, locality_global_location: str, display_name: str,
+                         entrypoint_global_location: str, entrypoint_display_name: str) -> None:
+        self.localities[locality_global_location] = {
+            'display_name': display_name,
+            'entrypoint_global_location': entrypoint_global_location,
+            'entrypoint_display_name': entrypoint_display_name
+        }
+        region_scope = self._region_scope(region)
+        region_scope.children[locality_global_location] = None
+        region_scope.display_names.add(display_name)
+        self.changed_regions[region] = None
+        self.registrations.append((locality_global_location, region))
+        scope = self.locality_scopes[locality_global_location] = _Scope({}, set())
+        self._event('added', locality_global_location, display_name)
+        self._insert_location(region, locality_global_location, scope, entrypoint_global_location,
+                              entrypoint_display_name)
+
+    def _insert_location(self, region: str, locality_global_location: str, scope: _Scope, global_location: str,
+                         display_name: str) -> None:
+        scope.children[global_location] = None
+        scope.new_display_names[global_location] = display_name
+        scope.display_names.add(display_name)
+        self.location_writes.append((global_location, display_name))
+        self.changed_regions[region] = None
+        self.registrations.append((global_location, locality_global_location))
+        self._event('added', global_location, display_name)
+
+    def _delete_locality(self, region: str, locality_global_location: str) -> None:
+        for location in self._locality_scope(locality_global_location).children:
+            self.location_writes.append((location, _DELETED))
+            self._event('removed', location)
+        self.locality_scopes[locality_global_location] = _DELETED
+        region_scope = self._region_scope(region)
+        region_scope.display_names.discard(self.localities.pop(locality_global_location)['display_name'])
+        region_scope.children.pop(locality_global_location)
+        self.changed_regions[region] = None
+        self.registrations.append((locality_global_location, _DELETED))
+        self._event('removed', locality_global_location)
+
+    def add_region(self, region_name: str, region_display_name: str, first_locality_name: str,
+                   first_locality_display_name: str, first_locality_entrypoint_name: str,
+                   first_locality_entrypoint_display_name: str) -> None:
+        if '_' in region_name:
+            raise ValueError('Underscore not allowed in region name.')
+        if '_' in first_locality_name:
+            raise ValueError('Underscore not allowed in locality name.')
+        if '_' in first_locality_entrypoint_name:
+            raise ValueError('Underscore not allowed in location name.')
+        if any([string.strip() == '' for string in (region_name, region_display_name, first_locality_name,
+                                                    first_locality_display_name, first_locality_entrypoint_name,
+                                                    first_locality_entrypoint_display_name)]):
+            raise ValueError('Name or display name cannot be empty/whitespace-only.')
+        region = region_name.strip()
+        if region == 'world':
+            raise ValueError('Region cannot be named "world".')
+        if region in self.regions:
+            raise ValueError(f'{region} already exists.')
+        if region_display_name.strip() in self.region_display_names:
+            raise ValueError(f'{region_display_name.strip()} already taken as a display name.')
+        locality_global_location = f'{region}_{first_locality_name.strip()}'
+        self._insert_region(region, region_display_name.strip())
+        self._insert_locality(region, locality_global_location, first_locality_display_name.strip(),
+                              f'{locality_global_location}_{first_locality_entrypoint_name.strip()}',
+                              first_locality_entrypoint_display_name.strip())
+
+    def add_locality(self, locality_global_location: str, locality_display_name: str, entrypoint_name: str,
+                     entrypoint_display_name: str) -> None:
+        if len(locality_global_location.split('_')) != 2:
+            raise ValueError('locality_global_location argument must conform to region_locality form.')
+        region, locality = [s.strip() for s in locality_global_location.split('_')]
+        if region == '' or locality == '':
+            raise ValueError('Region or locality cannot be empty.')
+        if any([s.strip() == '' for s in (locality_display_name, entrypoint_name, entrypoint_display_name)]):
+            raise ValueError('Empty/whitespace-only string detected in arguments.')
+        if '_' in entrypoint_name:
+            raise ValueError('Entrypoint name cannot have underscores.')
+        if region not in self.regions:
+            raise ValueError(f'Region {region} does not currently exist.')
+        if f'{region}_{locality}' in self.localities:
+            raise ValueError(f'Locality of name {locality} in region {region} already exists.')
+        if locality_display_name.strip() in self._region_scope(region).display_names:
+            raise ValueError(f'Display name {locality_display_name.strip()} in region {region} already taken.')
+        self._insert_locality(region, f'{region}_{locality}', locality_display_name.strip(),
+                              f'{region}_{locality}_{entrypoint_name.strip()}', entrypoint_display_name.strip())
+
+    def add_lowest_level_location(self, global_location: str, display_name: str) -> None:
+        parts = global_location.split('_')
+        if len(parts) != 3:
+            raise ValueError('global_location must conform to region_locality_lowest-level-location form.')
+        region, locality, location_name = parts[0].strip(), parts[1].strip(), parts[2].strip()
+        locality_global_location = f'{region}_{locality}'
+        global_location = f'{locality_global_location}_{location_name}'
+        scope = self._locality_scope(locality_global_location)
+        if scope is None:
+            if region not in self.regions:
+                raise ValueError(f'Region {region} does not exist.')
+            raise ValueError(f'Locality {locality} does not exist in region {region}.')
+        if global_location in scope.children:
+            raise ValueError('Location already exists.')
+        display_name = display_name.strip()
+        if location_name == '' or display_name == '':
+            raise ValueError('Location name or display name cannot be empty.')
+        if display_name in scope.display_names:
+            raise ValueError(f'Display name {display_name} in {locality_global_location} already taken.')
+        self._insert_location(region, locality_global_location, scope, global_location, display_name)
+
+    def stage_location_mutations(self, mutations: list[tuple[str, tuple]], start: int) -> int:
+        """
+        Stages the add_lowest_level_location, remove_lowest_level_location and lowest-level change_display_name
+        calls from mutations[start] on, the bulk of most batches, inline against the scopes of their localities. The
+        checks are the same as the methods' own, without building their error messages.
+        :param mutations: Method name and arguments of each call, in order
+        :param start: Index of the first call to stage
+        :return: Index of the first call that is not one of those, or -1, having staged only some of them, as soon
+        as one would fail
+        """
+        scopes = self.locality_scopes
+        location_writes = self.location_writes
+        registrations = self.registrations
+        changed_regions = self.changed_regions
+        events = self.events
+        for i in range(start, len(mutations)):
+            method_name, args = mutations[i]
+            if method_name == 'add_lowest_level_location':
+                parts = args[0].split('_')
+                if len(parts) != 3:
+                    return -1
+                region, locality, location_name = parts[0].strip(), parts[1].strip(), parts[2].strip()
+                locality_global_location = f'{region}_{locality}'
+                global_location = f'{locality_global_location}_{location_name}'
+            elif method_name == 'remove_lowest_level_location' \
+                    or (method_name == 'change_display_name' and args[0].count('_') == 2):
+                global_location = args[0].strip()
+                if global_location.count('_') != 2:
+                    return -1
+                locality_global_location = global_location.rsplit('_', maxsplit=1)[0]
+                region = locality_global_location.split('_', maxsplit=1)[0]
+            else:
+                return i
+            scope = scopes.get(locality_global_location)
+            if scope is None or scope is _DELETED:
+                scope = self._locality_scope(locality_global_location)
+                if scope is None:
+                    return -1
+            children = scope.children
+            if method_name == 'add_lowest_level_location':
+                display_name = args[1].strip()
+                if global_location in children or location_name == '' or display_name == '' \
+                        or display_name in scope.display_names:
+                    return -1
+                children[global_location] = None
+                scope.new_display_names[global_location] = display_name
+                scope.display_names.add(display_name)
+                location_writes.append((global_location, display_name))
+                registrations.append((global_location, locality_global_location))
+                if events is not None:
+                    events.append(('added', global_location, display_name))
+            elif global_location not in children:
+                return -1
+            elif method_name == 'change_display_name':
+                display_name = args[1].strip()
+                old_display_name = self._display_name(scope, global_location)
+                if display_name == '' or (display_name != old_display_name and display_name in scope.display_names):
+                    return -1
+                scope.display_names.discard(old_display_name)
+                scope.display_names.add(display_name)
+                scope.new_display_names[global_location] = display_name
+                location_writes.append((global_location, display_name))
+                if self.localities[locality_global_location]['entrypoint_global_location'] == global_location:
+                    self.localities[locality_global_location]['entrypoint_display_name'] = display_name
+                if events is not None:
+                    events.append(('renamed', global_location, display_name))
+            else:
+                if self.localities[locality_global_location]['entrypoint_global_location'] == global_location:
+                    return -1
+                scope.display_names.discard(self._display_name(scope, global_location))
+                del children[global_location]
+                scope.new_display_names.pop(global_location, None)
+                location_writes.append((global_location, _DELETED))
+                registrations.append((global_location, _DELETED))
+                if events is not None:
+                    events.append(('removed', global_location, None))
+            changed_regions[region] = None
+        return len(mutations)
+
+    def remove_region(self, region_name: str) -> None:
+        region = region_name.strip()
+        if region not in self.regions:
+            raise ValueError(f'Region {region} does not exist.')
+        if len(self.regions) == 1:
+            raise ValueError('Cannot remove the only region in the world.')
+        for locality in list(self._region_scope(region).children):
+            self._delete_locality(region, locality)
+        self.region_display_names.discard(self.regions.pop(region))
+        self.region_scopes[region] = _DELETED
+        self.changed_regions[region] = None
+        self.registrations.append((region, _DELETED))
+        self._event('removed', region)
+
+    def remove_locality(self, locality_global_location: str) -> None:
+        if locality_global_location.strip() not in self.localities:
+            raise ValueError(f'No such locality exists')
+        region = locality_global_location.split('_')[0]
+        if len(self._region_scope(region).children) == 1:
+            raise ValueError('Cannot remove only locality in region.')
+        self._delete_locality(region, locality_global_location.strip())
+
+    def remove_lowest_level_location(self, global_location: str) -> None:
+        global_location = global_location.strip()
+        scope = self._location_scope(global_location)
+        if scope is None:
+            raise ValueError(f'Location {global_location} does not exist.')
+        locality_global_location = global_location.rsplit('_', maxsplit=1)[0]
+        if global_location == self.localities[locality_global_location]['entrypoint_global_location']:
+            raise ValueError('Cannot remove the locality entrypoint.')
+        scope.display_names.discard(self._display_name(scope, global_location))
+        del scope.children[global_location]
+        scope.new_display_names.pop(global_location, None)
+        self.location_writes.append((global_location, _DELETED))
+        self.changed_regions[locality_global_location.split('_', maxsplit=1)[0]] = None
+        self.registrations.append((global_location, _DELETED))
+        self._event('removed', global_location)
+
+    def change_display_name(self, global_location: str, new_display_name: str) -> None:
+        new_display_name = new_display_name.strip()
+        if new_display_name == '':
+            raise ValueError('Empty display name disallowed.')
+        if (location_level := len(global_location.split('_'))) not in (1, 2, 3):
+            raise ValueError('Cannot parse global_location: Too many underscores.')
+        global_location = global_location.strip()
+        if location_level == 1:
+            if global_location == 'world':
+                self.world_display_name = new_display_name
+                self.world_renamed = True
+                return
+            if global_location not in self.regions:
+                raise ValueError(f'Region {global_location} does not exist.')
+            old_display_name = self.regions[global_location]
+            if new_display_name != old_display_name and new_display_name in self.region_display_names:
+                raise ValueError(f'Display name {new_display_name} already taken.')
+            self.region_display_names.discard(old_display_name)
+            self.region_display_names.add(new_display_name)
+            self.regions[global_location] = new_display_name
+            region = global_location
+        elif location_level == 2:
+            if global_location not in self.localities:
+                raise ValueError(f'Locality {global_location} does not exist.')
+            region = global_location.split('_')[0]
+            locality = self.localities[global_location]
+            display_names_in_region = self._region_scope(region).display_names
+            if new_display_name != locality['display_name'] and new_display_name in display_names_in_region:
+                raise ValueError(f'Display name {new_display_name} in region {region} already taken.')
+            display_names_in_region.discard(locality['display_name'])
+            display_names_in_region.add(new_display_name)
+            locality['display_name'] = new_display_name
+        else:
+            scope = self._location_scope(global_location)
+            if scope is None:
+                raise ValueError(f'Location {global_location} does not exist.')
+            locality_global_location = global_location.rsplit('_', maxsplit=1)[0]
+            old_display_name = self._display_name(scope, global_location)
+            if new_display_name != old_display_name and new_display_name in scope.display_names:
+                raise ValueError(f'Display name {new_display_name} in locality {locality_global_location} already '
+                                 f'taken.')
+            scope.display_names.discard(old_display_name)
+            scope.display_names.add(new_display_name)
+            scope.new_display_names[global_location] = new_display_name
+            self.location_writes.append((global_location, new_display_name))
+            locality = self.localities[locality_global_location]
+            if locality['entrypoint_global_location'] == global_location:
+                locality['entrypoint_display_name'] = new_display_name
+            region = locality_global_location.split('_', maxsplit=1)[0]
+        self.changed_regions[region] = None
+        self._event('renamed', global_location, new_display_name)
+
+    def change_locality_entrypoint(self, locality_global_location: str, new_entrypoint_global_location: str) -> None:
+        locality_global_location = locality_global_location.strip()
+        new_entrypoint_global_location = new_entrypoint_global_location.strip()
+        if locality_global_location not in self.localities:
+            raise ValueError(f'Locality {locality_global_location} does not exist.')
+        scope = self._locality_scope(locality_global_location)
+        if new_entrypoint_global_location not in scope.children:
+            raise ValueError(f'Location {new_entrypoint_global_location} does not exist.')
+        locality = self.localities[locality_global_location]
+        locality['entrypoint_global_location'] = new_entrypoint_global_location
+        locality['entrypoint_display_name'] = self._display_name(scope, new_entrypoint_global_location)
+        self.changed_regions[locality_global_location.split('_', maxsplit=1)[0]] = None
+
+    def _apply_registrations(self, location_ids) -> None:
+        # registrations between unregistrations go in together
+        start = 0
+        for i, (global_location, parent) in enumerate(self.registrations):
+            if parent is _DELETED:
+                location_ids.register_many(self.registrations[start:i])
+                location_ids.unregister(location_ids.get_id(global_location))
+                start = i + 1
+        location_ids.register_many(self.registrations[start:])
+
+    def _apply_location_writes(self, locations: dict[str, str]) -> None:
+        # replaying the writes in order leaves the dict in the order the direct calls would have
+        if any(value is _DELETED for _, value in self.location_writes):
+            for global_location, display_name in self.location_writes:
+                if display_name is _DELETED:
+                    locations.pop(global_location)
+                else:
+                    locations[global_location] = display_name
+        else:
+            locations.update(self.location_writes)
+
+    def apply_to_tree(self, location_tree: LocationTree) -> None:
+        """
+        Writes the staged changes into location_tree in one pass: indexes are merged, ids registered, the version
+        bumped once and each changed region marked stale once. Listeners are only told, in order, once the tree
+        holds the whole batch.
+        """
+        self._apply_registrations(location_tree.location_ids)
+        for overlay in (self.regions, self.region_display_names, self.localities):
+            overlay.apply()
+        self._apply_location_writes(location_tree._locations)
+        for name, scope in self.region_scopes.items():
+            if scope is _DELETED:
+                location_tree._region_localities.pop(name, None)
+                location_tree._locality_display_names.pop(name, None)
+            else:
+                location_tree._region_localities[name] = scope.children
+                location_tree._locality_display_names[name] = scope.display_names
+        for name, scope in self.locality_scopes.items():
+            if scope is _DELETED:
+                location_tree._locality_locations.pop(name, None)
+                location_tree._location_display_names.pop(name, None)
+            else:
+                location_tree._locality_locations[name] = scope.children
+                location_tree._location_display_names[name] = scope.display_names
+        if self.world_renamed:
+            location_tree.world_display_name = self.world_display_name
+            location_tree._world_name_changed = True
+        if self.changed_regions or self.world_renamed:
+            location_tree._version += 1
+        location_tree._stale_regions.update(self.changed_regions)
+        location_tree._changed_regions.update(self.changed_regions)
+        for event in self.events or ():
+            location_tree._notify_listeners(*event)
+
+
+class LocationTreeBatchError(ValueError):
+    """
+    Raised when a LocationTreeBatch is committed with mutations that would fail. Nothing has been applied.
+    :param errors (list[str]): One message per failing mutation, prefixed with its position in the batch
+    """
+
+    def __init__(self, errors: list[str]):
+        super().__init__(f'{len(errors)} mutation(s) in batch would fail:\n' + '\n'.join(errors))
+        self.errors: list[str] = errors
+
+
+class LocationTreeBatch:
+    """
+    Queues LocationTree mutations and applies them all or none. Each queued call takes the same arguments as the
+    LocationTree method of the same name. commit() first validates the whole batch in order, against the tree as
+    it would be after the earlier queued mutations, and only touches the tree once everything has passed. Used as
+    a context manager, the batch commits on exit unless the block raised.
+    :param location_tree (LocationTree): The tree to mutate
+    """
+
+    def __init__(self, location_tree: LocationTree):
+        self.location_tree: LocationTree = location_tree
+        self._mutations: list[tuple[str, tuple]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+
+    def __len__(self) -> int:
+        return len(self._mutations)
+
+    def add_region(self, region_name: str, region_display_name: str, first_locality_name: str,
+                   first_locality_display_name: str, first_locality_entrypoint_name: str,
+                   first_locality_entrypoint_display_name: str) -> None:
+        self._mutations.append(('add_region', (region_name, region_display_name, first_locality_name,
+                                               first_locality_display_name, first_locality_entrypoint_name,
+                                               first_locality_entrypoint_display_name)))
+
+    def add_locality(self, locality_global_location: str, locality_display_name: str, entrypoint_name: str,
+                     entrypoint_display_name: str) -> None:
+        self._mutations.append(('add_locality', (locality_global_location, locality_display_name, entrypoint_name,
+                                                 entrypoint_display_name)))
+
+    def add_lowest_level_location(self, global_location: str, display_name: str) -> None:
+        self._mutations.append(('add_lowest_level_location', (global_location, display_name)))
+
+    def remove_region(self, region_name: str) -> None:
+        self._mutations.append(('remove_region', (region_name,)))
+
+    def remove_locality(self, locality_global_location: str) -> None:
+        self._mutations.append(('remove_locality', (locality_global_location,)))
+
+    def remove_lowest_level_location(self, global_location: str) -> None:
+        self._mutations.append(('remove_lowest_level_location', (global_location,)))
+
+    def change_display_name(self, global_location: str, new_display_name: str) -> None:
+        self._mutations.append(('change_display_name', (global_location, new_display_name)))
+
+    def change_locality_entrypoint(self, locality_global_location: str, new_entrypoint_global_location: str) -> None:
+        self._mutations.append(('change_locality_entrypoint',
+                                (locality_global_location, new_entrypoint_global_location)))
+
+    def _stage(self, inline: bool = True) -> tuple[_StagedTree, list[str]]:
+        staged_tree = _StagedTree(self.location_tree)
+        errors = []
+        i = 0
+        while i < len(self._mutations):
+            if inline:
+                i = staged_tree.stage_location_mutations(self._mutations, i)
+                if i == -1:
+                    # something fails: stage everything again one call at a time, for the error messages
+                    return self._stage(inline=False)
+                if i == len(self._mutations):
+                    break
+            method_name, args = self._mutations[i]
+            try:
+                getattr(staged_tree, method_name)(*args)
+            except ValueError as e:
+                errors.append(f'{i}: {method_name}: {e}')
+            i += 1
+        return staged_tree, errors
+
+    def validate(self) -> list[str]:
+        """
+        :return: Messages for every queued mutation that would fail. A failing mutation is skipped, so later ones
+        are validated as if it had not been queued.
+        """
+        return self._stage()[1]
+
+    def commit(self) -> None:
+        """
+        Applies every queued mutation, or none of them if any would fail, and empties the queue. The mutations are
+        validated and staged once, then written into the tree in one pass. Listeners are told about every change
+        only once the whole batch is in the tree.
+        :raises LocationTreeBatchError: if any mutation would fail
+        """
+        staged_tree, errors = self._stage()
+        if errors:
+            raise LocationTreeBatchError(errors)
+        self._mutations = []
+        staged_tree.apply_to_tree(self.location_tree)
+
+    def discard(self) -> None:
+        self._mutations = []
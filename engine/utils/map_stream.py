@@ -0,0 +1,184 @@
+import json
+import re
+from typing import IO, Any, Iterator
+
+from engine.utils.location_tree import LocationTree, MapValidationError, _load_region
+
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[\s,}\]]')
+_WHITESPACE = ' \t\n\r'
+
+
+class _JsonObjectStream:
+    """
+    Reads a JSON document from a text file object a chunk at a time. Only the structure of the top-level object and
+    of one nested object is walked by hand; every other value is sliced out of the buffer and handed to json.loads,
+    so the buffer never needs to hold more than the largest single value plus one chunk.
+    :param file_obj (IO[str]): The file object to read from
+    :param chunk_size (int): Number of characters to read at a time
+    """
+
+    def __init__(self, file_obj: IO[str], chunk_size: int):
+        self._file = file_obj
+        self._chunk_size = max(1, int(chunk_size))
+        self._buffer: str = ''
+        self._pos: int = 0
+        self._eof: bool = False
+
+    def _fill(self) -> int:
+        """
+        Reads another chunk, dropping the consumed part of the buffer.
+        :return: How far the unconsumed part of the buffer moved back, so callers can adjust their indices
+        """
+        if self._eof:
+            raise ValueError('Unexpected end of map data.')
+        # Reading at least as much as is already buffered keeps the copying linear when one value spans many chunks
+        chunk = self._file.read(max(self._chunk_size, len(self._buffer) - self._pos))
+        if chunk == '':
+            self._eof = True
+            raise ValueError('Unexpected end of map data.')
+        shift = self._pos
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return shift
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            self._fill()
+
+    def expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f'Malformed map data: expected "{char}" but found "{self._peek()}".')
+        self._pos += 1
+
+    def next_member(self, first: bool) -> bool:
+        """
+        Moves past the separator before the next member of the current object.
+        :return: False if the object has ended, True if another member follows
+        """
+        if self._peek() == '}':
+            self._pos += 1
+            return False
+        if not first:
+            self.expect(',')
+        return True
+
+    def _skip_string(self, i: int) -> int:
+        """
+        :param i: Index just past the opening quote
+        :return: Index just past the closing quote
+        """
+        while True:
+            match = _STRING_SPECIAL.search(self._buffer, i)
+            if match is None:
+                i = len(self._buffer) - self._fill()
+                continue
+            i = match.end()
+            if match.group() == '"':
+                return i
+            if i >= len(self._buffer):
+                i -= self._fill()
+            i += 1
+
+    def _value_end(self) -> int:
+        i = self._pos
+        first = self._buffer[i]
+        if first == '"':
+            return self._skip_string(i + 1)
+        if first not in '{[':
+            while True:
+                match = _SCALAR_END.search(self._buffer, i)
+                if match is not None:
+                    return match.start()
+                i = len(self._buffer) - self._fill()
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self._buffer, i)
+            if match is None:
+                i = len(self._buffer) - self._fill()
+                continue
+            i = match.end()
+            char = match.group()
+            if char == '"':
+                i = self._skip_string(i)
+            elif char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+    def read_value(self) -> Any:
+        self._peek()
+        end = self._value_end()
+        value = json.loads(self._buffer[self._pos:end])
+        self._pos = end
+        return value
+
+
+def iter_map_json_stream(file_obj: IO[str], chunk_size: int = 1 << 16) -> Iterator[tuple[str, Any]]:
+    """
+    Walks map data in the world_name/regions format without parsing the whole document.
+    :param file_obj: Text file object containing the map data
+    :param chunk_size: Number of characters to read at a time
+    :return: Iterator of ('world_name', name) and ('region', (region_name, region_data)) pairs in file order
+    """
+    stream = _JsonObjectStream(file_obj, chunk_size)
+    stream.expect('{')
+    first = True
+    while stream.next_member(first):
+        first = False
+        key = stream.read_value()
+        stream.expect(':')
+        if key == 'regions':
+            stream.expect('{')
+            first_region = True
+            while stream.next_member(first_region):
+                first_region = False
+                region_name = stream.read_value()
+                stream.expect(':')
+                yield 'region', (region_name, stream.read_value())
+        elif key == 'world_name':
+            yield 'world_name', stream.read_value()
+        else:
+            stream.read_value()
+
+
+def map_from_json_stream(file_obj: IO[str], chunk_size: int = 1 << 16) -> LocationTree:
+    """
+    Builds a LocationTree from a map JSON file one region at a time, so that only one region's data is held in memory
+    at once. Validation and error reporting are the same as map_from_json.
+    :param file_obj: Text file object containing the map data
+    :param chunk_size: Number of characters to read at a time
+    :return: LocationTree
+    :raises MapValidationError: if the map data has any problems
+    """
+    errors: list[str] = []
+    location_tree = LocationTree._empty('')
+    region_display_names: set[str] = set()
+    world_name = None
+    region_count = 0
+    for kind, value in iter_map_json_stream(file_obj, chunk_size):
+        if kind == 'world_name':
+            world_name = value
+        else:
+            region_name, region_data = value
+            _load_region(location_tree, region_name, region_data, region_display_names, errors)
+            region_count += 1
+    if not isinstance(world_name, str):
+        errors.append('map: missing "world_name".' if world_name is None else 'map.world_name: expected str.')
+    elif world_name.strip() == '':
+        errors.append('map.world_name: cannot be empty/whitespace-only.')
+    else:
+        location_tree.world_display_name = world_name.strip()
+    if region_count == 0:
+        errors.append('map.regions: a world needs at least one region.')
+    if errors:
+        raise MapValidationError(errors)
+    location_tree.mark_changes_saved()
+    return location_tree
@@ -0,0 +1,347 @@
+from typing import NamedTuple, Union
+from engine.utils.location_tree import LocationTree, map_from_json
+from engine.utils.persistent_map import PersistentMap, PersistentSet
+
+
+class _LocalityNode(NamedTuple):
+    display_name: str
+    entrypoint: str
+    # location name -> display name
+    locations: PersistentMap
+    location_display_names: PersistentSet
+
+
+class _RegionNode(NamedTuple):
+    display_name: str
+    # locality name -> _LocalityNode
+    localities: PersistentMap
+    locality_display_names: PersistentSet
+
+
+def _renamed(display_names: PersistentSet, old: str, new: str) -> PersistentSet:
+    return display_names.discard(old).add(new)
+
+
+class PersistentLocationTree:
+    """
+    Immutable counterpart of LocationTree. The add_*, remove_* and change_* methods validate the same way as
+    LocationTree's but return a new tree, leaving this one untouched. The new tree shares every region and locality
+    that was not on the path of the change, so keeping many snapshots (base map, mod layers, undo history) costs
+    only the nodes that actually differ between them. Regions, localities, locations and the display names taken at
+    each level are held in PersistentMaps and PersistentSets, so a change copies O(log n) of each level it passes
+    through rather than the whole level, however many regions or locations there are.
+    :param world_display_name (str): The display name for the world the game is to be set in
+    :param first_region_display_name (str): The display name for the first region
+    :param first_region_name (str): Name of the region
+    :param first_locality_display_name (str): Display name for the first locality in the first region
+    :param first_locality_name (str): Name of the first locality
+    :param first_locality_entrypoint_display_name (str): Display name of the default entrypoint of the first locality
+    :param first_locality_entrypoint_name (str): Name of the default entrypoint location
+    """
+
+    def __init__(self, world_display_name: str,
+                 first_region_display_name: str,
+                 first_region_name: str,
+                 first_locality_display_name: str,
+                 first_locality_name: str,
+                 first_locality_entrypoint_display_name: str,
+                 first_locality_entrypoint_name: str):
+        # Let LocationTree do the validation of the arguments
+        location_tree = LocationTree(world_display_name=world_display_name,
+                                     first_region_display_name=first_region_display_name,
+                                     first_region_name=first_region_name,
+                                     first_locality_display_name=first_locality_display_name,
+                                     first_locality_name=first_locality_name,
+                                     first_locality_entrypoint_display_name=first_locality_entrypoint_display_name,
+                                     first_locality_entrypoint_name=first_locality_entrypoint_name)
+        other = PersistentLocationTree.from_location_tree(location_tree)
+        self.world_display_name: str = other.world_display_name
+        self._regions: PersistentMap = other._regions
+        self._region_display_names: PersistentSet = other._region_display_names
+
+    @classmethod
+    def _from_parts(cls, world_display_name: str, regions: PersistentMap, region_display_names: PersistentSet):
+        tree = cls.__new__(cls)
+        tree.world_display_name = world_display_name
+        tree._regions = regions
+        tree._region_display_names = region_display_names
+        return tree
+
+    @classmethod
+    def from_location_tree(cls, location_tree: LocationTree):
+        regions: dict[str, _RegionNode] = {}
+        localities = location_tree.get_localities()
+        for region, region_display_name in location_tree.get_region_names_and_display_names():
+            locality_nodes: dict[str, _LocalityNode] = {}
+            for locality in location_tree.get_localities_in_region(region):
+                locations = {location.rsplit('_', maxsplit=1)[1]: display_name
+                             for location, display_name in location_tree.get_locations_in_locality(locality)}
+                locality_nodes[locality.split('_', maxsplit=1)[1]] = _LocalityNode(
+                    display_name=localities[locality]['display_name'],
+                    entrypoint=localities[locality]['entrypoint_global_location'].rsplit('_', maxsplit=1)[1],
+                    locations=PersistentMap(locations),
+                    location_display_names=PersistentSet(locations.values()))
+            regions[region] = _RegionNode(display_name=region_display_name,
+                                          localities=PersistentMap(locality_nodes),
+                                          locality_display_names=PersistentSet(
+                                              node.display_name for node in locality_nodes.values()))
+        return cls._from_parts(location_tree.get_world_display_name(), PersistentMap(regions),
+                               PersistentSet(region.display_name for region in regions.values()))
+
+    @classmethod
+    def from_map_json(cls, map_json: dict[str, Union[str, dict]]):
+        return cls.from_location_tree(map_from_json(map_json))
+
+    def to_location_tree(self) -> LocationTree:
+        return map_from_json(self.export_world_map())
+
+    def _with_region(self, region: str, node: Union[_RegionNode, None],
+                     region_display_names: PersistentSet = None):
+        regions = self._regions.remove(region) if node is None else self._regions.set(region, node)
+        return PersistentLocationTree._from_parts(self.world_display_name, regions,
+                                                  region_display_names if region_display_names is not None
+                                                  else self._region_display_names)
+
+    def _with_locality(self, region: str, locality: str, node: Union[_LocalityNode, None],
+                       locality_display_names: PersistentSet = None):
+        region_node = self._regions[region]
+        localities = region_node.localities.remove(locality) if node is None \
+            else region_node.localities.set(locality, node)
+        return self._with_region(region, region_node._replace(
+            localities=localities,
+            locality_display_names=locality_display_names if locality_display_names is not None
+            else region_node.locality_display_names))
+
+    def _get_locality_node(self, locality_global_location: str) -> tuple[str, str, _LocalityNode]:
+        parts = locality_global_location.strip().split('_')
+        if len(parts) != 2 or parts[0] not in self._regions or parts[1] not in self._regions[parts[0]].localities:
+            raise ValueError(f'Locality {locality_global_location.strip()} does not exist.')
+        return parts[0], parts[1], self._regions[parts[0]].localities[parts[1]]
+
+    def _get_location(self, global_location: str) -> tuple[str, str, str, _LocalityNode]:
+        parts = global_location.strip().split('_')
+        if len(parts) != 3 or parts[0] not in self._regions or parts[1] not in self._regions[parts[0]].localities \
+                or parts[2] not in self._regions[parts[0]].localities[parts[1]].locations:
+            raise ValueError(f'Location {global_location.strip()} does not exist.')
+        return parts[0], parts[1], parts[2], self._regions[parts[0]].localities[parts[1]]
+
+    def get_world_display_name(self) -> str:
+        return self.world_display_name
+
+    def get_region_names(self) -> list[str]:
+        return list(self._regions)
+
+    def get_region_names_and_display_names(self) -> list[list[str]]:
+        return [[region, node.display_name] for region, node in self._regions.items()]
+
+    def get_region_display_name(self, region_name: str) -> str:
+        if region_name not in self._regions:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return self._regions[region_name].display_name
+
+    def get_localities(self) -> dict[str, dict[str, str]]:
+        localities = {}
+        for region, region_node in self._regions.items():
+            for locality, node in region_node.localities.items():
+                localities[f'{region}_{locality}'] = {
+                    'display_name': node.display_name,
+                    'entrypoint_global_location': f'{region}_{locality}_{node.entrypoint}',
+                    'entrypoint_display_name': node.locations[node.entrypoint]
+                }
+        return localities
+
+    def get_locality_global_locations(self) -> list[str]:
+        return [f'{region}_{locality}' for region, node in self._regions.items() for locality in node.localities]
+
+    def get_localities_in_region(self, region_name: str) -> list[str]:
+        if region_name not in self._regions:
+            raise ValueError(f'Region {region_name} does not exist.')
+        return [f'{region_name}_{locality}' for locality in self._regions[region_name].localities]
+
+    def get_lowest_level_locations(self) -> list[list[str]]:
+        return [[f'{region}_{locality}_{location}', display_name]
+                for region, region_node in self._regions.items()
+                for locality, node in region_node.localities.items()
+                for location, display_name in node.locations.items()]
+
+    def get_locations_in_locality(self, locality_global_location: str) -> list[list[str]]:
+        region, locality, node = self._get_locality_node(locality_global_location)
+        return [[f'{region}_{locality}_{location}', display_name] for location, display_name in node.locations.items()]
+
+    def get_location_display_name(self, global_location: str) -> str:
+        location, node = self._get_location(global_location)[2:]
+        return node.locations[location]
+
+    def has_region(self, region_name: str) -> bool:
+        return region_name in self._regions
+
+    def has_locality(self, locality_global_location: str) -> bool:
+        parts = locality_global_location.split('_')
+        return len(parts) == 2 and parts[0] in self._regions and parts[1] in self._regions[parts[0]].localities
+
+    def has_lowest_level_location(self, global_location: str) -> bool:
+        parts = global_location.split('_')
+        return len(parts) == 3 and self.has_locality(f'{parts[0]}_{parts[1]}') and \
+            parts[2] in self._regions[parts[0]].localities[parts[1]].locations
+
+    def add_region(self, region_name: str,
+                   region_display_name: str,
+                   first_locality_name: str,
+                   first_locality_display_name: str,
+                   first_locality_entrypoint_name: str,
+                   first_locality_entrypoint_display_name: str):
+        if '_' in region_name:
+            raise ValueError('Underscore not allowed in region name.')
+        if '_' in first_locality_name:
+            raise ValueError('Underscore not allowed in locality name.')
+        if '_' in first_locality_entrypoint_name:
+            raise ValueError('Underscore not allowed in location name.')
+        if any([string.strip() == '' for string in (region_name, region_display_name, first_locality_name,
+                                                    first_locality_display_name, first_locality_entrypoint_name,
+                                                    first_locality_entrypoint_display_name)]):
+            raise ValueError('Name or display name cannot be empty/whitespace-only.')
+        if region_name.strip() == 'world':
+            raise ValueError('Region cannot be named "world".')
+        if region_name.strip() in self._regions:
+            raise ValueError(f'{region_name.strip()} already exists.')
+        if region_display_name.strip() in self._region_display_names:
+            raise ValueError(f'{region_display_name.strip()} already taken as a display name.')
+        locality_node = _LocalityNode(display_name=first_locality_display_name.strip(),
+                                      entrypoint=first_locality_entrypoint_name.strip(),
+                                      locations=PersistentMap({first_locality_entrypoint_name.strip():
+                                                               first_locality_entrypoint_display_name.strip()}),
+                                      location_display_names=PersistentSet(
+                                          [first_locality_entrypoint_display_name.strip()]))
+        region_node = _RegionNode(display_name=region_display_name.strip(),
+                                  localities=PersistentMap({first_locality_name.strip(): locality_node}),
+                                  locality_display_names=PersistentSet([first_locality_display_name.strip()]))
+        return self._with_region(region_name.strip(), region_node,
+                                 self._region_display_names.add(region_display_name.strip()))
+
+    def add_locality(self, locality_global_location: str,
+                     locality_display_name: str,
+                     entrypoint_name: str,
+                     entrypoint_display_name: str):
+        if len(locality_global_location.split('_')) != 2:
+            raise ValueError('locality_global_location argument must conform to region_locality form.')
+        region, locality = [s.strip() for s in locality_global_location.split('_')]
+        if region == '' or locality == '':
+            raise ValueError('Region or locality cannot be empty.')
+        if any([s.strip() == '' for s in (locality_display_name, entrypoint_name, entrypoint_display_name)]):
+            raise ValueError('Empty/whitespace-only string detected in arguments.')
+        if '_' in entrypoint_name:
+            raise ValueError('Entrypoint name cannot have underscores.')
+        if region not in self._regions:
+            raise ValueError(f'Region {region} does not currently exist.')
+        region_node = self._regions[region]
+        if locality in region_node.localities:
+            raise ValueError(f'Locality of name {locality} in region {region} already exists.')
+        if locality_display_name.strip() in region_node.locality_display_names:
+            raise ValueError(f'Display name {locality_display_name.strip()} in region {region} already taken.')
+        locality_node = _LocalityNode(display_name=locality_display_name.strip(),
+                                      entrypoint=entrypoint_name.strip(),
+                                      locations=PersistentMap({entrypoint_name.strip():
+                                                               entrypoint_display_name.strip()}),
+                                      location_display_names=PersistentSet([entrypoint_display_name.strip()]))
+        return self._with_locality(region, locality, locality_node,
+                                   region_node.locality_display_names.add(locality_display_name.strip()))
+
+    def add_lowest_level_location(self, global_location: str, display_name: str):
+        if len(global_location.split('_')) != 3:
+            raise ValueError('global_location must conform to region_locality_lowest-level-location form.')
+        region, locality, location_name = [s.strip() for s in global_location.split('_')]
+        if self.has_lowest_level_location(f'{region}_{locality}_{location_name}'):
+            raise ValueError('Location already exists.')
+        if region not in self._regions:
+            raise ValueError(f'Region {region} does not exist.')
+        if locality not in self._regions[region].localities:
+            raise ValueError(f'Locality {locality} does not exist in region {region}.')
+        if location_name == '' or display_name.strip() == '':
+            raise ValueError('Location name or display name cannot be empty.')
+        node = self._regions[region].localities[locality]
+        if display_name.strip() in node.location_display_names:
+            raise ValueError(f'Display name {display_name.strip()} in {region}_{locality} already taken.')
+        return self._with_locality(region, locality, node._replace(
+            locations=node.locations.set(location_name, display_name.strip()),
+            location_display_names=node.location_display_names.add(display_name.strip())))
+
+    def remove_region(self, region_name: str):
+        if region_name.strip() not in self._regions:
+            raise ValueError(f'Region {region_name.strip()} does not exist.')
+        if len(self._regions) == 1:
+            raise ValueError('Cannot remove the only region in the world.')
+        return self._with_region(region_name.strip(), None,
+                                 self._region_display_names.discard(self._regions[region_name.strip()].display_name))
+
+    def remove_locality(self, locality_global_location: str):
+        if not self.has_locality(locality_global_location.strip()):
+            raise ValueError(f'No such locality exists')
+        region, locality, node = self._get_locality_node(locality_global_location)
+        if len(self._regions[region].localities) == 1:
+            raise ValueError('Cannot remove only locality in region.')
+        return self._with_locality(region, locality, None,
+                                   self._regions[region].locality_display_names.discard(node.display_name))
+
+    def remove_lowest_level_location(self, global_location: str):
+        region, locality, location, node = self._get_location(global_location)
+        if location == node.entrypoint:
+            raise ValueError('Cannot remove the locality entrypoint.')
+        return self._with_locality(region, locality, node._replace(
+            locations=node.locations.remove(location),
+            location_display_names=node.location_display_names.discard(node.locations[location])))
+
+    def change_display_name(self, global_location: str, new_display_name: str):
+        new_display_name = new_display_name.strip()
+        if new_display_name == '':
+            raise ValueError('Empty display name disallowed.')
+        if (location_level := len(global_location.split('_'))) not in (1, 2, 3):
+            raise ValueError('Cannot parse global_location: Too many underscores.')
+        elif location_level == 1:
+            if global_location.strip() == 'world':
+                return PersistentLocationTree._from_parts(new_display_name, self._regions, self._region_display_names)
+            region = global_location.strip()
+            if region not in self._regions:
+                raise ValueError(f'Region {region} does not exist.')
+            node = self._regions[region]
+            if new_display_name != node.display_name and new_display_name in self._region_display_names:
+                raise ValueError(f'Display name {new_display_name} already taken.')
+            return self._with_region(region, node._replace(display_name=new_display_name),
+                                     _renamed(self._region_display_names, node.display_name, new_display_name))
+        elif location_level == 2:
+            region, locality, node = self._get_locality_node(global_location)
+            display_names_in_region = self._regions[region].locality_display_names
+            if new_display_name != node.display_name and new_display_name in display_names_in_region:
+                raise ValueError(f'Display name {new_display_name} in region {region} already taken.')
+            return self._with_locality(region, locality, node._replace(display_name=new_display_name),
+                                       _renamed(display_names_in_region, node.display_name, new_display_name))
+        else:
+            region, locality, location, node = self._get_location(global_location)
+            old_display_name = node.locations[location]
+            if new_display_name != old_display_name and new_display_name in node.location_display_names:
+                raise ValueError(f'Display name {new_display_name} in locality {region}_{locality} already taken.')
+            return self._with_locality(region, locality, node._replace(
+                locations=node.locations.set(location, new_display_name),
+                location_display_names=_renamed(node.location_display_names, old_display_name, new_display_name)))
+
+    def change_locality_entrypoint(self, locality_global_location: str, new_entrypoint_global_location: str):
+        region, locality, node = self._get_locality_node(locality_global_location)
+        parts = new_entrypoint_global_location.strip().split('_')
+        if len(parts) != 3 or parts[:2] != [region, locality] or parts[2] not in node.locations:
+            raise ValueError(f'Location {new_entrypoint_global_location.strip()} does not exist.')
+        return self._with_locality(region, locality, node._replace(entrypoint=parts[2]))
+
+    def export_world_map(self) -> dict[str, Union[str, dict]]:
+        map_data = {'world_name': self.world_display_name, 'regions': {}}
+        for region, region_node in self._regions.items():
+            localities = {}
+            for locality, node in region_node.localities.items():
+                localities[locality] = {
+                    'display_name': node.display_name,
+                    'locations': {'entrypoint': node.entrypoint,
+                                  'entrypoint_display_name': node.locations[node.entrypoint],
+                                  'other_locations': {location: {'display_name': display_name}
+                                                      for location, display_name in node.locations.items()
+                                                      if location != node.entrypoint}}
+                }
+            map_data['regions'][region] = {'display_name': region_node.display_name, 'localities': localities}
+        return map_data
@@ -0,0 +1,315 @@
+from collections.abc import Iterable, Iterator, Mapping, Set
+from typing import Any, NamedTuple, Union
+
+# bits of a key's hash, or of an insertion number, used at each level of a trie
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_BITS = 64
+_EMPTY_NODE: tuple = (None,) * _WIDTH
+# maps of up to this many entries are held in a plain dict instead, since copying that whole is cheaper than copying
+# a path down each trie
+_SMALL_SIZE = 32
+
+
+class _Entry(NamedTuple):
+    key: Any
+    value: Any
+    # insertion number, which orders iteration
+    seq: int
+
+
+class _Collision(tuple):
+    """
+    Entries whose keys have the same full hash, kept below the deepest level of the hash trie.
+    """
+    pass
+
+
+def _hash(key) -> int:
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+def _replaced(node: tuple, i: int, child) -> Union[tuple, None]:
+    """
+    :return: A copy of node with slot i set to child, or None if that leaves it empty
+    """
+    node = node[:i] + (child,) + node[i + 1:]
+    return None if child is None and node == _EMPTY_NODE else node
+
+
+def _hash_trie_find(node: Union[tuple, None], key, key_hash: int) -> Union[_Entry, None]:
+    shift = 0
+    while node is not None:
+        slot = node[(key_hash >> shift) & _MASK]
+        if type(slot) is _Entry:
+            return slot if slot.key == key else None
+        if type(slot) is _Collision:
+            return next((entry for entry in slot if entry.key == key), None)
+        node = slot
+        shift += _BITS
+    return None
+
+
+def _hash_trie_pair(first: _Entry, second: _Entry, second_hash: int, shift: int) -> Union[tuple, _Collision]:
+    first_hash = _hash(first.key)
+    if shift >= _HASH_BITS:
+        return _Collision((first, second))
+    i, j = (first_hash >> shift) & _MASK, (second_hash >> shift) & _MASK
+    if i == j:
+        return _replaced(_EMPTY_NODE, i, _hash_trie_pair(first, second, second_hash, shift + _BITS))
+    return _replaced(_replaced(_EMPTY_NODE, i, first), j, second)
+
+
+def _hash_trie_put(node: Union[tuple, None], entry: _Entry, key_hash: int, shift: int = 0) -> tuple:
+    """
+    :return: A copy of node with entry in it, replacing any entry with the same key. Only the nodes on the path
+    to entry are copied.
+    """
+    node = node if node is not None else _EMPTY_NODE
+    i = (key_hash >> shift) & _MASK
+    slot = node[i]
+    if slot is None or (type(slot) is _Entry and slot.key == entry.key):
+        child = entry
+    elif type(slot) is _Entry:
+        child = _hash_trie_pair(slot, entry, key_hash, shift + _BITS)
+    elif type(slot) is _Collision:
+        child = _Collision(tuple(other for other in slot if other.key != entry.key) + (entry,))
+    else:
+        child = _hash_trie_put(slot, entry, key_hash, shift + _BITS)
+    return _replaced(node, i, child)
+
+
+def _hash_trie_remove(node: tuple, key, key_hash: int, shift: int = 0) -> Union[tuple, None]:
+    """
+    :return: A copy of node without key, which must be in it, or None if nothing is left
+    """
+    i = (key_hash >> shift) & _MASK
+    slot = node[i]
+    if type(slot) is _Entry:
+        child = None
+    elif type(slot) is _Collision:
+        rest = tuple(entry for entry in slot if entry.key != key)
+        child = rest[0] if len(rest) == 1 else _Collision(rest)
+    else:
+        child = _hash_trie_remove(slot, key, key_hash, shift + _BITS)
+    return _replaced(node, i, child)
+
+
+def _hash_trie_build(entries: list[tuple[_Entry, int]], shift: int = 0) -> tuple:
+    """
+    :param entries: Entries with distinct keys, each with the hash of its key
+    """
+    buckets: list[list[tuple[_Entry, int]]] = [[] for _ in range(_WIDTH)]
+    for entry, key_hash in entries:
+        buckets[(key_hash >> shift) & _MASK].append((entry, key_hash))
+    node = []
+    for bucket in buckets:
+        if not bucket:
+            node.append(None)
+        elif len(bucket) == 1:
+            node.append(bucket[0][0])
+        elif shift + _BITS >= _HASH_BITS:
+            node.append(_Collision(entry for entry, _ in bucket))
+        else:
+            node.append(_hash_trie_build(bucket, shift + _BITS))
+    return tuple(node)
+
+
+def _order_trie_put(node: Union[tuple, None], seq: int, entry: Union[_Entry, None], shift: int) -> Union[tuple, None]:
+    """
+    :return: A copy of node with slot seq set to entry, or emptied if entry is None
+    """
+    i = (seq >> shift) & _MASK
+    node = node if node is not None else _EMPTY_NODE
+    child = entry if shift == 0 else _order_trie_put(node[i], seq, entry, shift - _BITS)
+    return _replaced(node, i, child)
+
+
+def _order_trie_entries(node: tuple, shift: int) -> Iterator[_Entry]:
+    if shift == 0:
+        yield from (entry for entry in node if entry is not None)
+    else:
+        for child in node:
+            if child is not None:
+                yield from _order_trie_entries(child, shift - _BITS)
+
+
+class PersistentMap(Mapping):
+    """
+    An immutable mapping that iterates in insertion order, like a dict. set and remove return a new map sharing all
+    but O(log n) of its nodes with this one, so keeping many versions of a wide map costs only what differs between
+    them, and changing one costs the same however wide it is.
+
+    Entries are held twice: in a hash trie, for lookups by key, and in a trie indexed by insertion number, for
+    iteration in order. Both are tuples of 32 slots per node, and are copied along the path to the changed entry.
+    Removing an entry leaves an empty slot in the order trie, and once empty slots outnumber entries the tries are
+    rebuilt without them. Copying a path down both tries costs a few microseconds however small the map, several
+    times what copying a small dict costs, so maps of up to _SMALL_SIZE entries are held in a dict copied on every
+    change instead, and only move into tries when they outgrow it.
+    :param items (Iterable): Pairs of key and value, or a mapping, to start with
+    """
+
+    def __init__(self, items: Union[Mapping, Iterable[tuple[Any, Any]]] = ()):
+        items = dict(items)
+        # the entries of a small map, or None once they are held in the tries
+        self._small: Union[dict, None] = items if len(items) <= _SMALL_SIZE else None
+        self._hash_root: Union[tuple, None] = None
+        self._order_root: Union[tuple, None] = None
+        # shift of the top level of the order trie, which gains a level whenever insertion numbers outgrow it
+        self._order_shift: int = 0
+        self._next_seq: int = len(items)
+        self._size: int = len(items)
+        if self._small is None:
+            self._build_tries(items)
+
+    def _build_tries(self, items: dict) -> None:
+        entries = [_Entry(key, value, seq) for seq, (key, value) in enumerate(items.items())]
+        if not entries:
+            return
+        self._hash_root = _hash_trie_build([(entry, _hash(entry.key)) for entry in entries])
+        # build the order trie bottom up, a level at a time
+        level: list = entries
+        while True:
+            level = [tuple(level[i:i + _WIDTH]) + (None,) * (i + _WIDTH - len(level))
+                     for i in range(0, len(level), _WIDTH)]
+            if len(level) == 1:
+                break
+            self._order_shift += _BITS
+        self._order_root = level[0]
+
+    def _put(self, key, value) -> None:
+        key_hash = _hash(key)
+        old_entry = _hash_trie_find(self._hash_root, key, key_hash)
+        if old_entry is None:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._size += 1
+            while seq >> (self._order_shift + _BITS):
+                self._order_root = _replaced(_EMPTY_NODE, 0, self._order_root)
+                self._order_shift += _BITS
+        else:
+            seq = old_entry.seq
+        entry = _Entry(key, value, seq)
+        self._hash_root = _hash_trie_put(self._hash_root, entry, key_hash)
+        self._order_root = _order_trie_put(self._order_root, seq, entry, self._order_shift)
+
+    def _copy(self) -> 'PersistentMap':
+        copy = PersistentMap.__new__(PersistentMap)
+        copy.__dict__.update(self.__dict__)
+        return copy
+
+    def set(self, key, value) -> 'PersistentMap':
+        """
+        :return: A new map with key set to value. An existing key keeps its place in the order.
+        """
+        if self._small is not None:
+            if key not in self._small and len(self._small) == _SMALL_SIZE:
+                # past the size limit: move the entries into tries
+                return PersistentMap({**self._small, key: value})
+            return self._with_small({**self._small, key: value})
+        result = self._copy()
+        result._put(key, value)
+        return result
+
+    def _with_small(self, small: dict) -> 'PersistentMap':
+        result = self._copy()
+        result._small = small
+        result._size = result._next_seq = len(small)
+        return result
+
+    def remove(self, key) -> 'PersistentMap':
+        """
+        :return: A new map without key
+        :raises KeyError: if key is not in the map
+        """
+        if self._small is not None:
+            small = dict(self._small)
+            del small[key]
+            return self._with_small(small)
+        key_hash = _hash(key)
+        entry = _hash_trie_find(self._hash_root, key, key_hash)
+        if entry is None:
+            raise KeyError(key)
+        result = self._copy()
+        result._hash_root = _hash_trie_remove(self._hash_root, key, key_hash)
+        result._order_root = _order_trie_put(self._order_root, entry.seq, None, self._order_shift)
+        result._size -= 1
+        if result._size <= _SMALL_SIZE // 2 or result._next_seq - result._size > result._size:
+            # back into a dict, or into tries without the empty slots. Either costs O(n), but only after O(n)
+            # removals.
+            return PersistentMap(result.items())
+        return result
+
+    def _entries(self) -> Iterator[_Entry]:
+        if self._order_root is not None:
+            yield from _order_trie_entries(self._order_root, self._order_shift)
+
+    def __getitem__(self, key) -> Any:
+        if self._small is not None:
+            return self._small[key]
+        entry = _hash_trie_find(self._hash_root, key, _hash(key))
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def __contains__(self, key) -> bool:
+        if self._small is not None:
+            return key in self._small
+        return _hash_trie_find(self._hash_root, key, _hash(key)) is not None
+
+    def __iter__(self) -> Iterator:
+        if self._small is not None:
+            return iter(self._small)
+        return (entry.key for entry in self._entries())
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f'PersistentMap({dict(self.items())!r})'
+
+    def values(self) -> Iterator:
+        if self._small is not None:
+            return iter(self._small.values())
+        return (entry.value for entry in self._entries())
+
+    def items(self) -> Iterator[tuple[Any, Any]]:
+        if self._small is not None:
+            return iter(self._small.items())
+        return ((entry.key, entry.value) for entry in self._entries())
+
+
+class PersistentSet(Set):
+    """
+    An immutable set, backed by a PersistentMap, whose add and discard return a new set sharing all but O(log n) of
+    its nodes with this one.
+    :param items (Iterable): Items to start with
+    """
+
+    def __init__(self, items: Iterable = ()):
+        self._map: PersistentMap = PersistentMap((item, None) for item in items)
+
+    @classmethod
+    def _from_map(cls, persistent_map: PersistentMap) -> 'PersistentSet':
+        result = cls.__new__(cls)
+        result._map = persistent_map
+        return result
+
+    def add(self, item) -> 'PersistentSet':
+        return self if item in self._map else PersistentSet._from_map(self._map.set(item, None))
+
+    def discard(self, item) -> 'PersistentSet':
+        return PersistentSet._from_map(self._map.remove(item)) if item in self._map else self
+
+    def __contains__(self, item) -> bool:
+        return item in self._map
+
+    def __iter__(self) -> Iterator:
+        return iter(self._map)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __repr__(self) -> str:
+        return f'PersistentSet({list(self)!r})'
@@ -0,0 +1,170 @@
+import json
+import time
+from typing import Callable, Union
+
+
+class _TimerStats:
+    """
+    Aggregated timings of one stack of measurements. Durations go into power-of-two buckets of microseconds: bucket
+    b holds durations of less than 2 ** b microseconds and at least 2 ** (b - 1).
+    """
+    __slots__ = ('count', 'total', 'self_total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        # total minus the time spent in nested measurements
+        self.self_total: float = 0.0
+        self.min: float = float('inf')
+        self.max: float = 0.0
+        self.buckets: dict[int, int] = {}
+
+    def add(self, elapsed: float, self_elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.self_total += self_elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        bucket = int(elapsed * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+
+class _Measurement:
+    __slots__ = ('profiler', 'label', 'start')
+
+    def __init__(self, profiler: 'Profiler', label: str):
+        self.profiler: Profiler = profiler
+        self.label: str = label
+
+    def __enter__(self) -> None:
+        self.profiler._stack.append(self.label)
+        self.profiler._child_time.append(0.0)
+        self.start = self.profiler.clock()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.profiler._finish(self.profiler.clock() - self.start)
+
+
+class _NullMeasurement:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NULL_MEASUREMENT = _NullMeasurement()
+
+
+class Profiler:
+    """
+    Timers and counters for the hot paths of contexts, keyed by the stack of measurements they were taken in. Frames
+    are labelled '<context_type>.<phase>', for example 'inventory.generate', so that the same phase of different
+    kinds of context is told apart. Measurements must nest, so a profiler should not be shared between threads.
+    :param clock (Callable[[], float]): Returns the time in seconds
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock: Callable[[], float] = clock
+        self._timers: dict[tuple[str, ...], _TimerStats] = {}
+        self._counters: dict[tuple[tuple[str, ...], str], int] = {}
+        self._stack: list[str] = []
+        # time spent in measurements nested in each open measurement
+        self._child_time: list[float] = []
+
+    def measure(self, tag: str, phase: str) -> _Measurement:
+        return _Measurement(self, f'{tag}.{phase}')
+
+    def _finish(self, elapsed: float) -> None:
+        stack = tuple(self._stack)
+        self._stack.pop()
+        self_elapsed = elapsed - self._child_time.pop()
+        if self._child_time:
+            self._child_time[-1] += elapsed
+        timer = self._timers.get(stack)
+        if timer is None:
+            timer = self._timers[stack] = _TimerStats()
+        timer.add(elapsed, self_elapsed)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Adds amount to the counter name of the current stack of measurements.
+        """
+        key = (tuple(self._stack), name)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        self._timers = {}
+        self._counters = {}
+
+    def to_dict(self) -> dict[str, list[dict]]:
+        timers = []
+        for stack, timer in self._timers.items():
+            timers.append({'stack': list(stack),
+                           'count': timer.count,
+                           'total': timer.total,
+                           'self_total': timer.self_total,
+                           'mean': timer.total / timer.count,
+                           'min': timer.min,
+                           'max': timer.max,
+                           'histogram_us': {f'<{2 ** bucket}': n for bucket, n in sorted(timer.buckets.items())}})
+        counters = [{'stack': list(stack), 'name': name, 'count': n} for (stack, name), n in self._counters.items()]
+        return {'timers': timers, 'counters': counters}
+
+    def to_json(self, indent: int = None) -> str:
+        """
+        :return: Timers, in seconds with histograms in microseconds, and counters, as JSON
+        """
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_collapsed_stacks(self) -> str:
+        """
+        :return: One line per stack of measurements, its frames joined by ';' and then its self time in whole
+        microseconds, as read by flamegraph.pl and similar tools
+        """
+        lines = [f'{";".join(stack)} {round(timer.self_total * 1e6)}'
+                 for stack, timer in sorted(self._timers.items())]
+        return ''.join(f'{line}\n' for line in lines)
+
+
+_active_profiler: Union[Profiler, None] = None
+
+
+def enable_profiling(profiler: Profiler = None) -> Profiler:
+    """
+    Starts recording into profiler, or into a new Profiler.
+    :return: The profiler recording
+    """
+    global _active_profiler
+    _active_profiler = profiler if profiler is not None else Profiler()
+    return _active_profiler
+
+
+def disable_profiling() -> Union[Profiler, None]:
+    """
+    :return: The profiler that was recording, if any
+    """
+    global _active_profiler
+    profiler = _active_profiler
+    _active_profiler = None
+    return profiler
+
+
+def get_active_profiler() -> Union[Profiler, None]:
+    return _active_profiler
+
+
+def measure(tag: str, phase: str) -> Union[_Measurement, _NullMeasurement]:
+    """
+    Context manager timing phase of tag, such as a context type, if profiling is enabled, and doing nothing otherwise.
+    """
+    if _active_profiler is None:
+        return _NULL_MEASUREMENT
+    return _active_profiler.measure(tag, phase)
+
+
+def count(name: str, amount: int = 1) -> None:
+    if _active_profiler is not None:
+        _active_profiler.count(name, amount)
@@ -0,0 +1,90 @@
+import socket
+import sys
+from typing import Iterable, Union
+
+
+class OutputSink:
+    """
+    Where rendered output goes. Contexts hand a sink each whole frame in a single write, so a sink that pays per
+    write, such as a socket or a pipe, pays once per screen rather than once per line.
+    """
+
+    def write(self, text: str) -> None:
+        raise NotImplementedError
+
+
+class StdoutSink(OutputSink):
+    """
+    Writes to sys.stdout, looked up on every write so that redirecting sys.stdout is respected.
+    """
+
+    def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class MemorySink(OutputSink):
+    """
+    Keeps everything written, one entry per write, for tests and headless sessions.
+    """
+
+    def __init__(self):
+        self.writes: list[str] = []
+
+    def write(self, text: str) -> None:
+        self.writes.append(text)
+
+    def get_output(self) -> str:
+        return ''.join(self.writes)
+
+    def clear(self) -> None:
+        self.writes = []
+
+
+class SocketSink(OutputSink):
+    """
+    Sends output over a connected socket.
+    :param sock (socket.socket): The connected socket
+    :param encoding (str): Text encoding used on the wire
+    """
+
+    def __init__(self, sock: socket.socket, encoding: str = 'utf-8'):
+        self.sock: socket.socket = sock
+        self.encoding: str = encoding
+
+    def write(self, text: str) -> None:
+        self.sock.sendall(text.encode(self.encoding))
+
+
+class FrameBuffer:
+    """
+    Collects the lines of one frame so that they can be written in one go.
+    """
+
+    def __init__(self):
+        self._lines: list[str] = []
+
+    def add_line(self, line: str = '') -> None:
+        self._lines.append(line)
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        self._lines.extend(lines)
+
+    def render(self) -> str:
+        return ''.join(f'{line}\n' for line in self._lines)
+
+
+_default_sink: OutputSink = StdoutSink()
+
+
+def get_default_sink() -> OutputSink:
+    return _default_sink
+
+
+def set_default_sink(sink: Union[OutputSink, None]) -> None:
+    """
+    Sets the sink used by contexts that have no sink of their own and no ancestor with one.
+    :param sink: The new default sink, or None to go back to stdout
+    """
+    global _default_sink
+    _default_sink = sink if sink is not None else StdoutSink()
@@ -0,0 +1,112 @@
+from hashlib import blake2b
+from random import Random, SystemRandom
+from typing import Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# dice of one size are drawn this many at a time and handed out from a buffer
+_BLOCK_SIZE = 1024
+
+
+def _derive_seed(seed: int, path: tuple) -> int:
+    key = '/'.join([str(seed)] + [repr(part) for part in path])
+    return int.from_bytes(blake2b(key.encode(), digest_size=16).digest(), 'big')
+
+
+class RngStream:
+    """
+    A seeded stream of dice rolls. Streams are splittable: spawn derives a child stream from this stream's seed and
+    the child's key, by hashing, without drawing from this stream, so children are reproducible, independent of
+    each other and of how much their parent has been used. Rolling from one stream, or a tree of streams spawned
+    from it, with the same calls in the same order always gives the same results, so recording the root seed is
+    enough to replay a session.
+    :param seed (int, None): Root seed, or None to pick one at random (see get_seed)
+    :param path (tuple): Keys of the spawn calls leading from the root stream to this one
+    """
+
+    def __init__(self, seed: Union[int, None] = None, path: tuple = ()):
+        self.seed: int = SystemRandom().getrandbits(64) if seed is None else int(seed)
+        self.path: tuple = tuple(path)
+        self._random: Random = Random(_derive_seed(self.seed, self.path))
+        self._numpy_generator = None
+        self._spawn_count: int = 0
+        # die size -> (buffered rolls, position of the next unused roll)
+        self._buffers: dict[int, list] = {}
+
+    def __repr__(self) -> str:
+        return f'RngStream(seed={self.seed}, path={self.path})'
+
+    def get_seed(self) -> int:
+        return self.seed
+
+    def spawn(self, key=None):
+        """
+        :param key: Anything with a stable repr, such as an entity id. If left out, the stream counts its unkeyed
+        spawns, so repeated calls return different children.
+        :return: RngStream
+        """
+        if key is None:
+            key = ('spawn', self._spawn_count)
+            self._spawn_count += 1
+        return RngStream(self.seed, self.path + (key,))
+
+    def split(self, n: int) -> list:
+        """
+        :return: n new child streams, for example one for each worker in a process pool
+        """
+        return [self.spawn() for _ in range(n)]
+
+    def die(self, d: int) -> int:
+        """
+        :return: A roll of one d-sided die
+        """
+        buffer = self._buffers.get(d)
+        if buffer is None or buffer[1] == _BLOCK_SIZE:
+            buffer = self._buffers[d] = [self._random.choices(range(1, d + 1), k=_BLOCK_SIZE), 0]
+        buffer[1] += 1
+        return buffer[0][buffer[1] - 1]
+
+    def dice(self, d: int, count: int) -> list[int]:
+        """
+        :return: Rolls of count d-sided dice
+        """
+        if count >= _BLOCK_SIZE:
+            return self._random.choices(range(1, d + 1), k=count)
+        buffer = self._buffers.get(d)
+        if buffer is None or buffer[1] + count > _BLOCK_SIZE:
+            buffer = self._buffers[d] = [self._random.choices(range(1, d + 1), k=_BLOCK_SIZE), 0]
+        buffer[1] += count
+        return buffer[0][buffer[1] - count:buffer[1]]
+
+    def numpy_generator(self) -> 'numpy.random.Generator':
+        """
+        :return: A NumPy Generator seeded from this stream, for batch rolling. Only available if NumPy is installed.
+        """
+        if numpy is None:
+            raise ValueError('NumPy is not installed.')
+        if self._numpy_generator is None:
+            self._numpy_generator = numpy.random.default_rng(_derive_seed(self.seed, self.path + ('numpy',)))
+        return self._numpy_generator
+
+
+_session_stream: Union[RngStream, None] = None
+
+
+def start_session(seed: Union[int, None] = None) -> RngStream:
+    """
+    Replaces the session stream, which rolls use when they are not given a stream of their own. Pass the seed of a
+    recorded session to replay it.
+    :return: The new session stream
+    """
+    global _session_stream
+    _session_stream = RngStream(seed)
+    return _session_stream
+
+
+def get_session_stream() -> RngStream:
+    if _session_stream is None:
+        return start_session()
+    return _session_stream
@@ -1,5 +1,89 @@
-from random import randint
-from typing import Callable
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, NamedTuple, Union
+from engine.utils.rng import RngStream, get_session_stream, numpy
+
+
+class _Distribution(NamedTuple):
+    outcomes: tuple[int, ...]
+    probabilities: tuple[float, ...]
+    # cumulative[i] is P(result <= outcomes[i])
+    cumulative: tuple[float, ...]
+    # at_least[i] is P(result >= outcomes[i]), kept separately so that it is not computed as 1 - cumulative
+    at_least: tuple[float, ...]
+    mean: float
+    variance: float
+
+
+@lru_cache(maxsize=256)
+def _dice_sum_counts(n: int, d: int) -> tuple[int, ...]:
+    """
+    :return: Number of ways n d-sided dice can add up to each total from n to n * d
+    """
+    counts = [1]
+    for _ in range(n):
+        # convolve with one die, keeping a running sum over the last d entries
+        new_counts = []
+        window = 0
+        for total in range(len(counts) + d - 1):
+            if total < len(counts):
+                window += counts[total]
+            if total >= d:
+                window -= counts[total - d]
+            new_counts.append(window)
+        counts = new_counts
+    return tuple(counts)
+
+
+def _advantage_ways(ways: list[int], total_ways: int, adv: int) -> list[int]:
+    """
+    :param ways: Number of ways to get each of a list of results, in increasing order of result
+    :param total_ways: Number of equally likely ways to roll once
+    :return: Number of ways to get each result as the higher (adv 1) or lower (adv -1) of two rolls, out of
+    total_ways ** 2
+    """
+    # order statistics of two independent rolls: P(max <= x) = P(X <= x)^2 and P(min >= x) = P(X >= x)^2
+    at_most = [0]
+    for count in ways:
+        at_most.append(at_most[-1] + count)
+    if adv == 1:
+        return [at_most[i + 1] ** 2 - at_most[i] ** 2 for i in range(len(ways))]
+    at_least = [total_ways - below for below in at_most]
+    return [at_least[i] ** 2 - at_least[i + 1] ** 2 for i in range(len(ways))]
+
+
+def _distribution_from_ways(ways: dict[int, int], total_ways: int) -> _Distribution:
+    """
+    :param ways: Number of ways to get each result, out of total_ways equally likely ones
+    """
+    outcomes = tuple(sorted(outcome for outcome in ways if ways[outcome] > 0))
+    probabilities = tuple(ways[outcome] / total_ways for outcome in outcomes)
+    cumulative = []
+    at_least = []
+    cumulative_ways = 0
+    for outcome in outcomes:
+        at_least.append((total_ways - cumulative_ways) / total_ways)
+        cumulative_ways += ways[outcome]
+        cumulative.append(cumulative_ways / total_ways)
+    mean = sum(outcome * ways[outcome] for outcome in outcomes) / total_ways
+    variance = sum((outcome - mean) ** 2 * probability for outcome, probability in zip(outcomes, probabilities))
+    return _Distribution(outcomes, probabilities, tuple(cumulative), tuple(at_least), mean, variance)
+
+
+@lru_cache(maxsize=1024)
+def _distribution(n: int, d: int, bonus: int, adv: int, minimum: int) -> _Distribution:
+    counts = _dice_sum_counts(n, d)
+    ways = {}
+    total_ways = d ** n
+    branch_ways = counts
+    if adv != 0:
+        branch_ways = _advantage_ways(list(counts), total_ways, adv)
+        total_ways **= 2
+    for raw_total, count in enumerate(branch_ways, start=n):
+        result = raw_total + bonus if bonus >= 0 else max(raw_total + bonus, minimum)
+        ways[result] = ways.get(result, 0) + count
+    return _distribution_from_ways(ways, total_ways)
 
 
 class Roll:
@@ -47,14 +131,21 @@ class Roll:
     def grant_disadvantage(self) -> None:
         self.adv = max(self.adv - 1, -1)
 
-    def raw_roll_once(self) -> int:
-        return sum([randint(1, self.d) for _ in range(self.n)])
+    def raw_roll_once(self, rng: RngStream = None) -> int:
+        if rng is None:
+            rng = get_session_stream()
+        return sum(rng.dice(self.d, self.n))
 
-    def roll(self) -> int:
+    def roll(self, rng: RngStream = None) -> int:
+        """
+        :param rng: Stream to roll from, such as one belonging to an entity. Defaults to the session stream.
+        """
         if self.minimum_forces_constant():
             return self.min
+        if rng is None:
+            rng = get_session_stream()
 
-        raw_rolls = [self.raw_roll_once() for _ in range(abs(self.adv) + 1)]
+        raw_rolls = [self.raw_roll_once(rng) for _ in range(abs(self.adv) + 1)]
 
         def take_first(x):
             return x[0]
@@ -67,6 +158,70 @@ class Roll:
         else:
             return max(result + self.bonus, self.min)
 
+    def roll_many(self, k: int, rng: RngStream = None) -> Union[array, 'numpy.ndarray']:
+        """
+        Rolls k times at once, with the same advantage, bonus and minimum rules as roll(). All the dice are drawn in
+        one call, from NumPy when it is installed and from the stream's own generator otherwise.
+        :param k: Number of rolls
+        :param rng: Stream to roll from. Defaults to the session stream.
+        :return: The k results, as a NumPy int64 array if NumPy is installed, or an array.array('q') if not
+        """
+        k = max(0, int(k))
+        if self.minimum_forces_constant():
+            return numpy.full(k, self.min, dtype=numpy.int64) if numpy is not None else array('q', [self.min]) * k
+        branches = abs(self.adv) + 1
+        if rng is None:
+            rng = get_session_stream()
+        if numpy is not None:
+            results = rng.numpy_generator().integers(1, self.d + 1, size=(k, branches, self.n), dtype=numpy.int64).sum(axis=2)
+            results = results[:, 0] if self.adv == 0 else results.max(axis=1) if self.adv == 1 else results.min(axis=1)
+            results += self.bonus
+            return results if self.bonus >= 0 else numpy.maximum(results, self.min)
+        dice = iter(rng.dice(self.d, k * branches * self.n))
+        results = dice if self.n == 1 else map(sum, zip(*[dice] * self.n))
+        if self.adv != 0:
+            results = map(max if self.adv == 1 else min, zip(*[results] * branches))
+        if self.bonus > 0:
+            results = (result + self.bonus for result in results)
+        elif self.bonus < 0:
+            results = (max(result + self.bonus, self.min) for result in results)
+        return array('q', results)
+
+    def _get_distribution(self) -> _Distribution:
+        if self.minimum_forces_constant():
+            return _Distribution((self.min,), (1.0,), (1.0,), (1.0,), float(self.min), 0.0)
+        return _distribution(self.n, self.d, self.bonus, self.adv, self.min)
+
+    def get_pmf(self) -> dict[int, float]:
+        """
+        Exact outcome distribution of roll(), found by convolving the dice rather than by sampling. Distributions
+        are cached by (n, d, bonus, adv, minimum), so asking again for an equal roll is cheap.
+        :return: Probability of each possible result, in increasing order of result
+        """
+        distribution = self._get_distribution()
+        return dict(zip(distribution.outcomes, distribution.probabilities))
+
+    def get_cdf(self) -> dict[int, float]:
+        """
+        :return: P(result <= x) for each possible result x, in increasing order of x
+        """
+        distribution = self._get_distribution()
+        return dict(zip(distribution.outcomes, distribution.cumulative))
+
+    def get_mean(self) -> float:
+        return self._get_distribution().mean
+
+    def get_variance(self) -> float:
+        return self._get_distribution().variance
+
+    def get_probability_at_least(self, x: int) -> float:
+        """
+        :return: P(result >= x)
+        """
+        distribution = self._get_distribution()
+        i = bisect_left(distribution.outcomes, x)
+        return distribution.at_least[i] if i < len(distribution.outcomes) else 0.0
+
     def set_minimum(self, new_min: int) -> None:
         self.min = int(new_min)
 
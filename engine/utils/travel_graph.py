@@ -0,0 +1,262 @@
+import heapq
+from typing import Union
+from engine.utils.location_tree import LocationTree
+
+Route = tuple[float, list[str]]
+
+
+class TravelGraph:
+    """
+    Weighted travel connections between the lowest-level locations of a LocationTree, with shortest-route queries.
+
+    Routing is hierarchical. Connections inside a locality are summarized into distance tables, computed per source
+    location on first use. Locations with a connection leaving their locality are gateways, and routes between
+    localities are searched on the small graph of gateways alone, using the tables for the legs inside each
+    locality. Tables, the gateway graph and finished routes are cached until the connections change or a connected
+    location is removed from the tree.
+    :param location_tree (LocationTree): The tree whose lowest-level locations are connected
+    """
+
+    def __init__(self, location_tree: LocationTree):
+        self.location_tree: LocationTree = location_tree
+        # location -> {neighbour in the same locality: travel time}
+        self._local_edges: dict[str, dict[str, float]] = {}
+        # location -> {neighbour in another locality: travel time}
+        self._gateway_edges: dict[str, dict[str, float]] = {}
+        # locality global location -> gateways in that locality -> number of gateway connections touching it
+        self._gateways: dict[str, dict[str, int]] = {}
+        # locality global location -> source location -> (distances, predecessors) within the locality
+        self._tables: dict[str, dict[str, tuple[dict[str, float], dict[str, str]]]] = {}
+        # gateway -> {reachable gateway: (travel time, whether the leg stays inside one locality)}
+        self._gateway_graph: Union[dict[str, dict[str, tuple[float, bool]]], None] = None
+        self._route_cache: dict[tuple[str, str], Union[Route, None]] = {}
+        self._tree_version: int = location_tree.get_version()
+        # connected location -> its location id when connected, so a removed and re-added location is not mistaken
+        # for the original
+        self._location_ids: dict[str, int] = {}
+        # incremented whenever routes may have changed
+        self._version: int = 0
+
+    @staticmethod
+    def _locality_of(global_location: str) -> str:
+        return global_location.rsplit('_', maxsplit=1)[0]
+
+    def _sync_with_tree(self) -> None:
+        """
+        Drops the connections of locations that were removed from the tree since the last call. Only the distance
+        tables of the localities those connections were in are dropped, and routes are only invalidated if a
+        connection was dropped, so mutations of unconnected parts of the tree leave every cache in place.
+        """
+        if self._tree_version == self.location_tree.get_version():
+            return
+        self._tree_version = self.location_tree.get_version()
+        stale = {location for location, location_id in self._location_ids.items()
+                 if not self.location_tree.has_lowest_level_location(location)
+                 or self.location_tree.get_location_id(location) != location_id}
+        if not stale:
+            return
+        for edges in (self._local_edges, self._gateway_edges):
+            for location in list(edges):
+                for neighbour in list(edges[location]):
+                    if location in stale or neighbour in stale:
+                        self._remove_edge(location, neighbour)
+        for location in stale:
+            self._location_ids.pop(location)
+            self._tables.pop(self._locality_of(location), None)
+        self._invalidate_routes()
+
+    def get_version(self) -> int:
+        """
+        :return: A number that changes whenever travel times may have changed, including through the tree
+        """
+        self._sync_with_tree()
+        return self._version
+
+    def _invalidate_routes(self) -> None:
+        self._version += 1
+        self._gateway_graph = None
+        self._route_cache.clear()
+
+    def _check_location(self, global_location: str) -> None:
+        if not self.location_tree.has_lowest_level_location(global_location):
+            raise ValueError(f'Location {global_location} does not exist.')
+
+    def _add_edge(self, start: str, end: str, travel_time: float) -> None:
+        for location in (start, end):
+            self._location_ids[location] = self.location_tree.get_location_id(location)
+        if self._locality_of(start) == self._locality_of(end):
+            self._local_edges.setdefault(start, {})[end] = travel_time
+            self._tables.pop(self._locality_of(start), None)
+            return
+        if end not in self._gateway_edges.get(start, {}):
+            for location in (start, end):
+                gateways = self._gateways.setdefault(self._locality_of(location), {})
+                gateways[location] = gateways.get(location, 0) + 1
+        self._gateway_edges.setdefault(start, {})[end] = travel_time
+
+    def _remove_edge(self, start: str, end: str) -> None:
+        if self._locality_of(start) == self._locality_of(end):
+            self._local_edges[start].pop(end)
+            if not self._local_edges[start]:
+                self._local_edges.pop(start)
+            self._tables.pop(self._locality_of(start), None)
+            return
+        self._gateway_edges[start].pop(end)
+        if not self._gateway_edges[start]:
+            self._gateway_edges.pop(start)
+        for location in (start, end):
+            gateways = self._gateways[self._locality_of(location)]
+            gateways[location] -= 1
+            if gateways[location] == 0:
+                gateways.pop(location)
+
+    def connect_locations(self, start: str, end: str, travel_time: float, two_way: bool = True) -> None:
+        """
+        Connects two lowest-level locations, in the same locality or not. Reconnecting replaces the travel time.
+        :param start: Global location travelled from
+        :param end: Global location travelled to
+        :param travel_time: Positive travel time, in whatever unit the game uses
+        :param two_way: Whether to also connect end to start with the same travel time
+        """
+        self._sync_with_tree()
+        self._check_location(start.strip())
+        self._check_location(end.strip())
+        if start.strip() == end.strip():
+            raise ValueError('Cannot connect a location to itself.')
+        if travel_time <= 0:
+            raise ValueError('Travel time must be positive.')
+        self._add_edge(start.strip(), end.strip(), travel_time)
+        if two_way:
+            self._add_edge(end.strip(), start.strip(), travel_time)
+        self._invalidate_routes()
+
+    def disconnect_locations(self, start: str, end: str, two_way: bool = True) -> None:
+        self._sync_with_tree()
+        pairs = [(start.strip(), end.strip())] + ([(end.strip(), start.strip())] if two_way else [])
+        for a, b in pairs:
+            if b not in self.get_connections(a):
+                raise ValueError(f'{a} is not connected to {b}.')
+        for a, b in pairs:
+            self._remove_edge(a, b)
+        self._invalidate_routes()
+
+    def connect_localities(self, start_locality: str, end_locality: str, travel_time: float,
+                           two_way: bool = True) -> None:
+        """
+        Connects the entrypoints of two localities.
+        """
+        localities = self.location_tree.get_localities()
+        for locality in (start_locality.strip(), end_locality.strip()):
+            if locality not in localities:
+                raise ValueError(f'Locality {locality} does not exist.')
+        self.connect_locations(localities[start_locality.strip()]['entrypoint_global_location'],
+                               localities[end_locality.strip()]['entrypoint_global_location'],
+                               travel_time, two_way)
+
+    def get_connections(self, global_location: str) -> dict[str, float]:
+        self._sync_with_tree()
+        return {**self._local_edges.get(global_location, {}), **self._gateway_edges.get(global_location, {})}
+
+    def _local_table(self, source: str) -> tuple[dict[str, float], dict[str, str]]:
+        """
+        Dijkstra from source over the connections inside its locality.
+        :return: Travel time to, and predecessor of, every location reachable from source within the locality
+        """
+        tables = self._tables.setdefault(self._locality_of(source), {})
+        if source in tables:
+            return tables[source]
+        distances: dict[str, float] = {source: 0}
+        predecessors: dict[str, str] = {}
+        heap = [(0, source)]
+        while heap:
+            distance, location = heapq.heappop(heap)
+            if distance > distances[location]:
+                continue
+            for neighbour, travel_time in self._local_edges.get(location, {}).items():
+                if distance + travel_time < distances.get(neighbour, float('inf')):
+                    distances[neighbour] = distance + travel_time
+                    predecessors[neighbour] = location
+                    heapq.heappush(heap, (distance + travel_time, neighbour))
+        tables[source] = (distances, predecessors)
+        return tables[source]
+
+    def _local_legs(self, source: str) -> dict[str, tuple[float, bool]]:
+        """
+        :return: Travel time from source to each gateway of its locality
+        """
+        distances = self._local_table(source)[0]
+        return {gateway: (distances[gateway], True) for gateway in self._gateways.get(self._locality_of(source), {})
+                if gateway != source and gateway in distances}
+
+    def _get_gateway_graph(self) -> dict[str, dict[str, tuple[float, bool]]]:
+        if self._gateway_graph is None:
+            self._gateway_graph = {}
+            for gateways in self._gateways.values():
+                for gateway in gateways:
+                    legs = self._local_legs(gateway)
+                    for neighbour, travel_time in self._gateway_edges.get(gateway, {}).items():
+                        legs[neighbour] = (travel_time, False)
+                    self._gateway_graph[gateway] = legs
+        return self._gateway_graph
+
+    def _expand_local_leg(self, start: str, end: str) -> list[str]:
+        predecessors = self._local_table(start)[1]
+        path = [end]
+        while path[-1] != start:
+            path.append(predecessors[path[-1]])
+        return path[::-1]
+
+    def find_route(self, start: str, end: str) -> Union[Route, None]:
+        """
+        :param start: Global location travelled from
+        :param end: Global location travelled to
+        :return: (total travel time, global locations along the route including start and end), or None if end
+        cannot be reached from start
+        """
+        self._sync_with_tree()
+        start, end = start.strip(), end.strip()
+        self._check_location(start)
+        self._check_location(end)
+        if (start, end) in self._route_cache:
+            return self._route_cache[(start, end)]
+        if start == end:
+            return 0, [start]
+        gateway_graph = self._get_gateway_graph()
+        end_locality = self._locality_of(end)
+
+        def legs_from(location: str) -> dict[str, tuple[float, bool]]:
+            legs = dict(gateway_graph[location]) if location in gateway_graph else self._local_legs(location)
+            if self._locality_of(location) == end_locality:
+                distance = self._local_table(location)[0].get(end)
+                if distance is not None and location != end:
+                    legs[end] = (distance, True)
+            return legs
+
+        distances: dict[str, float] = {start: 0}
+        predecessors: dict[str, tuple[str, bool]] = {}
+        heap = [(0, start)]
+        while heap:
+            distance, location = heapq.heappop(heap)
+            if location == end:
+                break
+            if distance > distances[location]:
+                continue
+            for neighbour, (travel_time, local) in legs_from(location).items():
+                if distance + travel_time < distances.get(neighbour, float('inf')):
+                    distances[neighbour] = distance + travel_time
+                    predecessors[neighbour] = (location, local)
+                    heapq.heappush(heap, (distance + travel_time, neighbour))
+        if end not in distances:
+            self._route_cache[(start, end)] = None
+            return None
+        path = [end]
+        while path[-1] != start:
+            previous, local = predecessors[path[-1]]
+            path.extend(self._expand_local_leg(previous, path[-1])[-2::-1] if local else [previous])
+        route = (distances[end], path[::-1])
+        self._route_cache[(start, end)] = route
+        return route
+
+    def get_travel_time(self, start: str, end: str) -> Union[float, None]:
+        route = self.find_route(start, end)
+        return route[0] if route is not None else None
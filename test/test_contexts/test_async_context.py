@@ -0,0 +1,75 @@
+import asyncio
+from engine.contexts.context import Context
+from engine.contexts.popup_context import PopupContext
+from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.line_source import InputSource, QueueLineSource, run_sync_context
+from engine.utils.render import MemorySink
+
+
+class NestingContext(Context):
+
+    def __init__(self, parent_context: Context = None, legacy: bool = False):
+        super().__init__(parent_context=parent_context, context_type='nesting', context_data={'names': []})
+        self.legacy = legacy
+
+    def _generate_choice_handling(self) -> ChoiceHandler:
+        choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
+
+        def popup_executor(curr_context: Context, parent_context: Context) -> bool:
+            popup_context = PopupContext(parent_context=curr_context, display_text='A popup.')
+            if curr_context.legacy:
+                popup_context.enter()
+                return False
+            return curr_context.enter_child(popup_context)
+
+        async def name_executor(curr_context: Context, parent_context: Context) -> bool:
+            curr_context.context_data['names'].append(await curr_context.prompt_async('Name?'))
+            return False
+
+        choice_handler.add_choice(executor=popup_executor, display_text='Popup')
+        choice_handler.add_choice(executor=name_executor, display_text='Name')
+        return choice_handler
+
+
+def test_enter_async_hosts_many_sessions():
+    async def main():
+        sessions = []
+        for n in range(50):
+            line_source = QueueLineSource()
+            context = NestingContext()
+            context.set_output_sink(MemorySink())
+            sessions.append((line_source, context, asyncio.create_task(context.enter_async(line_source))))
+        await asyncio.sleep(0)
+        for n, (line_source, context, task) in enumerate(sessions):
+            for line in ['1', '', '2', f'player {n}', 'b']:
+                line_source.feed(line)
+        results = await asyncio.gather(*(task for _, _, task in sessions))
+        assert results == [False] * 50
+        for n, (_, context, _) in enumerate(sessions):
+            assert context.context_data['names'] == [f'player {n}']
+            assert 'A popup.' in context.get_output_sink().get_output()
+
+    asyncio.run(main())
+
+
+def test_sync_loop_runs_async_executors_and_legacy_contexts_through_adapter():
+    context = NestingContext(legacy=True)
+    context.set_output_sink(MemorySink())
+    lines = iter(['2', 'bob', '1', '', 'b'])
+
+    class ListSource(InputSource):
+        def read_line(self) -> str:
+            return next(lines)
+
+    context.set_input_source(ListSource())
+    assert context.enter() is False
+    assert context.context_data['names'] == ['bob']
+
+    async def main():
+        line_source = QueueLineSource()
+        for line in ['1', '', '2', 'alice', 'b']:
+            line_source.feed(line)
+        return await run_sync_context(context, line_source)
+
+    assert asyncio.run(main()) is False
+    assert context.context_data['names'] == ['bob', 'alice']
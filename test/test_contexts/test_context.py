@@ -0,0 +1,58 @@
+import builtins
+from engine.contexts.context import Context
+from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.render import MemorySink
+
+
+class CountingContext(Context):
+
+    def __init__(self):
+        super().__init__(parent_context=None, context_type='counting', context_data={'state': 0})
+        self.generated = 0
+
+    def get_state_fingerprint(self) -> int:
+        return self.context_data['state']
+
+    def _generate_choice_handling(self) -> ChoiceHandler:
+        self.generated += 1
+        choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
+
+        def bump_state(curr_context: Context, parent_context: Context) -> bool:
+            curr_context.context_data['state'] += 1
+            return False
+
+        def invalidate(curr_context: Context, parent_context: Context) -> bool:
+            curr_context.invalidate_choices()
+            return False
+
+        def wait(curr_context: Context, parent_context: Context) -> bool:
+            return False
+
+        choice_handler.add_choice(executor=bump_state, display_text='Bump state')
+        choice_handler.add_choice(executor=invalidate, display_text='Invalidate')
+        choice_handler.add_choice(executor=wait, display_text='Wait')
+        return choice_handler
+
+
+def test_choice_handler_reused_until_state_changes(monkeypatch, capsys):
+    inputs = iter(['3', '3', 'x', '1', '3', '2', 'b'])
+    monkeypatch.setattr(builtins, 'input', lambda *args: next(inputs))
+    context = CountingContext()
+    assert context.enter() is False
+    # built once on entry, then again only after the state change and the invalidation
+    assert context.generated == 3
+
+
+def test_each_frame_is_one_write(monkeypatch):
+    inputs = iter(['x', '3', 'b'])
+    monkeypatch.setattr(builtins, 'input', lambda *args: next(inputs))
+    memory_sink = MemorySink()
+    context = CountingContext()
+    context.entry_text = 'Counting.'
+    context.set_output_sink(memory_sink)
+    context.enter()
+    frame = 'Counting.\n\n\n\n1: Bump state\n2: Invalidate\n3: Wait\nb: Back\n'
+    assert memory_sink.writes == [frame, 'Input not recognized.\n', frame]
+    child = Context(parent_context=context, context_type='child', context_data={})
+    child.output('Hello')
+    assert memory_sink.writes[-1] == 'Hello\n'
@@ -0,0 +1,67 @@
+from engine.contexts.context import Context
+from engine.contexts.context_stack import ContextStack, Pop
+from engine.utils.choice_handler import ChoiceHandler
+from engine.utils.render import MemorySink
+
+
+class MenuContext(Context):
+
+    def __init__(self, parent_context: Context = None, depth: int = 0):
+        super().__init__(parent_context=parent_context, context_type='menu', context_data={'depth': depth})
+        self.entry_text = f'Depth {depth}'
+
+    def get_state_fingerprint(self) -> int:
+        return self.context_data['depth']
+
+    def _generate_choice_handling(self) -> ChoiceHandler:
+        choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
+
+        def deeper_executor(curr_context: MenuContext, parent_context: Context) -> bool:
+            return curr_context.enter_child(MenuContext(parent_context=curr_context,
+                                                        depth=curr_context.context_data['depth'] + 1))
+
+        def sideways_executor(curr_context: MenuContext, parent_context: Context) -> bool:
+            return curr_context.enter_child(MenuContext(parent_context=parent_context,
+                                                        depth=curr_context.context_data['depth']), result=True)
+
+        def quit_executor(curr_context: MenuContext, parent_context: Context) -> Pop:
+            return Pop()
+
+        choice_handler.add_choice(executor=deeper_executor, display_text='Deeper')
+        choice_handler.add_choice(executor=sideways_executor, display_text='Sideways')
+        choice_handler.add_choice(executor=quit_executor, display_text='Quit')
+        return choice_handler
+
+
+def test_deep_navigation_does_not_recurse():
+    root = MenuContext()
+    root.set_output_sink(MemorySink())
+    stack = ContextStack(root)
+    for _ in range(5000):
+        stack.feed('1')
+    assert len(stack) == 5001
+    assert stack.get_top().context_data['depth'] == 5000
+    stack.feed('2')
+    assert len(stack) == 5001
+    assert stack.feed('b')
+    assert stack.get_top().context_data['depth'] == 4999
+
+
+def test_snapshot_and_restore():
+    root = MenuContext()
+    root.set_output_sink(MemorySink())
+    stack = ContextStack(root)
+    stack.feed('1')
+    stack.feed('1')
+    memory_sink = MemorySink()
+    restored = ContextStack.restore(stack.snapshot(), output_sink=memory_sink)
+    assert [context.context_data['depth'] for context in restored.get_contexts()] == [0, 1, 2]
+    restored.feed('b')
+    assert memory_sink.writes[0].startswith('Depth 2')
+    assert memory_sink.writes[-1].startswith('Depth 1') is False
+    restored.render()
+    assert memory_sink.writes[-1].startswith('Depth 1')
+    restored.feed('3')
+    assert not restored.feed('b')
+    # the original session is unaffected
+    assert len(stack) == 3
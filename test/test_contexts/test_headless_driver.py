@@ -0,0 +1,35 @@
+from engine.contexts.headless_driver import HeadlessDriver, SessionStats
+from engine.utils import profiling
+from test.test_contexts.test_context_stack import MenuContext
+
+
+def test_run_script_captures_output_and_times_each_interaction():
+    driver = HeadlessDriver(MenuContext())
+    stats = driver.run_script(['1', '1', 'x', 'b', '3', '3', 'never read'])
+    assert stats.get_interaction_count() == 6
+    output = driver.get_output()
+    assert output.startswith('Depth 0')
+    assert 'Depth 2' in output
+    assert output.count('Input not recognized.') == 1
+    assert stats.get_interactions_per_second() > 0
+
+
+def test_latency_percentiles():
+    stats = SessionStats([0.004, 0.001, 0.003, 0.002], elapsed=0.01)
+    assert stats.get_latency_percentile(50) == 0.002
+    assert stats.get_latency_percentile(100) == 0.004
+    assert stats.get_latency_percentile(0) == 0.001
+    assert stats.summary()['interactions_per_second'] == 400
+
+
+def test_profiled_session():
+    profiler = profiling.enable_profiling()
+    try:
+        HeadlessDriver(MenuContext()).run_script(['1', 'b', 'b'])
+    finally:
+        profiling.disable_profiling()
+    stacks = profiler.to_collapsed_stacks()
+    assert 'menu.render;menu.generate;' not in stacks
+    assert 'menu.render;menu.generate ' in stacks
+    assert 'menu.render;ChoiceHandler.get_choice_lines ' in stacks
+    assert 'menu.dispatch;menu.executor ' in stacks
@@ -0,0 +1,71 @@
+import json
+import os
+import pytest
+from engine.utils.binary_world import BinaryWorldFormatError, open_binary_world, write_binary_world
+from engine.utils.location_tree import map_from_json
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def test_binary_world_round_trip(tmp_path):
+    with open(SAMPLE_MAP_PATH) as f:
+        map_json = json.load(f)
+    location_tree = map_from_json(map_json)
+    path = str(tmp_path / 'sample.world')
+    write_binary_world(location_tree, path)
+    with open_binary_world(path) as world:
+        assert world.export_world_map() == map_json
+        assert world.get_region_names_and_display_names() == location_tree.get_region_names_and_display_names()
+        assert world.get_localities() == location_tree.get_localities()
+        assert world.get_lowest_level_locations() == location_tree.get_lowest_level_locations()
+        assert world.get_locality('eastmarch_darkpass') == location_tree.get_localities()['eastmarch_darkpass']
+        assert world.get_location_display_name('eastmarch_bridgefort_square') == 'Town Square'
+        assert world.has_lowest_level_location('eastmarch_darkpass_deadgully')
+        assert not world.has_lowest_level_location('eastmarch_darkpass_square')
+        assert not world.has_locality('nowhere_darkpass')
+        assert world.get_version() == 0
+        for region in location_tree.get_region_names():
+            region_id = world.get_location_id(region)
+            assert world.get_parent_id(region_id) == -1
+            assert world.get_display_name_by_id(region_id) == location_tree.get_region_display_name(region)
+            locality_ids = world.get_child_ids(region_id)
+            assert [world.get_global_location(i) for i in locality_ids] == \
+                   location_tree.get_localities_in_region(region)
+            for locality_id in locality_ids:
+                locality = world.get_global_location(locality_id)
+                assert world.get_parent_id(locality_id) == region_id
+                assert world.get_global_location(world.get_entrypoint_id(locality_id)) == \
+                       location_tree.get_localities()[locality]['entrypoint_global_location']
+                location_ids = world.get_child_ids(locality_id)
+                assert [[world.get_global_location(i), world.get_display_name_by_id(i)] for i in location_ids] == \
+                       location_tree.get_locations_in_locality(locality)
+                assert all(world.get_parent_id(i) == locality_id for i in location_ids)
+                assert world.get_location_id(world.get_global_location(location_ids[-1])) == location_ids[-1]
+        with pytest.raises(ValueError):
+            world.get_location_id('eastmarch_darkpass_square')
+
+
+def test_binary_world_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a_world'
+    path.write_bytes(b'{"world_name": "Mundus", "regions": {}}')
+    with pytest.raises(BinaryWorldFormatError):
+        open_binary_world(str(path))
+
+
+def test_binary_world_closes_truncated_files(tmp_path, monkeypatch):
+    with open(SAMPLE_MAP_PATH) as f:
+        location_tree = map_from_json(json.load(f))
+    path = tmp_path / 'sample.world'
+    write_binary_world(location_tree, str(path))
+    path.write_bytes(path.read_bytes()[:-8])
+    opened_files = []
+    real_open = open
+
+    def recording_open(*args, **kwargs):
+        opened_files.append(real_open(*args, **kwargs))
+        return opened_files[-1]
+
+    monkeypatch.setattr('builtins.open', recording_open)
+    with pytest.raises(BinaryWorldFormatError):
+        open_binary_world(str(path))
+    assert opened_files and all(f.closed for f in opened_files)
@@ -0,0 +1,66 @@
+import pytest
+from engine.utils.choice_handler import ChoiceHandler
+
+
+def make_paged_handler(made: list[int]) -> ChoiceHandler:
+    def make_executor(i: int):
+        made.append(i)
+        return lambda curr_context, parent_context: i
+
+    choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')], page_size=3)
+    choice_handler.add_choice(executor=lambda *args: 'first', display_text='First')
+    choice_handler.add_choice(executor=lambda *args: 'all', display_text='All', choice_letter='a')
+    choice_handler.add_lazy_choices(items=iter(range(100_000)), display_text=lambda i: f'Item {i}',
+                                    make_executor=make_executor)
+    return choice_handler
+
+
+def test_paged_handler_prints_one_page(capsys):
+    choice_handler = make_paged_handler([])
+    choice_handler.print_choices()
+    assert capsys.readouterr().out == '1: First\n2: Item 0\n3: Item 1\na: All\nn: Next page\nb: Back\n'
+    assert not choice_handler.has_choice('p')
+    choice_handler.get_executor('n')(None, None)
+    choice_handler.print_choices()
+    assert capsys.readouterr().out == '4: Item 2\n5: Item 3\n6: Item 4\na: All\nn: Next page\np: Previous page\nb: Back\n'
+
+
+def test_lazy_choices_resolve_on_demand():
+    made = []
+    choice_handler = make_paged_handler(made)
+    assert choice_handler.has_choice('1') and choice_handler.get_executor('1')() == 'first'
+    assert choice_handler.get_executor('502')(None, None) == 500
+    assert made == [500]
+    assert not choice_handler.has_choice('100002')
+    with pytest.raises(ValueError):
+        choice_handler.add_choice(executor=print, display_text='Late')
+
+
+def test_duplicate_display_texts_rejected():
+    choice_handler = ChoiceHandler()
+    choice_handler.add_lazy_choices(items=['Sword', 'Shield', 'Sword'], display_text=str, make_executor=print)
+    assert choice_handler.has_choice('2')
+    with pytest.raises(ValueError):
+        choice_handler.has_choice('3')
+    with pytest.raises(ValueError):
+        ChoiceHandler(reserved_choices=[('n', 'Back')], page_size=10)
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_only_canonical_numbers_are_choices(lazy):
+    choice_handler = ChoiceHandler(reserved_choices=[('b', 'Back')])
+    choice_handler.add_choice(executor=lambda *args: 'first', display_text='First')
+    choice_handler.add_choice(executor=lambda *args: 'second', display_text='Second')
+    if lazy:
+        choice_handler.add_lazy_choices(items=range(3), display_text=lambda i: f'Item {i}',
+                                        make_executor=lambda i: lambda *args: i)
+    for choice in ('01', '002', '0', '١', '٢', '²', '+1', ' 1', '-1'):
+        assert not choice_handler.has_choice(choice)
+        with pytest.raises(ValueError):
+            choice_handler.get_executor(choice)
+    assert choice_handler.get_executor('1')() == 'first'
+    assert choice_handler.get_executor('2')() == 'second'
+    if lazy:
+        assert choice_handler.get_executor('3')() == 0
+        assert choice_handler.get_executor('5')() == 2
+        assert not choice_handler.has_choice('6')
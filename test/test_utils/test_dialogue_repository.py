@@ -0,0 +1,52 @@
+import pytest
+from engine.utils.dialogue_repository import DialogueBundleFormatError, DialogueRepository, write_dialogue_bundle
+from engine.utils.dialogue_tree import DialogueGraph, DialogueTree
+
+
+def make_dialogues() -> dict[str, DialogueTree]:
+    innkeeper = DialogueTree('What will it be?')
+    innkeeper.add_node('room', 'A room, please.', 'Five silver.')
+    innkeeper.add_node('pay', 'Here you go.', 'Upstairs, first door.', from_node='room')
+    merchant = DialogueGraph('Finest goods in Bridgefort!')
+    merchant.add_node('wares', 'Show me your wares.', 'Take a look.')
+    merchant.add_node('rumours', 'Heard anything?', 'Bandits on the road.')
+    merchant.add_link('wares', from_node='rumours')
+    guards = {f'guard{i}': DialogueTree(f'Move along, citizen {i}.') for i in range(3)}
+    return {'innkeeper': innkeeper, 'merchant': merchant, **guards}
+
+
+def test_dialogues_load_lazily_and_round_trip(tmp_path):
+    dialogues = make_dialogues()
+    path = str(tmp_path / 'dialogue.bundle')
+    write_dialogue_bundle(dialogues, path)
+    with DialogueRepository(path, capacity=2) as repository:
+        assert len(repository) == 5
+        assert repository.get_loaded_npc_ids() == []
+        innkeeper = repository.get_dialogue('innkeeper')
+        assert innkeeper.export_dialogue() == dialogues['innkeeper'].export_dialogue()
+        assert repository.get_dialogue('innkeeper') is innkeeper
+        merchant = repository.get_dialogue('merchant')
+        assert merchant.export_links() == {'rumours': ['wares']}
+        repository.get_dialogue('guard0')
+        assert repository.get_loaded_npc_ids() == ['merchant', 'guard0']
+        with pytest.raises(ValueError):
+            repository.get_dialogue('dragon')
+
+
+def test_triggers_survive_eviction(tmp_path):
+    path = str(tmp_path / 'dialogue.bundle')
+    write_dialogue_bundle(make_dialogues(), path)
+    fired = []
+    with DialogueRepository(path, capacity=1) as repository:
+        repository.register_trigger('innkeeper', 'room_pay', lambda context_data: fired.append('paid'))
+        repository.get_dialogue('merchant').add_or_replace_trigger('wares', lambda context_data: fired.append('shop'))
+        repository.get_dialogue('innkeeper').get_action('room_pay')({})
+        repository.get_dialogue('merchant').get_action('wares')({})
+        assert fired == ['paid', 'shop']
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a.bundle'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(DialogueBundleFormatError):
+        DialogueRepository(str(path))
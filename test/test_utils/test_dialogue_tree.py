@@ -0,0 +1,65 @@
+import pytest
+from engine.utils.dialogue_tree import DialogueGraph, DialogueTree
+
+
+def make_tree() -> DialogueTree:
+    dialogue_tree = DialogueTree('Well met.')
+    dialogue_tree.add_node('job', 'Any work?', 'Rats in the cellar.')
+    dialogue_tree.add_node('jobs', 'Any other jobs?', 'No.')
+    dialogue_tree.add_node('accept', 'I will do it.', 'Good.', from_node='job')
+    dialogue_tree.add_node('reward', 'What does it pay?', 'Ten gold.', from_node='job')
+    dialogue_tree.add_node('haggle', 'Make it twenty.', 'Fifteen.', from_node='job_reward')
+    return dialogue_tree
+
+
+def test_available_nodes_follow_children():
+    dialogue_tree = make_tree()
+    assert dialogue_tree.get_available_nodes() == ['job', 'jobs']
+    dialogue_tree.update_current_node('job')
+    assert dialogue_tree.get_available_nodes() == ['job_accept', 'job_reward']
+    dialogue_tree.replace_node('reward', 'How much?', 'Ten gold.', from_node='job')
+    assert dialogue_tree.get_available_nodes() == ['job_accept', 'job_reward']
+    dialogue_tree.update_current_node('job_accept')
+    assert dialogue_tree.is_at_terminal_node()
+
+
+def test_cut_branch_keeps_siblings_sharing_a_prefix():
+    dialogue_tree = make_tree()
+    dialogue_tree.add_or_replace_trigger('job_reward_haggle', print)
+    dialogue_tree.cut_branch('job')
+    assert dialogue_tree.export_dialogue() == {'jobs': ('Any other jobs?', 'No.')}
+    assert dialogue_tree.dialogue_action_triggers == {}
+    assert dialogue_tree.get_available_nodes() == ['jobs']
+    dialogue_tree.add_node('job', 'Any work?', 'Not any more.')
+    assert dialogue_tree.get_available_nodes() == ['jobs', 'job']
+
+
+def test_child_added_before_its_parent_stays_available():
+    dialogue_tree = DialogueTree('Rooms are five gold a night.')
+    dialogue_tree.add_node('pay', 'Here you go.', 'Enjoy your stay.', from_node='room')
+    dialogue_tree.add_node('room', 'I need a room.', 'Five gold, then.')
+    dialogue_tree.update_current_node('room')
+    assert dialogue_tree.get_available_nodes() == ['room_pay']
+
+
+def test_dialogue_graph_shares_linked_nodes():
+    dialogue_graph = DialogueGraph('Welcome to my shop.')
+    dialogue_graph.add_node('wares', 'Show me your wares.', 'Take a look.')
+    dialogue_graph.add_node('buy', 'I will buy this.', 'Pleasure doing business.', from_node='wares')
+    dialogue_graph.add_node('rumours', 'Heard anything?', 'Bandits on the road.')
+    dialogue_graph.add_link('wares', from_node='rumours')
+    # a link back to an earlier node makes a cycle
+    dialogue_graph.add_link('rumours', from_node='wares_buy')
+    dialogue_graph.update_current_node('rumours')
+    assert dialogue_graph.get_available_nodes() == ['wares']
+    dialogue_graph.update_current_node('wares')
+    assert dialogue_graph.get_available_nodes() == ['wares_buy']
+    assert dialogue_graph.get_reachable_nodes() == ['wares', 'rumours', 'wares_buy']
+    assert dialogue_graph.export_links() == {'rumours': ['wares'], 'wares_buy': ['rumours']}
+    with pytest.raises(ValueError):
+        dialogue_graph.add_link('wares', from_node='rumours')
+    dialogue_graph.cut_branch('wares')
+    assert list(dialogue_graph.export_dialogue()) == ['rumours']
+    assert dialogue_graph.export_links() == {}
+    dialogue_graph.update_current_node('rumours')
+    assert dialogue_graph.is_at_terminal_node()
@@ -0,0 +1,64 @@
+import pytest
+from engine.objects.equipment import Weapon
+from engine.utils.dice_expression import compile_dice_expression
+from engine.utils.roll import Roll
+
+
+def test_compile_and_display():
+    assert compile_dice_expression('2d6 + 1d4 + 3').get_display_text() == '2d6+1d4+3'
+    assert compile_dice_expression('4d6 drop lowest').get_display_text() == '4d6 drop lowest'
+    assert compile_dice_expression('5d10kh3-d4').get_display_text() == '5d10 drop lowest 2 - 1d4'
+    assert compile_dice_expression('1d4-2 (min. 1)').get_display_text() == '1d4-2 (min. 1)'
+    assert compile_dice_expression('2d6+3') is compile_dice_expression('2d6+3')
+    for bad_expression in ('', '2d6 3', '1d1', '2d6 drop lowest 2', '2d6+x'):
+        with pytest.raises(ValueError):
+            compile_dice_expression(bad_expression)
+
+
+def test_roll_and_roll_many_bounds():
+    plan = compile_dice_expression('4d6 drop lowest+1d4-1')
+    assert all(3 <= plan.roll() <= 21 for _ in range(500))
+    results = plan.roll_many(5000)
+    assert len(results) == 5000
+    assert min(results) >= 3 and max(results) <= 21
+    assert set(compile_dice_expression('1d4-3 (min. 1)').roll_many(500)) == {1}
+    assert set(compile_dice_expression('2d2 drop highest').roll_many(500)) == {1, 2}
+
+
+def test_weapon_accepts_expression_strings():
+    weapon = Weapon(item_id='greatsword', display_name='Greatsword', damage_roll='2d6+1d4', damage_type='slashing')
+    damage_roll = weapon.get_damage_roll()
+    assert damage_roll is not compile_dice_expression('2d6+1d4')
+    damage_roll.add_bonus(2)
+    damage_roll.grant_advantage()
+    assert damage_roll.get_display_text() == '2d6+1d4+2 with advantage'
+    assert weapon.get_damage_roll().get_display_text() == '2d6+1d4'
+    assert 'Damage: 2d6+1d4\n' in weapon.get_description_for_display()
+
+
+def test_expression_distribution_matches_roll():
+    assert compile_dice_expression('2d6+3').get_pmf() == Roll(n=2, d=6, bonus=3).get_pmf()
+    assert compile_dice_expression('1d20').copy().get_mean() == Roll(d=20).get_mean()
+    advantage = compile_dice_expression('1d20').copy()
+    advantage.grant_advantage()
+    assert advantage.get_pmf() == Roll(d=20, adv=1).get_pmf()
+    drop_lowest = compile_dice_expression('4d6 drop lowest')
+    assert drop_lowest.get_probability_at_least(18) == 21 / 1296
+    assert abs(drop_lowest.get_mean() - 15869 / 1296) < 1e-9
+    assert compile_dice_expression('1d4-2 (min. 1)').get_pmf() == {1: 3 / 4, 2: 1 / 4}
+    mixed = compile_dice_expression('1d6-1d4').get_pmf()
+    assert min(mixed) == -3 and max(mixed) == 5 and abs(sum(mixed.values()) - 1) < 1e-9
+
+
+def test_expression_mutators_change_the_first_dice_term():
+    plan = compile_dice_expression('4d6 drop lowest+1d4')
+    expression = plan.copy()
+    expression.add_dice(1)
+    expression.set_die_size(8)
+    expression.set_minimum(5)
+    assert expression.get_display_text() == '5d8 drop lowest 2 + 1d4 (min. 5)'
+    assert plan.get_display_text() == '4d6 drop lowest + 1d4'
+    results = expression.roll_many(500)
+    assert min(results) >= 5 and max(results) <= 28
+    with pytest.raises(ValueError):
+        compile_dice_expression('3').copy().add_dice(1)
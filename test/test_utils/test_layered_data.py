@@ -0,0 +1,64 @@
+import pickle
+import pytest
+from engine.utils.layered_data import LayeredDict
+
+
+def test_overlay_reads_writes_and_deletes():
+    base = {'scope': 'top', 'player': 'bob', 'gold': 10}
+    layer = LayeredDict(base, {'scope': 'equipment'})
+    assert layer['scope'] == 'equipment'
+    assert layer['player'] == 'bob'
+    del layer['gold']
+    layer['new'] = 1
+    assert 'gold' not in layer
+    assert list(layer) == ['scope', 'player', 'new']
+    assert layer.to_dict() == {'scope': 'equipment', 'player': 'bob', 'new': 1}
+    assert base == {'scope': 'top', 'player': 'bob', 'gold': 10}
+    with pytest.raises(KeyError):
+        del layer['gold']
+
+
+def test_nested_values_are_copied_on_write():
+    base = {'required_tags': {'Apparel': ['light']}, 'forbidden_tags': {}}
+    layer = LayeredDict(base)
+    layer['required_tags']['Apparel'].append('heavy')
+    layer['required_tags']['Weapon'] = ['sword']
+    layer['forbidden_tags']['Apparel'] = ['cursed']
+    assert base == {'required_tags': {'Apparel': ['light']}, 'forbidden_tags': {}}
+    assert layer.to_dict() == {'required_tags': {'Apparel': ['light', 'heavy'], 'Weapon': ['sword']},
+                               'forbidden_tags': {'Apparel': ['cursed']}}
+    assert layer.get('forbidden_tags', {}).get('Weapon', []) == []
+
+
+def test_deriving_freezes_the_parent_layer():
+    top = LayeredDict({'scope': 'top', 'required_tags': {'Apparel': ['light']}})
+    child = top.derive({'scope': 'storage-top'})
+    grandchild = LayeredDict(child, {'scope': 'storage: All'})
+    assert top.is_frozen() and child.is_frozen() and not grandchild.is_frozen()
+    with pytest.raises(ValueError):
+        top['scope'] = 'equipment'
+    grandchild['required_tags']['Apparel'].append('heavy')
+    assert child['required_tags']['Apparel'] == ['light']
+    assert [layer['scope'] for layer in (top, child, grandchild)] == ['top', 'storage-top', 'storage: All']
+    restored = pickle.loads(pickle.dumps(grandchild))
+    assert restored == grandchild
+
+
+def test_reads_through_frozen_layers_do_not_change_anything():
+    base = {'scope': 'top', 'required_tags': {'Weapons': ['sharp']}}
+    top = LayeredDict(base, {'forbidden_tags': {'Apparel': ['cursed']}})
+    first = top.derive({'scope': 'equipment'})
+    second = top.derive({'scope': 'storage-top'})
+    top['required_tags']['Weapons'].append('LEAK')
+    top['forbidden_tags']['Apparel'].append('LEAK')
+    with pytest.raises(ValueError):
+        top['required_tags']['Weapons'] = ['LEAK']
+    first['required_tags']['Weapons'].append('first')
+    first['forbidden_tags']['Apparel'].append('first')
+    assert base == {'scope': 'top', 'required_tags': {'Weapons': ['sharp']}}
+    assert top.to_dict() == {'scope': 'top', 'required_tags': {'Weapons': ['sharp']},
+                             'forbidden_tags': {'Apparel': ['cursed']}}
+    assert second.to_dict() == {'scope': 'storage-top', 'required_tags': {'Weapons': ['sharp']},
+                                'forbidden_tags': {'Apparel': ['cursed']}}
+    assert first['required_tags']['Weapons'] == ['sharp', 'first']
+    assert first['forbidden_tags']['Apparel'] == ['cursed', 'first']
@@ -0,0 +1,67 @@
+import pytest
+from engine.utils.location_tree import LocationTree
+
+
+def make_tree() -> LocationTree:
+    location_tree = LocationTree(world_display_name='Mundus',
+                                 first_region_display_name='Eastmarch',
+                                 first_region_name='eastmarch',
+                                 first_locality_display_name='Bridgefort',
+                                 first_locality_name='bridgefort',
+                                 first_locality_entrypoint_display_name='Bridgefort Gates',
+                                 first_locality_entrypoint_name='gates')
+    location_tree.add_lowest_level_location(global_location='eastmarch_bridgefort_keep', display_name='Bridgefort Keep')
+    location_tree.add_locality(locality_global_location='eastmarch_woodshire',
+                               locality_display_name='Woodshire',
+                               entrypoint_name='fields',
+                               entrypoint_display_name='Woodshire Fields')
+    return location_tree
+
+
+def test_location_ids_follow_hierarchy():
+    location_tree = make_tree()
+    region_id = location_tree.get_location_id('eastmarch')
+    locality_id = location_tree.get_location_id('eastmarch_bridgefort')
+    keep_id = location_tree.get_location_id('eastmarch_bridgefort_keep')
+    assert location_tree.get_parent_id(keep_id) == locality_id
+    assert location_tree.get_parent_id(locality_id) == region_id
+    assert location_tree.get_parent_id(region_id) == -1
+    assert [location_tree.get_global_location(i) for i in location_tree.get_child_ids(region_id)] == \
+           ['eastmarch_bridgefort', 'eastmarch_woodshire']
+    assert location_tree.get_global_location(location_tree.get_entrypoint_id(locality_id)) == 'eastmarch_bridgefort_gates'
+    assert location_tree.get_display_name_by_id(keep_id) == 'Bridgefort Keep'
+    assert location_tree.location_ids.get_region_id(keep_id) == region_id
+
+
+def test_location_ids_removed_with_subtree():
+    location_tree = make_tree()
+    locality_id = location_tree.get_location_id('eastmarch_bridgefort')
+    keep_id = location_tree.get_location_id('eastmarch_bridgefort_keep')
+    location_tree.remove_locality('eastmarch_bridgefort')
+    with pytest.raises(ValueError):
+        location_tree.get_global_location(keep_id)
+    assert location_tree.get_child_ids(location_tree.get_location_id('eastmarch')) == \
+           [location_tree.get_location_id('eastmarch_woodshire')]
+    location_tree.add_locality(locality_global_location='eastmarch_bridgefort',
+                               locality_display_name='Bridgefort',
+                               entrypoint_name='gates',
+                               entrypoint_display_name='Bridgefort Gates')
+    assert location_tree.get_location_id('eastmarch_bridgefort') != locality_id
+
+
+def test_register_many_registers_all_or_none():
+    location_ids = make_tree().location_ids
+    n_registered = len(location_ids)
+    with pytest.raises(ValueError):
+        location_ids.register_many([('westreach', None), ('westreach_markarth', 'westreach'),
+                                    ('westreach_markarth_gates', 'westreach_markarth'),
+                                    ('eastmarch_bridgefort_keep', 'eastmarch_bridgefort')])
+    assert len(location_ids) == n_registered
+    assert 'westreach' not in location_ids
+    assert location_ids.get_child_ids(location_ids.get_id('eastmarch')) == \
+           [location_ids.get_id('eastmarch_bridgefort'), location_ids.get_id('eastmarch_woodshire')]
+    location_ids.register_many([('westreach', None), ('westreach_markarth', 'westreach'),
+                                ('westreach_markarth_gates', 'westreach_markarth')])
+    gates_id = location_ids.get_id('westreach_markarth_gates')
+    assert location_ids.get_level(gates_id) == 3
+    assert location_ids.get_global_location(location_ids.get_region_id(gates_id)) == 'westreach'
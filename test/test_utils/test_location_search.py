@@ -0,0 +1,55 @@
+import json
+import os
+from engine.utils.location_search import LocationSearchIndex
+from engine.utils.location_tree import map_from_json
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def make_index() -> LocationSearchIndex:
+    with open(SAMPLE_MAP_PATH) as f:
+        return LocationSearchIndex(map_from_json(json.load(f)))
+
+
+def test_prefix_search_matches_word_starts():
+    search_index = make_index()
+    assert search_index.search_prefix('bridge') == ['eastmarch_bridgefort', 'eastmarch_bridgefort_gates']
+    assert search_index.search_prefix('  GATES') == ['eastmarch_bridgefort_gates', 'westmarch_woodshire_gates',
+                                                     'westmarch_castlebragg_gates']
+    assert search_index.search_prefix('town', k=1) == ['westmarch_woodshire_townhall']
+    assert search_index.search_prefix('nowhere') == []
+
+
+def test_fuzzy_search_tolerates_typos():
+    search_index = make_index()
+    assert search_index.search_fuzzy('Castel Brag') == ['westmarch_castlebragg']
+    assert search_index.search('dead guly', k=1) == ['eastmarch_darkpass_deadgully']
+
+
+def test_index_follows_tree_mutations():
+    search_index = make_index()
+    location_tree = search_index.location_tree
+    location_tree.add_lowest_level_location('eastmarch_bridgefort_smithy', 'Old Forge')
+    assert search_index.search_prefix('forge') == ['eastmarch_bridgefort_smithy']
+    location_tree.change_display_name('eastmarch_bridgefort_smithy', 'Smithy')
+    assert search_index.search_prefix('forge') == []
+    assert search_index.search_prefix('smi') == ['eastmarch_bridgefort_smithy']
+    location_tree.remove_region('westmarch')
+    assert search_index.search_prefix('castle') == []
+    assert len(search_index) == 8
+    search_index.close()
+    location_tree.add_lowest_level_location('eastmarch_bridgefort_inn', 'Inn')
+    assert search_index.search_prefix('inn') == []
+
+
+def test_burst_trie_agrees_with_scan():
+    search_index = make_index()
+    location_tree = search_index.location_tree
+    for i in range(300):
+        location_tree.add_lowest_level_location(f'eastmarch_darkpass_cave{i}', f'Cave {i} of Shadows')
+    expected = sorted((f'cave {i} of shadows' for i in range(300) if str(i).startswith('1')), key=lambda n: (len(n), n))
+    results = search_index.search_prefix('cave 1', k=20)
+    assert [search_index._names[global_location] for global_location in results] == expected[:20]
+    for i in range(300):
+        location_tree.remove_lowest_level_location(f'eastmarch_darkpass_cave{i}')
+    assert search_index.search_prefix('cave') == []
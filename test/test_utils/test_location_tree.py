@@ -1,4 +1,9 @@
-from engine.utils.location_tree import LocationTree
+import json
+import os
+import pytest
+from engine.utils.location_tree import LocationTree, MapValidationError, map_from_json
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
 
 
 def compare_lists(list1: list[list[str]], list2: list[list[str]]) -> None:
@@ -217,3 +222,76 @@ def test_remove_lowest_level_location():
                                              new_entrypoint_global_location='eastmarch_bridgefort_keep')
     location_tree.remove_lowest_level_location(global_location='eastmarch_bridgefort_gates')
     assert location_tree.get_lowest_level_locations() == [['eastmarch_bridgefort_keep', 'Bridgefort Keep']]
+
+
+def test_display_name_uniqueness_is_scoped():
+    location_tree = LocationTree(world_display_name='Mundus',
+                                 first_region_display_name='Eastmarch',
+                                 first_region_name='eastmarch',
+                                 first_locality_display_name='Bridgefort',
+                                 first_locality_name='bridgefort',
+                                 first_locality_entrypoint_display_name='Gates',
+                                 first_locality_entrypoint_name='gates')
+    location_tree.add_locality(locality_global_location='eastmarch_woodshire',
+                               locality_display_name='Woodshire',
+                               entrypoint_name='gates',
+                               entrypoint_display_name='Gates')
+    try:
+        location_tree.add_lowest_level_location(global_location='eastmarch_woodshire_fields', display_name='Gates')
+        assert False
+    except ValueError:
+        pass
+    location_tree.change_display_name(global_location='eastmarch_woodshire_gates', new_display_name='Old Gates')
+    location_tree.add_lowest_level_location(global_location='eastmarch_woodshire_fields', display_name='Gates')
+    location_tree.remove_locality(locality_global_location='eastmarch_bridgefort')
+    location_tree.add_locality(locality_global_location='eastmarch_riverwood',
+                               locality_display_name='Bridgefort',
+                               entrypoint_name='docks',
+                               entrypoint_display_name='Docks')
+    assert location_tree.get_localities_in_region('eastmarch') == ['eastmarch_woodshire', 'eastmarch_riverwood']
+    assert location_tree.get_locations_in_locality('eastmarch_woodshire') == [['eastmarch_woodshire_gates', 'Old Gates'],
+                                                                               ['eastmarch_woodshire_fields', 'Gates']]
+    assert not location_tree.has_lowest_level_location('eastmarch_bridgefort_gates')
+
+
+def test_map_from_json_round_trip():
+    with open(SAMPLE_MAP_PATH) as f:
+        map_json = json.load(f)
+    location_tree = map_from_json(map_json)
+    assert location_tree.export_world_map() == map_json
+
+
+def test_map_from_json_reports_all_errors():
+    map_json = {'world_name': 'Mundus',
+                'regions': {'east_march': {'display_name': 'Eastmarch', 'localities': {}},
+                            'westmarch': {'display_name': 'Eastmarch',
+                                          'localities': {'skirge': {'display_name': 'Skirge',
+                                                                    'locations': {'entrypoint': 'square',
+                                                                                  'entrypoint_display_name': 'Square',
+                                                                                  'other_locations': {
+                                                                                      'square': {'display_name': 'Plaza'},
+                                                                                      'docks': {'display_name': 'Square'}
+                                                                                  }}}}}}}
+    with pytest.raises(MapValidationError) as exc_info:
+        map_from_json(map_json)
+    assert len(exc_info.value.errors) == 5
+
+
+def test_export_world_map_cache_and_changed_regions():
+    with open(SAMPLE_MAP_PATH) as f:
+        map_json = json.load(f)
+    location_tree = map_from_json(map_json)
+    assert location_tree.export_changed_regions() == {'regions': {}}
+    first_export = location_tree.export_world_map()
+    location_tree.add_lowest_level_location(global_location='eastmarch_bridgefort_keep', display_name='Bridgefort Keep')
+    second_export = location_tree.export_world_map()
+    assert second_export['regions']['westmarch'] is first_export['regions']['westmarch']
+    assert second_export['regions']['eastmarch']['localities']['bridgefort']['locations']['other_locations']['keep'] == \
+           {'display_name': 'Bridgefort Keep'}
+    location_tree.remove_region('westmarch')
+    location_tree.change_display_name(global_location='world', new_display_name='Nirn')
+    changes = location_tree.export_changed_regions()
+    assert changes['world_name'] == 'Nirn'
+    assert changes['regions']['westmarch'] is None
+    assert changes['regions']['eastmarch'] == location_tree.export_world_map()['regions']['eastmarch']
+    assert location_tree.export_changed_regions() == {'regions': {}}
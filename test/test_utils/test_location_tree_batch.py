@@ -0,0 +1,89 @@
+import json
+import os
+import pytest
+from engine.utils.location_tree import map_from_json
+from engine.utils.location_tree_batch import LocationTreeBatch, LocationTreeBatchError
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def load_sample():
+    with open(SAMPLE_MAP_PATH) as f:
+        return map_from_json(json.load(f))
+
+
+def test_batch_applies_all_mutations():
+    location_tree = load_sample()
+    with LocationTreeBatch(location_tree) as batch:
+        batch.remove_region('westmarch')
+        batch.add_region(region_name='westmarch', region_display_name='The Ashen West', first_locality_name='ruins',
+                         first_locality_display_name='Ruins', first_locality_entrypoint_name='gates',
+                         first_locality_entrypoint_display_name='Broken Gates')
+        batch.add_lowest_level_location(global_location='westmarch_ruins_pit', display_name='Ash Pit')
+        batch.change_locality_entrypoint(locality_global_location='westmarch_ruins',
+                                         new_entrypoint_global_location='westmarch_ruins_pit')
+        batch.remove_lowest_level_location('westmarch_ruins_gates')
+    assert location_tree.get_localities_in_region('westmarch') == ['westmarch_ruins']
+    assert location_tree.get_locations_in_locality('westmarch_ruins') == [['westmarch_ruins_pit', 'Ash Pit']]
+    assert location_tree.get_region_display_name('westmarch') == 'The Ashen West'
+
+
+def test_batch_applies_nothing_on_error():
+    location_tree = load_sample()
+    before = json.dumps(location_tree.export_world_map())
+    batch = LocationTreeBatch(location_tree)
+    batch.remove_region('westmarch')
+    batch.add_lowest_level_location(global_location='westmarch_woodshire_mill', display_name='Mill')
+    batch.change_display_name(global_location='eastmarch_darkpass', new_display_name='Bridgefort')
+    batch.add_lowest_level_location(global_location='eastmarch_bridgefort_keep', display_name='Keep')
+    with pytest.raises(LocationTreeBatchError) as exc_info:
+        batch.commit()
+    assert len(exc_info.value.errors) == 2
+    assert json.dumps(location_tree.export_world_map()) == before
+    assert location_tree.get_region_names() == ['eastmarch', 'westmarch']
+
+
+def queue_reshuffle(target):
+    target.remove_region('westmarch')
+    target.add_region(region_name='westmarch', region_display_name='The Ashen West', first_locality_name='ruins',
+                      first_locality_display_name='Ruins', first_locality_entrypoint_name='gates',
+                      first_locality_entrypoint_display_name='Broken Gates')
+    target.add_lowest_level_location(global_location='westmarch_ruins_pit', display_name='Ash Pit')
+    target.change_display_name(global_location='westmarch_ruins_pit', new_display_name='Cinder Pit')
+    target.change_display_name(global_location='world', new_display_name='Ashlands')
+
+
+def test_batch_matches_direct_calls():
+    direct_tree = load_sample()
+    queue_reshuffle(direct_tree)
+    batch_tree = load_sample()
+    with LocationTreeBatch(batch_tree) as batch:
+        queue_reshuffle(batch)
+    assert batch_tree.get_region_names() == direct_tree.get_region_names() == ['eastmarch', 'westmarch']
+    assert json.dumps(batch_tree.export_world_map()) == json.dumps(direct_tree.export_world_map())
+    assert batch_tree.get_world_display_name() == 'Ashlands'
+    for global_location in ['westmarch', 'westmarch_ruins', 'westmarch_ruins_pit']:
+        location_id = batch_tree.location_ids.get_id(global_location)
+        assert batch_tree.location_ids.get_global_location(location_id) == global_location
+    assert 'westmarch_woodshire' not in batch_tree.location_ids
+
+
+def test_batch_bumps_version_once_and_notifies_after_applying():
+    direct_tree = load_sample()
+    direct_events = []
+    direct_tree.add_change_listener(lambda *event: direct_events.append(event))
+    queue_reshuffle(direct_tree)
+    location_tree = load_sample()
+    version = location_tree.get_version()
+    events = []
+
+    def listener(*event):
+        # every event arrives once the whole batch is in the tree
+        assert location_tree.get_location_display_name('westmarch_ruins_pit') == 'Cinder Pit'
+        events.append(event)
+
+    location_tree.add_change_listener(listener)
+    with LocationTreeBatch(location_tree) as batch:
+        queue_reshuffle(batch)
+    assert location_tree.get_version() == version + 1
+    assert events == direct_events
@@ -0,0 +1,34 @@
+import io
+import json
+import os
+import pytest
+from engine.utils.location_tree import MapValidationError
+from engine.utils.map_stream import map_from_json_stream
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def test_map_from_json_stream_matches_export():
+    with open(SAMPLE_MAP_PATH) as f:
+        map_json = json.load(f)
+    map_json['regions']['eastmarch']['display_name'] = 'East "March" \\ {}'
+    map_text = json.dumps(map_json, indent=4)
+    for chunk_size in (1, 5, 1 << 16):
+        location_tree = map_from_json_stream(io.StringIO(map_text), chunk_size=chunk_size)
+        assert location_tree.export_world_map() == map_json
+
+
+def test_map_from_json_stream_world_name_after_regions():
+    map_text = '{"regions": {"eastmarch": {"display_name": "Eastmarch", "localities": {"bridgefort": ' \
+               '{"display_name": "Bridgefort", "locations": {"entrypoint": "gates", ' \
+               '"entrypoint_display_name": "Gates", "other_locations": {}}}}}}, "world_name": "Mundus"}'
+    location_tree = map_from_json_stream(io.StringIO(map_text), chunk_size=8)
+    assert location_tree.get_world_display_name() == 'Mundus'
+    assert location_tree.get_lowest_level_locations() == [['eastmarch_bridgefort_gates', 'Gates']]
+
+
+def test_map_from_json_stream_reports_errors():
+    with pytest.raises(MapValidationError) as exc_info:
+        map_from_json_stream(io.StringIO('{"world_name": " ", "regions": {"a_b": {"display_name": "A", '
+                                         '"localities": {}}}}'))
+    assert len(exc_info.value.errors) == 3
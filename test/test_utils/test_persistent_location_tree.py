@@ -0,0 +1,73 @@
+import json
+import os
+import pytest
+from engine.utils.location_tree import map_from_json
+from engine.utils.persistent_location_tree import PersistentLocationTree
+from test.test_utils.test_persistent_map import count_new_nodes
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def load_sample() -> tuple[dict, PersistentLocationTree]:
+    with open(SAMPLE_MAP_PATH) as f:
+        map_json = json.load(f)
+    return map_json, PersistentLocationTree.from_map_json(map_json)
+
+
+def test_persistent_tree_matches_location_tree():
+    map_json, tree = load_sample()
+    location_tree = map_from_json(map_json)
+    assert tree.export_world_map() == map_json
+    assert tree.get_localities() == location_tree.get_localities()
+    assert tree.get_lowest_level_locations() == location_tree.get_lowest_level_locations()
+    assert tree.to_location_tree().export_world_map() == map_json
+
+
+def test_persistent_tree_mutations_return_new_trees():
+    map_json, base = load_sample()
+    modded = base.add_lowest_level_location(global_location='eastmarch_bridgefort_keep', display_name='Bridgefort Keep')
+    modded = modded.change_locality_entrypoint(locality_global_location='eastmarch_bridgefort',
+                                               new_entrypoint_global_location='eastmarch_bridgefort_keep')
+    modded = modded.change_display_name(global_location='eastmarch_bridgefort_gates', new_display_name='Old Gates')
+    razed = modded.remove_region('westmarch')
+    assert base.export_world_map() == map_json
+    assert not base.has_lowest_level_location('eastmarch_bridgefort_keep')
+    assert modded.get_localities()['eastmarch_bridgefort']['entrypoint_global_location'] == 'eastmarch_bridgefort_keep'
+    assert modded.get_location_display_name('eastmarch_bridgefort_gates') == 'Old Gates'
+    assert razed.get_region_names() == ['eastmarch']
+    assert modded.get_region_names() == ['eastmarch', 'westmarch']
+    # Untouched subtrees are shared, not copied
+    assert modded._regions['westmarch'] is base._regions['westmarch']
+    assert modded._regions['eastmarch'].localities['darkpass'] is base._regions['eastmarch'].localities['darkpass']
+
+
+def test_persistent_tree_validation():
+    _, tree = load_sample()
+    with pytest.raises(ValueError):
+        tree.add_lowest_level_location(global_location='eastmarch_bridgefort_plaza', display_name='Town Square')
+    with pytest.raises(ValueError):
+        tree.remove_lowest_level_location('eastmarch_bridgefort_gates')
+    with pytest.raises(ValueError):
+        tree.change_display_name(global_location='westmarch', new_display_name='Eastmarch')
+
+
+def test_persistent_tree_mutations_copy_little_of_wide_levels():
+    _, narrow = load_sample()
+    wide = narrow
+    for i in range(3000):
+        wide = wide.add_region(region_name=f'r{i}', region_display_name=f'Region {i}', first_locality_name='town',
+                               first_locality_display_name='Town', first_locality_entrypoint_name='gates',
+                               first_locality_entrypoint_display_name='Gates')
+    new_node_counts = []
+    for tree in (narrow, wide):
+        renamed = tree.change_display_name(global_location='eastmarch', new_display_name='Far East')
+        extended = tree.add_lowest_level_location(global_location='eastmarch_bridgefort_keep', display_name='Keep')
+        new_node_counts.append(count_new_nodes(tree._regions, renamed._regions)
+                               + count_new_nodes(tree._region_display_names._map,
+                                                 renamed._region_display_names._map)
+                               + count_new_nodes(tree._regions, extended._regions))
+        assert renamed._regions['westmarch'] is tree._regions['westmarch']
+    # the three changes touch four keys (the display name is removed and another added), and each copies a path
+    # down the hash and order tries of the level instead of the whole level. For a few thousand regions those are
+    # three or four levels deep, or five where the hashes of two keys happen to share their first 20 bits.
+    assert new_node_counts[0] <= new_node_counts[1] <= 4 * 2 * 5
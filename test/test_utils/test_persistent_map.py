@@ -0,0 +1,102 @@
+import pickle
+import random
+from engine.utils.persistent_map import PersistentMap, PersistentSet
+
+
+class CollidingKey:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __hash__(self) -> int:
+        return 7
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CollidingKey) and other.name == self.name
+
+
+def get_nodes(persistent_map: PersistentMap) -> list[tuple]:
+    nodes = []
+    stack = [persistent_map._hash_root, persistent_map._order_root]
+    while stack:
+        node = stack.pop()
+        if type(node) is tuple:
+            nodes.append(node)
+            stack.extend(node)
+    return nodes
+
+
+def count_new_nodes(old: PersistentMap, new: PersistentMap) -> int:
+    old_ids = {id(node) for node in get_nodes(old)}
+    return sum(1 for node in get_nodes(new) if id(node) not in old_ids)
+
+
+def test_map_behaves_like_a_dict():
+    rng = random.Random(3)
+    for size in (0, 1, 40, 2000):
+        expected = {f'k{i}': i for i in range(size)}
+        persistent_map = PersistentMap(expected)
+        versions = []
+        for step in range(2000):
+            key = f'k{rng.randrange(size + 50)}'
+            if key in expected and rng.random() < 0.4:
+                del expected[key]
+                persistent_map = persistent_map.remove(key)
+            else:
+                expected[key] = step
+                persistent_map = persistent_map.set(key, step)
+            if step % 250 == 0:
+                versions.append((dict(expected), persistent_map))
+        # every version keeps its contents and dict order
+        for expected_items, version in versions + [(expected, persistent_map)]:
+            assert list(version.items()) == list(expected_items.items())
+            assert len(version) == len(expected_items)
+
+
+def test_map_handles_hash_collisions():
+    # enough keys to be held in the tries rather than a dict
+    keys = [CollidingKey(f'c{i}') for i in range(40)]
+    persistent_map = PersistentMap()
+    for i, key in enumerate(keys):
+        persistent_map = persistent_map.set(key, i)
+    assert [persistent_map[key] for key in keys] == list(range(40))
+    assert PersistentMap((key, i) for i, key in enumerate(keys)) == persistent_map
+    persistent_map = persistent_map.remove(keys[2])
+    assert keys[2] not in persistent_map
+    assert list(persistent_map.values()) == [0, 1] + list(range(3, 40))
+    assert pickle.loads(pickle.dumps(persistent_map)) == persistent_map
+
+
+def test_removals_compact_the_order_trie():
+    persistent_map = PersistentMap((f'k{i}', i) for i in range(3000))
+    for i in range(0, 2900, 3):
+        persistent_map = persistent_map.remove(f'k{i}')
+        persistent_map = persistent_map.remove(f'k{i + 1}')
+        # empty slots left by removals never outnumber the entries
+        assert persistent_map._next_seq - len(persistent_map) <= len(persistent_map)
+    assert list(persistent_map) == [f'k{i}' for i in range(3000) if i % 3 == 2 or i >= 2901]
+    for key in list(persistent_map)[10:]:
+        persistent_map = persistent_map.remove(key)
+    # small again, so back in a dict
+    assert persistent_map._small is not None and persistent_map._hash_root is None
+    assert list(persistent_map.set('k2', -1).items())[:2] == [('k2', -1), ('k5', 5)]
+
+
+def test_changes_copy_the_same_number_of_nodes_however_wide_the_map_is():
+    new_node_counts = []
+    for size in (100, 30_000):
+        persistent_map = PersistentMap((f'k{i}', i) for i in range(size))
+        new_node_counts.append(max(count_new_nodes(persistent_map, persistent_map.set('k5', -1)),
+                                   count_new_nodes(persistent_map, persistent_map.set('new', -1)),
+                                   count_new_nodes(persistent_map, persistent_map.remove('k5'))))
+    # a path down each trie, which is a handful of levels deep
+    assert new_node_counts[1] <= 10
+    assert new_node_counts[1] - new_node_counts[0] <= 4
+
+
+def test_set_operations():
+    names = PersistentSet(['Bridgefort', 'Darkpass'])
+    assert names.add('Woodshire').discard('Darkpass') == {'Bridgefort', 'Woodshire'}
+    assert names == {'Bridgefort', 'Darkpass'}
+    assert names.add('Bridgefort') is names
+    assert names.discard('Woodshire') is names
+    assert names | {'Woodshire'} == {'Bridgefort', 'Darkpass', 'Woodshire'}
@@ -0,0 +1,45 @@
+import json
+from engine.utils import profiling
+from engine.utils.profiling import Profiler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_nested_measurements_and_exports():
+    clock = FakeClock()
+    profiler = Profiler(clock=clock)
+    with profiler.measure('inventory', 'dispatch'):
+        clock.now += 0.000002
+        with profiler.measure('inventory', 'executor'):
+            clock.now += 0.000005
+            profiler.count('lazy_choices_taken', 3)
+        clock.now += 0.000001
+    data = json.loads(profiler.to_json())
+    timers = {tuple(timer['stack']): timer for timer in data['timers']}
+    assert timers[('inventory.dispatch',)]['count'] == 1
+    assert abs(timers[('inventory.dispatch',)]['total'] - 0.000008) < 1e-12
+    assert timers[('inventory.dispatch', 'inventory.executor')]['histogram_us'] == {'<8': 1}
+    assert data['counters'] == [{'stack': ['inventory.dispatch', 'inventory.executor'],
+                                 'name': 'lazy_choices_taken', 'count': 3}]
+    assert profiler.to_collapsed_stacks() == 'inventory.dispatch 3\ninventory.dispatch;inventory.executor 5\n'
+
+
+def test_module_functions_do_nothing_unless_enabled():
+    assert profiling.get_active_profiler() is None
+    with profiling.measure('map', 'render'):
+        profiling.count('choice_cache_hit')
+    profiler = profiling.enable_profiling()
+    try:
+        with profiling.measure('map', 'render'):
+            profiling.count('choice_cache_hit')
+    finally:
+        assert profiling.disable_profiling() is profiler
+    assert len(profiler.to_dict()['timers']) == 1
+    assert profiler.to_dict()['counters'][0]['stack'] == ['map.render']
@@ -0,0 +1,24 @@
+import socket
+from engine.utils.render import FrameBuffer, MemorySink, SocketSink, StdoutSink
+
+
+def test_frame_buffer_renders_lines():
+    frame = FrameBuffer()
+    frame.add_line('You are at the inn.')
+    frame.add_line()
+    frame.add_lines(['1: Rest', 'b: Back'])
+    assert frame.render() == 'You are at the inn.\n\n1: Rest\nb: Back\n'
+
+
+def test_sinks_receive_whole_writes(capsys):
+    memory_sink = MemorySink()
+    memory_sink.write('frame one\n')
+    memory_sink.write('frame two\n')
+    assert memory_sink.writes == ['frame one\n', 'frame two\n']
+    assert memory_sink.get_output() == 'frame one\nframe two\n'
+    StdoutSink().write('to stdout\n')
+    assert capsys.readouterr().out == 'to stdout\n'
+    server, client = socket.socketpair()
+    with server, client:
+        SocketSink(server).write('über\n')
+        assert client.recv(64).decode('utf-8') == 'über\n'
@@ -0,0 +1,30 @@
+from engine.utils.dice_expression import compile_dice_expression
+from engine.utils.rng import RngStream, get_session_stream, start_session
+from engine.utils.roll import Roll
+
+
+def roll_session(rng: RngStream) -> list[int]:
+    results = [Roll(n=3, d=6, adv=1).roll(rng) for _ in range(50)]
+    results += list(Roll(d=20).roll_many(2000, rng))
+    results += [compile_dice_expression('4d6 drop lowest+2').roll(rng) for _ in range(50)]
+    return results
+
+
+def test_seed_replays_session():
+    seed = start_session().get_seed()
+    first = roll_session(get_session_stream())
+    start_session(seed)
+    assert roll_session(get_session_stream()) == first
+    assert roll_session(RngStream(seed + 1)) != first
+
+
+def test_spawned_streams_are_independent_of_parent_use():
+    parent = RngStream(7)
+    workers = parent.split(3)
+    assert [worker.path for worker in workers] == [(('spawn', 0),), (('spawn', 1),), (('spawn', 2),)]
+    worker_results = [roll_session(worker) for worker in workers]
+    assert worker_results[0] != worker_results[1]
+    used_parent = RngStream(7)
+    roll_session(used_parent)
+    assert [roll_session(worker) for worker in used_parent.split(3)] == worker_results
+    assert roll_session(parent.spawn('goblin')) == roll_session(RngStream(7).spawn('goblin'))
@@ -0,0 +1,64 @@
+from array import array
+import pytest
+from engine.utils import dice_expression, rng, roll
+from engine.utils.dice_expression import compile_dice_expression
+from engine.utils.rng import RngStream
+from engine.utils.roll import Roll
+
+
+@pytest.fixture(params=['numpy', 'pure_python'])
+def numpy_module(request, monkeypatch):
+    """
+    Runs a test once with NumPy, if it is installed, and once as if it were not.
+    """
+    if request.param == 'numpy':
+        return pytest.importorskip('numpy')
+    for module in (rng, roll, dice_expression):
+        monkeypatch.setattr(module, 'numpy', None)
+    return None
+
+
+def test_roll_many_respects_bounds_and_minimum():
+    results = Roll(n=2, d=6, bonus=-4, minimum=1).roll_many(2000)
+    assert len(results) == 2000
+    assert set(results) == set(range(1, 9))
+    assert list(Roll(n=1, d=4, bonus=-10, minimum=3).roll_many(5)) == [3] * 5
+    assert len(Roll().roll_many(0)) == 0
+
+
+def test_roll_many_applies_advantage():
+    n_rolls = 20000
+    plain = sum(Roll(d=20).roll_many(n_rolls)) / n_rolls
+    advantage = sum(Roll(d=20, adv=1).roll_many(n_rolls)) / n_rolls
+    disadvantage = sum(Roll(d=20, adv=-1).roll_many(n_rolls)) / n_rolls
+    # expected values are 10.5, 13.825 and 7.175
+    assert abs(plain - 10.5) < 0.3
+    assert abs(advantage - 13.825) < 0.3
+    assert abs(disadvantage - 7.175) < 0.3
+    assert set(Roll(n=3, d=2, bonus=5, adv=1).roll_many(500)) == set(range(8, 12))
+
+
+def test_exact_distribution():
+    assert Roll(n=2, d=6).get_pmf()[7] == 6 / 36
+    assert Roll(n=2, d=6).get_mean() == 7
+    assert abs(Roll(n=2, d=6).get_variance() - 35 / 6) < 1e-9
+    assert Roll(d=20, adv=1).get_probability_at_least(20) == 39 / 400
+    assert Roll(d=20, adv=-1).get_probability_at_least(20) == 1 / 400
+    assert abs(Roll(d=20, adv=1).get_mean() - 13.825) < 1e-9
+    clamped = Roll(n=1, d=6, bonus=-3, minimum=1)
+    assert clamped.get_pmf() == {1: 4 / 6, 2: 1 / 6, 3: 1 / 6}
+    assert clamped.get_cdf()[2] == 5 / 6
+    assert clamped.get_probability_at_least(0) == 1.0
+    assert clamped.get_probability_at_least(4) == 0.0
+    assert Roll(n=1, d=4, bonus=-10, minimum=3).get_pmf() == {3: 1.0}
+
+
+def test_roll_many_with_and_without_numpy(numpy_module):
+    for roller in (Roll(n=2, d=6, bonus=-4, minimum=1), Roll(n=3, d=4, adv=-1),
+                   compile_dice_expression('4d6 drop lowest+1d4-1')):
+        results = roller.roll_many(3000, RngStream(11))
+        assert isinstance(results, array if numpy_module is None else numpy_module.ndarray)
+        assert len(results) == 3000
+        assert set(int(result) for result in results) <= set(roller.get_pmf())
+        assert abs(sum(int(result) for result in results) / 3000 - roller.get_mean()) < 0.25
+        assert list(roller.roll_many(3000, RngStream(11))) == list(results)
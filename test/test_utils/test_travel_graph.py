@@ -0,0 +1,55 @@
+import json
+import os
+import pytest
+from engine.utils.location_tree import map_from_json
+from engine.utils.travel_graph import TravelGraph
+
+SAMPLE_MAP_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'sample_map.json')
+
+
+def make_graph() -> TravelGraph:
+    with open(SAMPLE_MAP_PATH) as f:
+        location_tree = map_from_json(json.load(f))
+    travel_graph = TravelGraph(location_tree)
+    travel_graph.connect_locations('eastmarch_bridgefort_gates', 'eastmarch_bridgefort_square', 1)
+    travel_graph.connect_localities('eastmarch_bridgefort', 'eastmarch_darkpass', 5)
+    travel_graph.connect_locations('eastmarch_darkpass_jaggedpassage', 'eastmarch_darkpass_deadgully', 2)
+    travel_graph.connect_locations('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully', 10, two_way=False)
+    return travel_graph
+
+
+def test_find_route_across_localities():
+    travel_graph = make_graph()
+    assert travel_graph.find_route('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') == \
+           (8, ['eastmarch_bridgefort_square', 'eastmarch_bridgefort_gates', 'eastmarch_darkpass_jaggedpassage',
+                'eastmarch_darkpass_deadgully'])
+    assert travel_graph.get_travel_time('eastmarch_darkpass_deadgully', 'eastmarch_bridgefort_square') == 8
+    assert travel_graph.find_route('eastmarch_bridgefort_square', 'westmarch_woodshire_gates') is None
+
+
+def test_route_cache_invalidated_by_changes():
+    travel_graph = make_graph()
+    assert travel_graph.get_travel_time('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') == 8
+    travel_graph.connect_locations('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully', 3, two_way=False)
+    assert travel_graph.get_travel_time('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') == 3
+    travel_graph.location_tree.remove_lowest_level_location('eastmarch_darkpass_deadgully')
+    travel_graph.location_tree.add_lowest_level_location(global_location='eastmarch_darkpass_deadgully',
+                                                         display_name='Dead Gully')
+    assert travel_graph.get_connections('eastmarch_bridgefort_square') == {'eastmarch_bridgefort_gates': 1}
+    assert travel_graph.find_route('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') is None
+    with pytest.raises(ValueError):
+        travel_graph.connect_locations('eastmarch_bridgefort_square', 'eastmarch_bridgefort_nowhere', 1)
+
+
+def test_unconnected_tree_changes_keep_routes():
+    travel_graph = make_graph()
+    assert travel_graph.get_travel_time('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') == 8
+    version = travel_graph.get_version()
+    travel_graph.location_tree.add_lowest_level_location(global_location='westmarch_woodshire_mill',
+                                                         display_name='Mill')
+    travel_graph.location_tree.remove_lowest_level_location('westmarch_woodshire_mill')
+    assert travel_graph.get_version() == version
+    assert travel_graph.get_travel_time('eastmarch_bridgefort_square', 'eastmarch_darkpass_deadgully') == 8
+    travel_graph.location_tree.remove_lowest_level_location('eastmarch_darkpass_deadgully')
+    assert travel_graph.get_version() != version
+    assert travel_graph.get_travel_time('eastmarch_bridgefort_square', 'eastmarch_darkpass_jaggedpassage') == 6